@@ -0,0 +1,267 @@
+# backend/api/benchmarks.py
+"""
+Benchmarks del cálculo de planes de pago y del simulador.
+
+Se ejecutan con `python manage.py benchmark_planes` y producen un JSON
+comparable entre corridas (ver `comparar`). Las mediciones que usan BD corren
+dentro de una transacción que se revierte al final: sirven SQLite
+(DB_ENGINE=sqlite) o un PostgreSQL local, sin otros servicios.
+"""
+import io
+import platform
+import statistics
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import Cliente, PlanPago, SolicitudCredito
+from .services import plan_pdf
+from .services.plan_pago import _calcular_cronograma_frances, generar_plan
+from .services.plan_pago_lote import iter_cronogramas_lote, resumir_cronogramas_lote
+from .services.simulador import simular_plan
+
+PERFILES = {
+    'minimo': {
+        'plazos': [1, 12, 60],
+        'lotes': [10, 100],
+        'plazos_bd': [12],
+        'min_seg': 0.01,
+    },
+    'rapido': {
+        'plazos': [1, 12, 60, 120, 360, 480],
+        'lotes': [100, 1000, 10000],
+        'plazos_bd': [12, 360],
+        'min_seg': 0.2,
+    },
+    'completo': {
+        'plazos': [1, 6, 12, 24, 36, 60, 120, 180, 240, 360, 480],
+        'lotes': [100, 1000, 10000, 100000],
+        'plazos_bd': [1, 60, 240, 480],
+        'min_seg': 1.0,
+    },
+}
+
+CAPITAL = Decimal('250000.00')
+TNA = Decimal('12.5')
+PRIMERA = date(2025, 1, 31)  # fin de mes: ejercita el ajuste de fechas
+
+
+def medir(fn, min_seg=0.2, min_rep=3, max_rep=1000):
+    """Ejecuta fn hasta acumular min_seg (y al menos min_rep veces); estadísticas en segundos."""
+    tiempos = []
+    total = 0.0
+    while (total < min_seg or len(tiempos) < min_rep) and len(tiempos) < max_rep:
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        tiempos.append(dt)
+        total += dt
+    return {
+        'mediana_seg': statistics.median(tiempos),
+        'min_seg': min(tiempos),
+        'media_seg': statistics.fmean(tiempos),
+        'repeticiones': len(tiempos),
+    }
+
+
+# =========================================================
+#                  CÁLCULO (sin BD)
+# =========================================================
+def bench_cronograma(conf):
+    for n in conf['plazos']:
+        r = medir(lambda: _calcular_cronograma_frances(CAPITAL, n, TNA, PRIMERA), conf['min_seg'])
+        yield f'cronograma/plazo={n}', r
+
+
+def bench_generar_plan_simulacion(conf):
+    for n in conf['plazos']:
+        r = medir(lambda: generar_plan(capital=CAPITAL, plazo_meses=n, tna=TNA,
+                                       primera_cuota_fecha=PRIMERA, persistir=False), conf['min_seg'])
+        yield f'generar_plan_simulacion/plazo={n}', r
+
+
+def bench_simular_plan(conf):
+    for n in conf['plazos']:
+        # frío: un monto distinto en cada llamada fuerza el miss de caché
+        contador = iter(range(10 ** 9))
+        frio = medir(lambda: simular_plan(CAPITAL + Decimal(next(contador)) / 100, n, TNA, PRIMERA), conf['min_seg'])
+        yield f'simular_plan_frio/plazo={n}', frio
+        simular_plan(CAPITAL, n, TNA, PRIMERA)
+        caliente = medir(lambda: simular_plan(CAPITAL, n, TNA, PRIMERA), conf['min_seg'])
+        yield f'simular_plan_caliente/plazo={n}', caliente
+
+
+def _lote(tam, plazos):
+    capitales = [CAPITAL + i for i in range(tam)]
+    return capitales, [plazos[i % len(plazos)] for i in range(tam)], [TNA] * tam
+
+
+def bench_lote(conf):
+    for tam in conf['lotes']:
+        capitales, plazos, tnas = _lote(tam, conf['plazos'])
+        r = medir(lambda: resumir_cronogramas_lote(capitales, plazos, tnas), conf['min_seg'], min_rep=1)
+        r['planes_por_seg'] = tam / r['mediana_seg']
+        yield f'lote_resumen/n={tam}', r
+
+        def cronogramas():
+            # se consumen sin retenerlos: mide el cálculo, no la memoria
+            for _ in iter_cronogramas_lote(capitales, plazos, tnas, [PRIMERA] * tam):
+                pass
+
+        r = medir(cronogramas, conf['min_seg'], min_rep=1)
+        r['planes_por_seg'] = tam / r['mediana_seg']
+        yield f'lote_cronogramas/n={tam}', r
+
+
+# =========================================================
+#                  PERSISTENCIA / EXPORTACIÓN (BD)
+# =========================================================
+def _datos_bd():
+    usuario = User.objects.create_user(username=f'bench_{time.time_ns()}', is_superuser=True)
+    cliente = Cliente.objects.create(user=usuario, numero_documento=f'B{time.time_ns() % 10 ** 12}',
+                                     telefono='0', direccion='benchmark')
+    return usuario, cliente
+
+
+def _solicitud(cliente, n):
+    return SolicitudCredito.objects.create(
+        cliente=cliente, monto=CAPITAL, plazo_meses=n, tasa_nominal_anual=TNA,
+        estado='APROBADA', fecha_aprobacion=now())
+
+
+def bench_generar_plan_persistir(conf):
+    usuario, cliente = _datos_bd()
+    for n in conf['plazos_bd']:
+        sol = _solicitud(cliente, n)
+
+        def crear():
+            PlanPago.objects.filter(solicitud=sol).delete()
+            fresca = SolicitudCredito.objects.get(pk=sol.pk)
+            t0 = time.perf_counter()
+            generar_plan(fresca, usuario)
+            return time.perf_counter() - t0
+
+        # el borrado del plan previo queda fuera de la medición
+        tiempos = []
+        while sum(tiempos) < conf['min_seg'] or len(tiempos) < 3:
+            tiempos.append(crear())
+        yield f'generar_plan_persistir/plazo={n}', {
+            'mediana_seg': statistics.median(tiempos), 'min_seg': min(tiempos),
+            'media_seg': statistics.fmean(tiempos), 'repeticiones': len(tiempos),
+        }
+
+        # la última iteración dejó el plan guardado: se mide su regeneración
+        sol = SolicitudCredito.objects.select_related('plan').get(pk=sol.pk)
+        r = medir(lambda: generar_plan(sol, usuario, overwrite=True), conf['min_seg'])
+        r['consultas'] = _consultas(lambda: generar_plan(sol, usuario, overwrite=True))
+        yield f'generar_plan_overwrite/plazo={n}', r
+
+
+def bench_export_plan(conf):
+    from .views import SolicitudCreditoViewSet
+
+    usuario, cliente = _datos_bd()
+    # los kwargs del @action (renderers) los aplica el router; aquí se pasan a mano
+    vista = SolicitudCreditoViewSet.as_view({'get': 'export_plan'}, **SolicitudCreditoViewSet.export_plan.kwargs)
+    factory = APIRequestFactory()
+    # Caché de PDF en un temporal: los planes se revierten al final y sus PDF no
+    # deben quedar huérfanos en PLAN_PDF_CACHE['DIR']
+    with tempfile.TemporaryDirectory() as cache, override_settings(PLAN_PDF_CACHE={'DIR': cache}):
+        for n in conf['plazos_bd']:
+            sol = _solicitud(cliente, n)
+            plan = generar_plan(sol, usuario)
+
+            # export_plan?format=pdf sirve el archivo en caché desde la segunda vez:
+            # el renderizado se mide aparte, sin caché
+            r = medir(lambda: plan_pdf.renderizar(plan, io.BytesIO()), conf['min_seg'])
+            destino = io.BytesIO()
+            plan_pdf.renderizar(plan, destino)
+            r['bytes'] = destino.tell()
+            yield f'render_plan_pdf/plazo={n}', r
+
+            for fmt, clave in (('pdf', 'export_plan_pdf_cache'), ('xlsx', 'export_plan_xlsx')):
+                def exportar():
+                    req = factory.get(f'/api/solicitudes/{sol.pk}/plan-pagos/export/', {'format': fmt})
+                    force_authenticate(req, user=usuario)
+                    resp = vista(req, pk=str(sol.pk))
+                    if resp.status_code != 200:
+                        raise RuntimeError(f'export_plan {fmt} respondió {resp.status_code}')
+                    return b''.join(resp) if resp.streaming else resp.content
+
+                r = medir(exportar, conf['min_seg'])
+                r['bytes'] = len(exportar())
+                yield f'{clave}/plazo={n}', r
+
+
+def _consultas(fn):
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+BENCHMARKS = {
+    'cronograma': (bench_cronograma, False),
+    'generar_plan_simulacion': (bench_generar_plan_simulacion, False),
+    'simular_plan': (bench_simular_plan, False),
+    'lote': (bench_lote, False),
+    'generar_plan_persistir': (bench_generar_plan_persistir, True),
+    'export_plan': (bench_export_plan, True),
+}
+
+
+def ejecutar(perfil='rapido', solo=None, con_bd=True, progreso=None):
+    """Corre los benchmarks del perfil; retorna el documento JSON de resultados."""
+    conf = PERFILES[perfil]
+    resultados = {}
+    for nombre, (fn, usa_bd) in BENCHMARKS.items():
+        if (solo and nombre not in solo) or (usa_bd and not con_bd):
+            continue
+        if usa_bd:
+            with transaction.atomic():
+                for clave, r in fn(conf):
+                    resultados[clave] = r
+                    if progreso:
+                        progreso(clave, r)
+                transaction.set_rollback(True)
+        else:
+            for clave, r in fn(conf):
+                resultados[clave] = r
+                if progreso:
+                    progreso(clave, r)
+    return {
+        'meta': {
+            'fecha': now().isoformat(),
+            'perfil': perfil,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'bd': connection.vendor if con_bd else None,
+            'maquina': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(actual, base, tolerancia=0.2):
+    """
+    Compara la mediana de cada medición presente en ambos documentos.
+    Retorna [(clave, base_seg, actual_seg, ratio, regresion)], regresion si
+    actual > base * (1 + tolerancia).
+    """
+    filas = []
+    previos = base.get('resultados', {})
+    for clave, r in actual.get('resultados', {}).items():
+        if clave not in previos:
+            continue
+        b = previos[clave]['mediana_seg']
+        a = r['mediana_seg']
+        ratio = a / b if b else float('inf')
+        filas.append((clave, b, a, ratio, ratio > 1 + tolerancia))
+    return filas
@@ -0,0 +1,101 @@
+# backend/api/consultas.py
+"""
+Plan de consultas por acción y presupuesto de consultas.
+
+Cada ViewSet declara qué relaciones carga cada acción (`plan_consultas`) y
+cuántas consultas SQL puede costar (`presupuesto_consultas`). Así una página
+de listado cuesta un número fijo de consultas en vez de 1 + k·N.
+
+El presupuesto se verifica:
+  - en tests, con el context manager `presupuesto_consultas(n)`;
+  - en ejecución, según settings.PRESUPUESTO_CONSULTAS: 'off' (default),
+    'log' (warning) o 'error' (excepción; útil en desarrollo/CI).
+"""
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    pass
+
+
+class ContadorConsultas:
+    """Wrapper para connection.execute_wrapper: registra el SQL ejecutado."""
+
+    def __init__(self):
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.sql.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.sql)
+
+    def reiniciar(self):
+        self.sql.clear()
+
+    def verificar(self, maximo, etiqueta='', modo='error'):
+        if len(self) <= maximo:
+            return
+        detalle = '\n'.join(f'  {i}. {s}' for i, s in enumerate(self.sql, 1))
+        msg = f'{etiqueta or "bloque"}: {len(self)} consultas (presupuesto {maximo})'
+        if modo == 'log':
+            logger.warning('%s\n%s', msg, detalle)
+            return
+        raise PresupuestoConsultasExcedido(f'{msg}\n{detalle}')
+
+
+@contextmanager
+def presupuesto_consultas(maximo, etiqueta=''):
+    """Falla si el bloque ejecuta más de `maximo` consultas (también sin DEBUG)."""
+    contador = ContadorConsultas()
+    with connection.execute_wrapper(contador):
+        yield contador
+    contador.verificar(maximo, etiqueta)
+
+
+class PlanConsultasMixin:
+    """
+    Para ViewSets. Declarar, por acción:
+        plan_consultas = {'list': {'select': ('cliente__user',), 'prefetch': ()}}
+        presupuesto_consultas = {'list': 1}
+    El presupuesto cuenta sólo el handler: la autenticación y los permisos
+    previos (initial) quedan fuera porque dependen del backend de auth.
+    """
+    plan_consultas = {}
+    presupuesto_consultas = {}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        plan = self.plan_consultas.get(getattr(self, 'action', None))
+        if plan:
+            if plan.get('select'):
+                qs = qs.select_related(*plan['select'])
+            if plan.get('prefetch'):
+                qs = qs.prefetch_related(*plan['prefetch'])
+        return qs
+
+    def dispatch(self, request, *args, **kwargs):
+        modo = getattr(settings, 'PRESUPUESTO_CONSULTAS', 'off')
+        if modo == 'off' or not self.presupuesto_consultas:
+            return super().dispatch(request, *args, **kwargs)
+        self._contador_consultas = ContadorConsultas()
+        with connection.execute_wrapper(self._contador_consultas):
+            response = super().dispatch(request, *args, **kwargs)
+        maximo = self.presupuesto_consultas.get(getattr(self, 'action', None))
+        if maximo is not None and response.status_code < 400:
+            self._contador_consultas.verificar(
+                maximo, f'{type(self).__name__}.{self.action}', modo)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        contador = getattr(self, '_contador_consultas', None)
+        if contador is not None:
+            contador.reiniciar()
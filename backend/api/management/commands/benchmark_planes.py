@@ -0,0 +1,59 @@
+# backend/api/management/commands/benchmark_planes.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import BENCHMARKS, PERFILES, comparar, ejecutar
+
+
+class Command(BaseCommand):
+    help = ("Mide el cálculo de cronogramas, generar_plan (simulación y persistencia), "
+            "simular_plan y export_plan; guarda los resultados en JSON y opcionalmente "
+            "los compara contra una corrida base.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfil', choices=sorted(PERFILES), default='rapido',
+                            help='Plazos y tamaños de lote a medir (default: rapido)')
+        parser.add_argument('--salida', default='benchmark_planes.json',
+                            help='Archivo JSON de resultados (default: benchmark_planes.json)')
+        parser.add_argument('--comparar', metavar='BASE_JSON',
+                            help='Resultados previos contra los que detectar regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento relativo de la mediana tolerado antes de fallar (default: 0.2)')
+        parser.add_argument('--solo', action='append', choices=sorted(BENCHMARKS),
+                            help='Correr sólo este benchmark (repetible)')
+        parser.add_argument('--sin-bd', action='store_true',
+                            help='Omitir los benchmarks que usan la base de datos')
+
+    def handle(self, *args, **opts):
+        base = None
+        if opts['comparar']:
+            try:
+                with open(opts['comparar'], encoding='utf-8') as f:
+                    base = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {opts['comparar']}: {e}")
+
+        def progreso(clave, r):
+            extra = f"  {r['planes_por_seg']:,.0f} planes/s" if 'planes_por_seg' in r else ''
+            self.stdout.write(f"  {clave:<40} {r['mediana_seg'] * 1000:10.3f} ms  (x{r['repeticiones']}){extra}")
+
+        self.stdout.write(f"Perfil '{opts['perfil']}'")
+        doc = ejecutar(opts['perfil'], solo=opts['solo'], con_bd=not opts['sin_bd'], progreso=progreso)
+
+        with open(opts['salida'], 'w', encoding='utf-8') as f:
+            json.dump(doc, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(doc['resultados'])} mediciones guardadas en {opts['salida']}"))
+
+        if base is None:
+            return
+        filas = comparar(doc, base, opts['tolerancia'])
+        regresiones = [f for f in filas if f[4]]
+        for clave, b, a, ratio, regresion in filas:
+            estilo = self.style.ERROR if regresion else (lambda s: s)
+            self.stdout.write(estilo(f"  {clave:<40} {b * 1000:10.3f} -> {a * 1000:10.3f} ms  x{ratio:.2f}"))
+        if regresiones:
+            raise CommandError(
+                f"{len(regresiones)} regresiones (> {opts['tolerancia']:.0%}): "
+                + ', '.join(f[0] for f in regresiones))
+        self.stdout.write(self.style.SUCCESS(f"✅ Sin regresiones frente a {opts['comparar']} ({len(filas)} comparadas)"))
@@ -0,0 +1,96 @@
+# backend/api/management/commands/compactar_planes.py
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import PlanPago, PlanCuota
+from api.services.plan_compacto import cuotas_dto, empaquetar
+from api.services.plan_pago import _conf_persistencia, _nuevas_cuotas
+
+_CAMPOS = ("nro_cuota", "fecha_vencimiento", "capital", "interes", "cuota", "saldo", "ajuste_redondeo")
+
+
+class Command(BaseCommand):
+    help = ("Convierte planes de pago existentes entre el formato por filas (PlanCuota) "
+            "y el formato compacto (PlanPago.cuotas_compactas).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formato", choices=["compacto", "filas"], default="compacto",
+                            help="Formato destino (default: compacto).")
+        parser.add_argument("--lote", type=int, default=200,
+                            help="Planes por transacción.")
+        parser.add_argument("--limite", type=int, default=None,
+                            help="Máximo de planes a convertir en esta corrida.")
+
+    @staticmethod
+    def _bloquear(pks, compactos):
+        # Lectura y escritura en la misma transacción, con los planes bloqueados: un
+        # generar_plan(overwrite=True) o recalcular_desde concurrente espera o ya terminó,
+        # y los que cambiaron de formato entre tanto se saltean
+        return list(PlanPago.objects.select_for_update()
+                    .filter(pk__in=pks, cuotas_compactas__isnull=not compactos)
+                    .only("pk", "cuotas_compactas").order_by("pk"))
+
+    # ---------------- filas -> compacto ----------------
+    def _compactar(self, pks):
+        with transaction.atomic():
+            planes = self._bloquear(pks, compactos=False)
+            if not planes:
+                return 0, 0
+            filas = (PlanCuota.objects
+                     .filter(plan_id__in=[p.pk for p in planes])
+                     .order_by("plan_id", "nro_cuota")
+                     .values_list("plan_id", *_CAMPOS))
+            por_plan = {pid: [dict(zip(_CAMPOS, f[1:])) for f in grupo]
+                        for pid, grupo in groupby(filas, key=lambda f: f[0])}
+            for p in planes:
+                p.cuotas_compactas = empaquetar(por_plan.get(p.pk, []))
+            PlanPago.objects.bulk_update(planes, ["cuotas_compactas"])
+            borradas, _ = PlanCuota.objects.filter(plan_id__in=[p.pk for p in planes]).delete()
+        return len(planes), borradas
+
+    # ---------------- compacto -> filas ----------------
+    def _expandir(self, pks):
+        batch_size, _ = _conf_persistencia()
+        with transaction.atomic():
+            planes = self._bloquear(pks, compactos=True)
+            if not planes:
+                return 0, 0
+            nuevas = []
+            for p in planes:
+                nuevas.extend(_nuevas_cuotas(p, cuotas_dto(p.cuotas_compactas)))
+                p.cuotas_compactas = None
+            # por si quedaron filas de un formato anterior
+            PlanCuota.objects.filter(plan_id__in=[p.pk for p in planes]).delete()
+            PlanCuota.objects.bulk_create(nuevas, batch_size=batch_size)
+            PlanPago.objects.bulk_update(planes, ["cuotas_compactas"])
+        return len(planes), len(nuevas)
+
+    def handle(self, *args, **opts):
+        destino = opts["formato"]
+        lote = max(1, opts["lote"])
+        restantes = opts["limite"]
+
+        qs = PlanPago.objects.filter(cuotas_compactas__isnull=(destino == "compacto")).order_by("pk")
+        convertir = self._compactar if destino == "compacto" else self._expandir
+        self.stdout.write(self.style.SUCCESS(f"🚀 Convirtiendo planes a formato '{destino}' (lote={lote})"))
+
+        ultimo = None
+        planes_ok = filas = 0
+        while restantes is None or restantes > 0:
+            cantidad = lote if restantes is None else min(lote, restantes)
+            pagina = qs if ultimo is None else qs.filter(pk__gt=ultimo)
+            pks = list(pagina.values_list("pk", flat=True)[:cantidad])
+            if not pks:
+                break
+            convertidos, cuotas = convertir(pks)
+            planes_ok += convertidos
+            filas += cuotas
+            ultimo = pks[-1]
+            if restantes is not None:
+                restantes -= len(pks)
+            self.stdout.write(f"  … {planes_ok} planes ({filas} cuotas)")
+
+        accion = "compactadas (filas borradas)" if destino == "compacto" else "insertadas"
+        self.stdout.write(self.style.SUCCESS(f"✅ {planes_ok} planes convertidos; {filas} cuotas {accion}."))
@@ -0,0 +1,78 @@
+# backend/api/management/commands/exportar_cartera.py
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from api.services import extraccion
+
+
+class Command(BaseCommand):
+    help = ("Exporta solicitudes, planes y cuotas a CSV, Parquet o Arrow para análisis, en "
+            "lotes y con memoria constante. Con --estado la extracción es incremental: "
+            "sólo sale lo nuevo o modificado desde la marca de agua de la corrida anterior.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('conjuntos', nargs='*', metavar='CONJUNTO',
+                            help=f"Conjuntos a exportar (default: {' '.join(extraccion.CONJUNTOS)})")
+        parser.add_argument('--formato', choices=extraccion.FORMATOS, default='csv',
+                            help='Formato de salida (default: csv; parquet y arrow requieren pyarrow)')
+        parser.add_argument('--salida', default='extracciones',
+                            help='Directorio de los archivos (default: extracciones)')
+        parser.add_argument('--estado', metavar='JSON',
+                            help='Archivo con las marcas de agua por conjunto; se lee al empezar '
+                                 'y se actualiza al terminar')
+        parser.add_argument('--desde', metavar='MARCA',
+                            help="Marca de agua '<instante ISO>,<id>' (ignora la de --estado)")
+
+    def handle(self, *args, **opts):
+        conjuntos = opts['conjuntos'] or list(extraccion.CONJUNTOS)
+        desconocidos = set(conjuntos) - set(extraccion.CONJUNTOS)
+        if desconocidos:
+            raise CommandError(f"Conjuntos desconocidos: {', '.join(sorted(desconocidos))} "
+                               f"(use {', '.join(extraccion.CONJUNTOS)})")
+        formato = opts['formato']
+        if not extraccion.formato_disponible(formato):
+            raise CommandError(f"El formato {formato} requiere pyarrow (pip install pyarrow)")
+
+        marcas = {}
+        if opts['estado'] and os.path.exists(opts['estado']):
+            try:
+                with open(opts['estado'], encoding='utf-8') as f:
+                    marcas = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {opts['estado']}: {e}")
+        try:
+            desde = {c: extraccion.leer_marca(opts['desde'] or marcas.get(c)) for c in conjuntos}
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        os.makedirs(opts['salida'], exist_ok=True)
+        sello = now().strftime('%Y%m%dT%H%M%S')
+        for conjunto in conjuntos:
+            inicio = time.monotonic()
+            ext = extraccion.Extraccion(conjunto, desde=desde[conjunto])
+            ruta = os.path.join(opts['salida'], f"{conjunto}_{sello}.{extraccion.EXTENSIONES[formato]}")
+            parcial = ruta + '.parcial'
+            try:
+                with open(parcial, 'wb') as f:
+                    for bloque in ext.bloques(formato):
+                        f.write(bloque)
+                os.replace(parcial, ruta)
+            except BaseException:
+                if os.path.exists(parcial):
+                    os.unlink(parcial)
+                raise
+            marcas[conjunto] = extraccion.formatear_marca(ext.hasta)
+            self.stdout.write(f"  {conjunto:<12} {ext.filas:>10,} filas -> {ruta} "
+                              f"({time.monotonic() - inicio:.1f}s, marca {marcas[conjunto]})")
+
+        if opts['estado']:
+            # Se guarda al final: si algo falla, la próxima corrida repite desde la marca anterior
+            temporal = opts['estado'] + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(marcas, f, indent=2)
+            os.replace(temporal, opts['estado'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(conjuntos)} conjuntos exportados en {opts['salida']}"))
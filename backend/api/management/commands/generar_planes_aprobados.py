@@ -0,0 +1,194 @@
+# backend/api/management/commands/generar_planes_aprobados.py
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.timezone import now
+
+from api.models import SolicitudCredito
+from api.services.plan_pago import fecha_primera_cuota, persistir_planes_lote
+from api.services.plan_pago_lote import calcular_cronogramas_lote
+
+
+def _calcular_bloque(tareas):
+    """
+    Worker (proceso hijo): calcula los cronogramas de un bloque sin tocar BD.
+    tareas = [(solicitud_id, monto, plazo, tna, primera_fecha, moneda), ...]
+    Retorna [(solicitud_id, plan_dto, cuotas_dto, error), ...]
+    """
+    salida = []
+    tareas = sorted(tareas, key=lambda t: t[5])
+    for moneda, grupo in groupby(tareas, key=lambda t: t[5]):
+        grupo = list(grupo)
+        try:
+            resultados = calcular_cronogramas_lote(
+                [t[1] for t in grupo], [t[2] for t in grupo], [t[3] for t in grupo],
+                [t[4] for t in grupo], moneda=moneda,
+            )
+            salida.extend((t[0], dto, cuotas, None) for t, (dto, cuotas) in zip(grupo, resultados))
+        except Exception:
+            # Un préstamo inválido no debe tumbar el bloque: se reintenta uno a uno
+            for t in grupo:
+                try:
+                    (dto, cuotas), = calcular_cronogramas_lote([t[1]], [t[2]], [t[3]], [t[4]], moneda=moneda)
+                    salida.append((t[0], dto, cuotas, None))
+                except Exception as e:
+                    salida.append((t[0], None, None, f"{type(e).__name__}: {e}"))
+    return salida
+
+
+class Command(BaseCommand):
+    help = ("Genera en lote los planes de pago de las solicitudes APROBADAS sin plan: "
+            "calcula en un pool de procesos y persiste por lotes, con checkpoint reanudable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Procesos de cálculo (default: núcleos de CPU).")
+        parser.add_argument("--lote", type=int, default=1000,
+                            help="Solicitudes por transacción de persistencia.")
+        parser.add_argument("--usuario", default=None,
+                            help="username registrado como generado_por (default: primer superusuario).")
+        parser.add_argument("--checkpoint", default="generar_planes_aprobados.checkpoint.json",
+                            help="Archivo de avance para reanudar.")
+        parser.add_argument("--reiniciar", action="store_true",
+                            help="Ignora el checkpoint existente y empieza de cero.")
+        parser.add_argument("--reintentar-fallidas", action="store_true",
+                            help="Vuelve a intentar las solicitudes marcadas como fallidas.")
+        parser.add_argument("--limite", type=int, default=None,
+                            help="Máximo de solicitudes a procesar en esta corrida.")
+
+    # ---------------- checkpoint ----------------
+    def _leer_checkpoint(self, ruta, reiniciar):
+        if reiniciar or not os.path.exists(ruta):
+            return {"ultimo_id": None, "procesadas": 0, "fallidas": {}}
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _guardar_checkpoint(self, ruta, estado):
+        estado["actualizado"] = now().isoformat()
+        tmp = f"{ruta}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(estado, f, indent=2)
+        os.replace(tmp, ruta)
+
+    # ---------------- helpers ----------------
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Usuario '{username}' no existe.")
+        u = User.objects.filter(is_superuser=True).order_by("id").first()
+        if u is None:
+            raise CommandError("No hay superusuario; indique --usuario.")
+        return u
+
+    def _pendientes(self, desde_id, excluir, cantidad):
+        qs = (SolicitudCredito.objects
+              .filter(estado="APROBADA", is_deleted=False, plan__isnull=True)
+              .order_by("pk"))
+        if desde_id:
+            qs = qs.filter(pk__gt=desde_id)
+        if excluir:
+            qs = qs.exclude(pk__in=excluir)
+        return list(qs.values_list("pk", "monto", "plazo_meses", "tasa_nominal_anual",
+                                   "fecha_aprobacion", "moneda")[:cantidad])
+
+    def _persistir(self, resultados, usuario, estado):
+        """Un lote por transacción; si falla, se aísla plan por plan."""
+        ok = [(sid, dto, cuotas) for sid, dto, cuotas, err in resultados if err is None]
+        for sid, _, _, err in resultados:
+            if err is not None:
+                estado["fallidas"][str(sid)] = err
+        try:
+            persistir_planes_lote(ok, usuario)
+            return len(ok)
+        except Exception:
+            guardadas = 0
+            for item in ok:
+                try:
+                    persistir_planes_lote([item], usuario)
+                    guardadas += 1
+                except Exception as e:
+                    estado["fallidas"][str(item[0])] = f"{type(e).__name__}: {e}"
+            return guardadas
+
+    # ---------------- main ----------------
+    def handle(self, *args, **opts):
+        workers = max(1, opts["workers"])
+        lote = max(1, opts["lote"])
+        usuario = self._usuario(opts["usuario"])
+        ruta = opts["checkpoint"]
+        estado = self._leer_checkpoint(ruta, opts["reiniciar"])
+        if opts["reintentar_fallidas"]:
+            estado["fallidas"] = {}
+            estado["ultimo_id"] = None
+
+        # fork: los hijos heredan Django ya configurado y sólo calculan (no usan BD)
+        if workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING("⚠️ Sin 'fork' en esta plataforma: se calcula en el proceso principal."))
+            workers = 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 Generando planes pendientes (workers={workers}, lote={lote}, checkpoint={ruta})"))
+
+        pool = None
+        if workers > 1:
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+
+        inicio = time.monotonic()
+        procesadas = guardadas = 0
+        restantes = opts["limite"]
+        try:
+            while restantes is None or restantes > 0:
+                cantidad = lote if restantes is None else min(lote, restantes)
+                filas = self._pendientes(estado["ultimo_id"], list(estado["fallidas"]), cantidad)
+                if not filas:
+                    # Recorrido completo: la próxima corrida vuelve a barrer desde el inicio
+                    # (los ids son UUID aleatorios; nuevas aprobaciones pueden quedar "atrás")
+                    estado["ultimo_id"] = None
+                    self._guardar_checkpoint(ruta, estado)
+                    break
+
+                tareas = [(pk, monto, plazo, tna, fecha_primera_cuota(aprob), moneda)
+                          for pk, monto, plazo, tna, aprob, moneda in filas]
+                if pool is None:
+                    resultados = _calcular_bloque(tareas)
+                else:
+                    paso = max(1, -(-len(tareas) // workers))
+                    bloques = [tareas[i:i + paso] for i in range(0, len(tareas), paso)]
+                    resultados = [r for parte in pool.map(_calcular_bloque, bloques) for r in parte]
+
+                guardadas += self._persistir(resultados, usuario, estado)
+                procesadas += len(filas)
+                if restantes is not None:
+                    restantes -= len(filas)
+
+                estado["ultimo_id"] = str(filas[-1][0])
+                estado["procesadas"] = estado.get("procesadas", 0) + len(filas)
+                self._guardar_checkpoint(ruta, estado)
+
+                seg = time.monotonic() - inicio
+                self.stdout.write(
+                    f"  … {procesadas} procesadas | {guardadas} planes | "
+                    f"{len(estado['fallidas'])} fallidas | {guardadas / seg if seg else 0:.1f} planes/s")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        seg = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {guardadas} planes generados en {seg:.1f}s "
+            f"({guardadas / seg if seg else 0:.1f} planes/s); procesadas: {procesadas}"))
+        if estado["fallidas"]:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {len(estado['fallidas'])} fallidas (ver {ruta}; reintente con --reintentar-fallidas)"))
+            for sid, err in list(estado["fallidas"].items())[:10]:
+                self.stdout.write(f"   {sid}: {err}")
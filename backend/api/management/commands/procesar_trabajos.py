@@ -0,0 +1,119 @@
+# backend/api/management/commands/procesar_trabajos.py
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+
+from api.services import trabajos
+
+BARRIDO_SEG = 30  # cada cuánto se buscan trabajos con el plazo vencido
+
+
+def _trabajar(parar, escribir, espera, vaciar, max_trabajos, ignorar_senales=False):
+    """Bucle de un trabajador: toma, ejecuta y repite hasta `parar` (o cola vacía con `vaciar`)."""
+    if ignorar_senales:
+        # Proceso hijo: Ctrl+C/SIGTERM los atiende el padre, que avisa con `parar`
+        # cuando el trabajo en curso termina
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    nombre = f"{socket.gethostname()}:{os.getpid()}"
+    hechos = 0
+    barrido = 0.0
+    try:
+        while not parar.is_set():
+            close_old_connections()
+            try:
+                if time.monotonic() - barrido >= BARRIDO_SEG:
+                    if recuperados := trabajos.recuperar_vencidos():
+                        escribir(f"  [{nombre}] {recuperados} trabajos con plazo vencido recuperados")
+                    barrido = time.monotonic()
+                t = trabajos.tomar(nombre)
+            except DatabaseError as e:
+                # BD caída u ocupada (SQLite: 'database is locked'): esperar y volver a intentar
+                escribir(f"  [{nombre}] BD no disponible ({e}); reintento en {espera}s")
+                connections.close_all()
+                parar.wait(espera)
+                continue
+            if t is None:
+                if vaciar:
+                    break
+                parar.wait(espera)
+                continue
+            inicio = time.monotonic()
+            try:
+                estado = trabajos.ejecutar(t, nombre)
+            except DatabaseError as e:
+                # No se pudo guardar el resultado: queda EN_CURSO y se retoma al vencer el plazo
+                escribir(f"  [{nombre}] {t.tipo} {t.pk}: no se guardó el estado ({e})")
+                connections.close_all()
+                continue
+            escribir(f"  [{nombre}] {t.tipo} {t.pk} -> {estado} "
+                     f"(intento {t.intentos}/{t.max_intentos}, {time.monotonic() - inicio:.2f}s)")
+            hechos += 1
+            if max_trabajos and hechos >= max_trabajos:
+                break
+    finally:
+        connections.close_all()
+    return hechos
+
+
+class Command(BaseCommand):
+    help = ("Ejecuta los trabajos en segundo plano de la cola en BD (planes, PDF, correos). "
+            "Con --procesos N lanza N trabajadores; SIGTERM o Ctrl+C los detiene después "
+            "del trabajo en curso.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Procesos trabajadores (default: 1)')
+        parser.add_argument('--vaciar', action='store_true',
+                            help='Procesa lo disponible y termina (cron, CI) en vez de esperar trabajos nuevos')
+        parser.add_argument('--max-trabajos', type=int, default=None,
+                            help='Trabajos por proceso antes de salir (para que un supervisor lo reinicie)')
+        parser.add_argument('--espera', type=float, default=None,
+                            help="Segundos de pausa con la cola vacía (default: TRABAJOS['ESPERA_SEG'])")
+
+    def handle(self, *args, **opts):
+        procesos = max(1, opts['procesos'])
+        espera = opts['espera'] if opts['espera'] is not None else \
+            getattr(settings, 'TRABAJOS', {}).get('ESPERA_SEG', 1.0)
+        # fork: los hijos heredan Django ya configurado; cada uno abre su conexión
+        if procesos > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING("⚠️ Sin 'fork' en esta plataforma: un solo trabajador."))
+            procesos = 1
+
+        ctx = multiprocessing.get_context('fork') if procesos > 1 else None
+        parar = ctx.Event() if ctx else threading.Event()
+
+        def detener(signum, frame):
+            if not parar.is_set():
+                self.stdout.write(self.style.WARNING('⏹ Deteniendo al terminar los trabajos en curso…'))
+            parar.set()
+
+        signal.signal(signal.SIGINT, detener)
+        signal.signal(signal.SIGTERM, detener)
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 Procesando trabajos (procesos={procesos}{', vaciar' if opts['vaciar'] else ''})"))
+        argumentos = (parar, self.stdout.write, espera, opts['vaciar'], opts['max_trabajos'])
+
+        if ctx is None:
+            hechos = _trabajar(*argumentos)
+            self.stdout.write(self.style.SUCCESS(f"✅ {hechos} trabajos procesados"))
+            return
+
+        connections.close_all()
+        hijos = [ctx.Process(target=_trabajar, args=argumentos, kwargs={'ignorar_senales': True})
+                 for _ in range(procesos)]
+        for p in hijos:
+            p.start()
+        for p in hijos:
+            p.join()
+        caidos = [p.pid for p in hijos if p.exitcode]
+        if caidos:
+            self.stdout.write(self.style.ERROR(f"❌ Trabajadores terminados con error: {caidos}"))
+        self.stdout.write(self.style.SUCCESS(f"✅ {procesos} trabajadores detenidos"))
@@ -0,0 +1,20 @@
+# backend/api/management/commands/reconstruir_busqueda.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.busqueda import reconstruir
+
+
+class Command(BaseCommand):
+    help = ("Regenera desde cero el índice de búsqueda (EntradaBusqueda) de clientes, "
+            "usuarios y solicitudes. Necesario tras cargas masivas que no disparan señales.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por inserción (default: 2000)')
+
+    def handle(self, *args, **opts):
+        inicio = time.monotonic()
+        total = reconstruir(lote=opts['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Índice de búsqueda reconstruido: {total} entradas en {time.monotonic() - inicio:.1f}s"))
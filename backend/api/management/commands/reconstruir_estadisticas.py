@@ -0,0 +1,17 @@
+# backend/api/management/commands/reconstruir_estadisticas.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.estadisticas import reconstruir
+
+
+class Command(BaseCommand):
+    help = ("Reconcilia los contadores de solicitudes (EstadisticaSolicitudMensual): "
+            "los recalcula desde cero a partir de todas las solicitudes.")
+
+    def handle(self, *args, **opts):
+        inicio = time.monotonic()
+        filas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Estadísticas reconstruidas: {filas} filas en {time.monotonic() - inicio:.1f}s"))
@@ -0,0 +1,17 @@
+# backend/api/management/commands/reconstruir_proyeccion.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.proyeccion import reconstruir
+
+
+class Command(BaseCommand):
+    help = ("Recalcula desde cero el rollup mensual de cobros (ProyeccionCobroMensual) "
+            "a partir de todos los planes guardados.")
+
+    def handle(self, *args, **opts):
+        inicio = time.monotonic()
+        filas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Proyección reconstruida: {filas} filas (mes x moneda x producto) en {time.monotonic() - inicio:.1f}s"))
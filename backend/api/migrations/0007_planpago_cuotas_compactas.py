@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_documentotipo_productofinanciero_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planpago',
+            name='cuotas_compactas',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_planpago_cuotas_compactas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planpago',
+            name='tasa_nominal_anual',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=7, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_planpago_tasa_nominal_anual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProyeccionCobroMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('moneda', models.CharField(max_length=10)),
+                ('capital', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('interes', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('cuotas', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.productofinanciero')),
+            ],
+            options={
+                'db_table': 'proyeccion_cobro_mensual',
+                'ordering': ['mes', 'moneda'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('producto__isnull', False)), fields=('mes', 'moneda', 'producto'), name='proyeccion_mes_moneda_producto_uniq'), models.UniqueConstraint(condition=models.Q(('producto__isnull', True)), fields=('mes', 'moneda'), name='proyeccion_mes_moneda_sin_producto_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_proyeccioncobromensual'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentoadjunto',
+            index=models.Index(fields=['solicitud', 'documento_tipo'], name='doc_adj_solicitud_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plancuota',
+            index=models.Index(fields=['fecha_vencimiento'], name='plan_cuota_vencimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudcredito',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['cliente', '-created_at', '-id'], name='sol_cliente_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudcredito',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['estado', '-created_at', '-id'], name='sol_estado_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudcredito',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['oficial', 'estado'], name='sol_oficial_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    # GiST pg_trgm: acelera LIKE '%...%' y el orden por distancia (<<->) con LIMIT
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS busqueda_texto_trgm_idx '
+        'ON busqueda_entrada USING gist (texto gist_trgm_ops)')
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS busqueda_texto_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cliente', 'Cliente'), ('usuario', 'Usuario'), ('solicitud', 'Solicitud')], max_length=10)),
+                ('objeto_id', models.CharField(max_length=36)),
+                ('texto', models.TextField()),
+                ('titulo', models.CharField(max_length=200)),
+                ('subtitulo', models.CharField(blank=True, max_length=200)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'busqueda_entrada',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='busqueda_tipo_objeto_uniq')],
+            },
+        ),
+        migrations.RunPython(crear_indice_trigramas, borrar_indice_trigramas),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:35
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_entradabusqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaSolicitudMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('estado', models.CharField(max_length=10)),
+                ('tipo_credito', models.CharField(max_length=20)),
+                ('moneda', models.CharField(max_length=10)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('evaluadas', models.IntegerField(default=0)),
+                ('segundos_evaluacion', models.BigIntegerField(default=0)),
+                ('aprobadas', models.IntegerField(default=0)),
+                ('segundos_aprobacion', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.productofinanciero')),
+            ],
+            options={
+                'db_table': 'estadistica_solicitud_mensual',
+                'ordering': ['mes'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('producto__isnull', False)), fields=('mes', 'estado', 'producto', 'tipo_credito', 'moneda'), name='estadistica_sol_clave_uniq'), models.UniqueConstraint(condition=models.Q(('producto__isnull', True)), fields=('mes', 'estado', 'tipo_credito', 'moneda'), name='estadistica_sol_sin_prod_uniq')],
+            },
+        ),
+    ]
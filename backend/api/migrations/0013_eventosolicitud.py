@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def historial_inicial(apps, schema_editor):
+    # Historial aproximado de las solicitudes previas, con las fechas que ya se guardaban
+    SolicitudCredito = apps.get_model('api', 'SolicitudCredito')
+    EventoSolicitud = apps.get_model('api', 'EventoSolicitud')
+    PlanPago = apps.get_model('api', 'PlanPago')
+    planes = dict(PlanPago.objects.values_list('solicitud_id', 'generado_en'))
+
+    eventos = []
+    for s in SolicitudCredito.objects.order_by('created_at').iterator(chunk_size=2000):
+        inicial = s.estado if s.estado in ('DRAFT', 'ENVIADA') else 'ENVIADA'
+        propios = [EventoSolicitud(solicitud_id=s.pk, evento='CREADA', estado_nuevo=inicial, fecha=s.created_at)]
+        if s.fecha_evaluacion:
+            propios.append(EventoSolicitud(solicitud_id=s.pk, evento='ESTADO_EVALUADA', estado_anterior=inicial,
+                                           estado_nuevo='EVALUADA', fecha=s.fecha_evaluacion))
+        if s.estado in ('APROBADA', 'RECHAZADA'):
+            propios.append(EventoSolicitud(solicitud_id=s.pk, evento=f'ESTADO_{s.estado}',
+                                           estado_anterior=propios[-1].estado_nuevo, estado_nuevo=s.estado,
+                                           fecha=s.fecha_aprobacion or s.updated_at))
+        if s.pk in planes:
+            propios.append(EventoSolicitud(solicitud_id=s.pk, evento='PLAN_GENERADO', fecha=planes[s.pk]))
+        eventos.extend(propios)  # ya en orden causal: creación, evaluación, decisión, plan
+        if len(eventos) >= 2000:
+            EventoSolicitud.objects.bulk_create(eventos)
+            eventos = []
+    EventoSolicitud.objects.bulk_create(eventos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_estadisticasolicitudmensual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSolicitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento', models.CharField(max_length=30)),
+                ('estado_anterior', models.CharField(blank=True, max_length=10)),
+                ('estado_nuevo', models.CharField(blank=True, max_length=10)),
+                ('detalle', models.JSONField(blank=True, default=dict)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('solicitud', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='api.solicitudcredito')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'solicitud_evento',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['solicitud', 'id'], name='sol_evento_solicitud_idx')],
+            },
+        ),
+        migrations.RunPython(historial_inicial, migrations.RunPython.noop),
+    ]
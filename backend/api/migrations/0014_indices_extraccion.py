@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_eventosolicitud'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='planpago',
+            index=models.Index(fields=['generado_en', 'id'], name='plan_generado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudcredito',
+            index=models.Index(fields=['updated_at', 'id'], name='sol_actualizado_idx'),
+        ),
+    ]
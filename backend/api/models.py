@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 import uuid
 from decimal import Decimal
 
+from .services.plan_compacto import desempaquetar
+
 
 # Tus modelos existentes
 class Rol(models.Model):
@@ -153,6 +157,18 @@ class SolicitudCredito(models.Model):
     class Meta:
         db_table = 'solicitudes_credito'
         ordering = ['-created_at']
+        # Parciales sobre las vivas (is_deleted=False), que es lo único que se lista;
+        # el id al final es el desempate del cursor (created_at, id) de los listados
+        indexes = [
+            models.Index(fields=['cliente', '-created_at', '-id'],
+                         condition=models.Q(is_deleted=False), name='sol_cliente_creado_idx'),
+            models.Index(fields=['estado', '-created_at', '-id'],
+                         condition=models.Q(is_deleted=False), name='sol_estado_creado_idx'),
+            models.Index(fields=['oficial', 'estado'],
+                         condition=models.Q(is_deleted=False), name='sol_oficial_estado_idx'),
+            # Marca de agua de la extracción incremental (services/extraccion.py)
+            models.Index(fields=['updated_at', 'id'], name='sol_actualizado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.cliente} | {self.monto} {self.moneda} | {self.estado}"
@@ -168,11 +184,40 @@ class PlanPago(models.Model):
     total_interes = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
     total_cuotas = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
     redondeo_ajuste_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    # Tasa vigente del cronograma (cambia con un recálculo); null = la de la solicitud
+    tasa_nominal_anual = models.DecimalField(max_digits=7, decimal_places=4, null=True, blank=True)
     generado_por = models.ForeignKey(User, on_delete=models.PROTECT)
     generado_en = models.DateTimeField(auto_now_add=True)
+    # Formato compacto (services/plan_compacto.py): si tiene valor, las cuotas
+    # viven aquí y no como filas PlanCuota
+    cuotas_compactas = models.BinaryField(null=True, blank=True, editable=False)
 
     class Meta:
         db_table = 'plan_pago'
+        # Marca de agua de la extracción incremental y orden de la exportación masiva
+        indexes = [models.Index(fields=['generado_en', 'id'], name='plan_generado_idx')]
+
+    @property
+    def tasa_vigente(self):
+        if self.tasa_nominal_anual is not None:
+            return self.tasa_nominal_anual
+        return self.solicitud.tasa_nominal_anual
+
+    @property
+    def es_compacto(self):
+        return self.cuotas_compactas is not None
+
+    def iter_cuotas(self, chunk_size=None):
+        """
+        Cuotas del plan ordenadas por nro_cuota, sea cual sea el almacenamiento:
+        CuotaCompacta desde el blob o filas PlanCuota (respeta prefetch_related;
+        con chunk_size se leen por bloques con iterator()).
+        """
+        if self.es_compacto:
+            return desempaquetar(self.cuotas_compactas)
+        if chunk_size:
+            return self.cuotas.order_by('nro_cuota').iterator(chunk_size=chunk_size)
+        return iter(self.cuotas.all())
 
 class PlanCuota(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -190,6 +235,37 @@ class PlanCuota(models.Model):
         db_table = 'plan_cuota'
         unique_together = (('plan', 'nro_cuota'),)
         ordering = ['nro_cuota']
+        indexes = [
+            models.Index(fields=['fecha_vencimiento'], name='plan_cuota_vencimiento_idx'),
+        ]
+
+
+class ProyeccionCobroMensual(models.Model):
+    """
+    Rollup de cobros programados por mes de vencimiento, moneda y producto.
+    Lo mantienen incrementalmente los servicios de plan (services/proyeccion.py);
+    `reconstruir_proyeccion` lo recalcula desde cero.
+    """
+    mes = models.DateField()  # primer día del mes de vencimiento
+    moneda = models.CharField(max_length=10)
+    producto = models.ForeignKey('ProductoFinanciero', on_delete=models.PROTECT, null=True, blank=True)
+    capital = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    interes = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    cuotas = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'proyeccion_cobro_mensual'
+        ordering = ['mes', 'moneda']
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'moneda', 'producto'],
+                                    condition=models.Q(producto__isnull=False),
+                                    name='proyeccion_mes_moneda_producto_uniq'),
+            models.UniqueConstraint(fields=['mes', 'moneda'],
+                                    condition=models.Q(producto__isnull=True),
+                                    name='proyeccion_mes_moneda_sin_producto_uniq'),
+        ]
 
 # === Productos y Requisitos Documentales ===
 
@@ -246,6 +322,68 @@ class RequisitoProductoDocumento(models.Model):
     def __str__(self):
         return f'{self.producto.codigo} - {self.tipo_trabajador} - {self.documento.codigo}'
 
+class EstadisticaSolicitudMensual(models.Model):
+    """
+    Contadores de solicitudes por mes de creación, estado, producto, tipo de
+    crédito y moneda. Los actualiza services/estadisticas.py en las mismas
+    operaciones que cambian la solicitud; `reconstruir_estadisticas` los
+    recalcula desde cero. Los tiempos se guardan como suma de segundos para
+    promediar sin recorrer las solicitudes.
+    """
+    mes = models.DateField()  # primer día del mes de created_at
+    estado = models.CharField(max_length=10)
+    producto = models.ForeignKey('ProductoFinanciero', on_delete=models.PROTECT, null=True, blank=True)
+    tipo_credito = models.CharField(max_length=20)
+    moneda = models.CharField(max_length=10)
+    cantidad = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    evaluadas = models.IntegerField(default=0)
+    segundos_evaluacion = models.BigIntegerField(default=0)
+    aprobadas = models.IntegerField(default=0)
+    segundos_aprobacion = models.BigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'estadistica_solicitud_mensual'
+        ordering = ['mes']
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'estado', 'producto', 'tipo_credito', 'moneda'],
+                                    condition=models.Q(producto__isnull=False),
+                                    name='estadistica_sol_clave_uniq'),
+            models.UniqueConstraint(fields=['mes', 'estado', 'tipo_credito', 'moneda'],
+                                    condition=models.Q(producto__isnull=True),
+                                    name='estadistica_sol_sin_prod_uniq'),
+        ]
+
+
+class EventoSolicitud(models.Model):
+    """
+    Historial de una solicitud (sólo se agregan filas): creación, cambios de
+    estado y generación del plan. El id creciente es el cursor `since` de
+    /solicitudes/<id>/seguimiento/.
+    """
+    solicitud = models.ForeignKey(SolicitudCredito, on_delete=models.CASCADE,
+                                  related_name='eventos', db_index=False)  # lo cubre el índice compuesto
+    evento = models.CharField(max_length=30)
+    estado_anterior = models.CharField(max_length=10, blank=True)
+    estado_nuevo = models.CharField(max_length=10, blank=True)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    detalle = models.JSONField(default=dict, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'solicitud_evento'
+        ordering = ['id']
+        indexes = [models.Index(fields=['solicitud', 'id'], name='sol_evento_solicitud_idx')]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('EventoSolicitud es de sólo agregado: no se modifica.')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.solicitud_id} | {self.evento} | {self.fecha}"
+
 class DocumentoAdjunto(models.Model):
     solicitud = models.ForeignKey(SolicitudCredito, on_delete=models.CASCADE, related_name='documentos')
     documento_tipo = models.ForeignKey(DocumentoTipo, on_delete=models.PROTECT)
@@ -258,6 +396,95 @@ class DocumentoAdjunto(models.Model):
 
     class Meta:
         db_table = 'documento_adjunto'
+        indexes = [
+            models.Index(fields=['solicitud', 'documento_tipo'], name='doc_adj_solicitud_tipo_idx'),
+        ]
 
     def __str__(self):
         return f'{self.solicitud_id} - {self.documento_tipo.codigo}'
+
+
+class EntradaBusqueda(models.Model):
+    """
+    Índice de búsqueda del front-office: una fila por cliente, usuario (sin
+    cliente) o solicitud, con el texto normalizado sobre el que se busca.
+    Lo mantienen las señales de api/signals.py; `reconstruir_busqueda` lo
+    regenera completo. En PostgreSQL `texto` tiene un índice GiST pg_trgm.
+    """
+    TIPOS = [
+        ('cliente', 'Cliente'),
+        ('usuario', 'Usuario'),
+        ('solicitud', 'Solicitud'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    objeto_id = models.CharField(max_length=36)
+    texto = models.TextField()
+    titulo = models.CharField(max_length=200)
+    subtitulo = models.CharField(max_length=200, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'busqueda_entrada'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='busqueda_tipo_objeto_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo}:{self.objeto_id} {self.titulo}'
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo en segundo plano (cola local en BD, services/trabajos.py): lo
+    encola una vista y lo ejecuta `manage.py procesar_trabajos`. Se toman por
+    prioridad (mayor primero) y antigüedad; un fallo transitorio se reintenta
+    con espera exponencial hasta `max_intentos`. `vence_en` es el plazo del
+    trabajador que lo tomó: si muere, otro lo retoma al vencer.
+    """
+    PENDIENTE, EN_CURSO, COMPLETADO, FALLIDO = 'PENDIENTE', 'EN_CURSO', 'COMPLETADO', 'FALLIDO'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Deduplicación: un solo trabajo activo (pendiente o en curso) por (tipo, clave)
+    clave = models.CharField(max_length=100, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+    prioridad = models.SmallIntegerField(default=0)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    trabajador = models.CharField(max_length=100, blank=True)
+    vence_en = models.DateTimeField(null=True, blank=True)
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    creado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo'
+        ordering = ['-creado_en']
+        indexes = [
+            # Lo que recorre `tomar`: sólo las filas pendientes, en orden de despacho
+            models.Index(fields=['-prioridad', 'disponible_en'],
+                         condition=models.Q(estado='PENDIENTE'), name='trabajo_pendiente_idx'),
+            models.Index(fields=['vence_en'], condition=models.Q(estado='EN_CURSO'),
+                         name='trabajo_en_curso_idx'),
+            models.Index(fields=['creado_por', '-creado_en', '-id'], name='trabajo_creador_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'clave'],
+                                    condition=models.Q(estado__in=['PENDIENTE', 'EN_CURSO']) & ~models.Q(clave=''),
+                                    name='trabajo_activo_clave_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} | {self.estado} | {self.id}"
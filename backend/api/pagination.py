@@ -0,0 +1,142 @@
+# backend/api/pagination.py
+"""
+Paginación keyset (por cursor) para los listados que crecen sin límite.
+
+A diferencia de LIMIT/OFFSET, cada página filtra por la posición de la última
+fila vista — p. ej. (created_at, id) < (t, id) — así el costo no depende de la
+profundidad de la página y un INSERT concurrente no duplica ni salta filas.
+Los cursores son opacos: la posición va firmada (django.core.signing), de modo
+que el cliente no puede fabricarlos ni depender de su contenido.
+"""
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+SAL_CURSOR = 'api.pagination.cursor'
+
+
+def _conf(clave, default):
+    return getattr(settings, 'PAGINACION_KEYSET', {}).get(clave, default)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Página = {'next', 'previous', 'results'}. El orden lo define la vista con
+    `keyset_ordering` (campos únicos en conjunto, el último debe ser la PK);
+    el tamaño, ?page_size= acotado a PAGINACION_KEYSET['MAX_PAGE_SIZE'].
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.orden = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+
+        posicion, reverso = self.decode_cursor(request)
+        orden = [self._invertir(c) for c in self.orden] if reverso else list(self.orden)
+        qs = queryset.order_by(*orden)
+        if posicion is not None:
+            qs = qs.filter(self._despues_de(orden, posicion))
+
+        filas = list(qs[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverso:
+            filas.reverse()
+            self.has_next, self.has_previous = True, hay_mas
+        else:
+            self.has_next, self.has_previous = hay_mas, posicion is not None
+        self.page = filas
+        return filas
+
+    def get_page_size(self, request):
+        size = _conf('PAGE_SIZE', 50)
+        valor = request.query_params.get(self.page_size_query_param)
+        if valor:
+            try:
+                size = int(valor)
+            except ValueError:
+                pass
+        return max(1, min(size, _conf('MAX_PAGE_SIZE', 500)))
+
+    # ---- cursores ----
+    def decode_cursor(self, request):
+        crudo = request.query_params.get(self.cursor_query_param)
+        if not crudo:
+            return None, False
+        try:
+            datos = signing.loads(crudo, salt=SAL_CURSOR)
+            valores, reverso = datos['p'], bool(datos.get('r'))
+            if len(valores) != len(self.orden):
+                raise ValueError
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return valores, reverso
+
+    def encode_cursor(self, fila, reverso):
+        valores = [self._valor(fila, c.lstrip('-')) for c in self.orden]
+        cursor = signing.dumps({'p': valores, 'r': int(reverso)}, salt=SAL_CURSOR, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _valor(fila, campo):
+        # fechas en ISO (con microsegundos) y UUID como texto: el filtro los vuelve a parsear
+        valor = getattr(fila, campo)
+        if hasattr(valor, 'isoformat'):
+            return valor.isoformat()
+        return valor if isinstance(valor, (int, str)) else str(valor)
+
+    @staticmethod
+    def _invertir(campo):
+        return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+    @staticmethod
+    def _despues_de(orden, posicion):
+        """(a, b, c) > (x, y, z) en el orden dado, expandido a OR de igualdades + comparación."""
+        condicion = Q()
+        iguales = {}
+        for campo, valor in zip(orden, posicion):
+            nombre = campo.lstrip('-')
+            op = 'lt' if campo.startswith('-') else 'gt'
+            condicion |= Q(**iguales, **{f'{nombre}__{op}': valor})
+            iguales[nombre] = valor
+        return condicion
+
+    # ---- respuesta ----
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverso=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
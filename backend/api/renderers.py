@@ -0,0 +1,114 @@
+# backend/api/renderers.py
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON = 'application/x-ndjson'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    JSON delimitado por saltos de línea. Las vistas que lo aceptan devuelven
+    StreamingHttpResponse (ver respuesta_ndjson); este renderer sólo se usa
+    para negociar el Accept y para las respuestas de error (una línea).
+    """
+    media_type = NDJSON
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+# Renderers por defecto + NDJSON, para vistas con modo streaming
+RENDERERS_CON_NDJSON = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+
+class _ArchivoRenderer(BaseRenderer):
+    """
+    Para acciones de descarga que arman su propio HttpResponse: existen para que
+    ?format=pdf|xlsx pase la negociación de DRF (URL_FORMAT_OVERRIDE) en vez
+    de responder 404. Si la vista devuelve un Response (errores), va como JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+class PDFRenderer(_ArchivoRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class XLSXRenderer(_ArchivoRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class ZIPRenderer(_ArchivoRenderer):
+    media_type = 'application/zip'
+    format = 'zip'
+
+
+class CSVRenderer(_ArchivoRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ParquetRenderer(_ArchivoRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+
+class ArrowRenderer(_ArchivoRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+
+RENDERERS_EXPORTACION = [*api_settings.DEFAULT_RENDERER_CLASSES, PDFRenderer, XLSXRenderer]
+RENDERERS_EXPORTACION_MASIVA = [*api_settings.DEFAULT_RENDERER_CLASSES, XLSXRenderer, ZIPRenderer]
+RENDERERS_EXTRACCION = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, ParquetRenderer, ArrowRenderer]
+
+
+def quiere_ndjson(request):
+    """True si el cliente pidió NDJSON (Accept: application/x-ndjson o ?stream=ndjson)."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is not None and renderer.format == NDJSONRenderer.format:
+        return True
+    return request.query_params.get('stream') == 'ndjson'
+
+
+def respuesta_archivo(bloques, content_type, nombre):
+    """Descarga en streaming: los bloques (bytes) se envían a medida que se generan."""
+    resp = StreamingHttpResponse(bloques, content_type=content_type)
+    resp['Content-Disposition'] = f'attachment; filename={nombre}'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+def respuesta_ndjson(eventos):
+    """
+    StreamingHttpResponse a partir de un iterable de (tipo, dict): cada evento
+    se serializa como una línea {"tipo": ..., ...} a medida que se produce.
+    """
+    encoder = JSONEncoder(ensure_ascii=False)
+
+    def lineas():
+        for tipo, datos in eventos:
+            yield encoder.encode({'tipo': tipo, **datos}) + '\n'
+
+    resp = StreamingHttpResponse(lineas(), content_type=f'{NDJSON}; charset=utf-8')
+    resp['X-Accel-Buffering'] = 'no'  # que nginx no acumule la respuesta
+    resp['Cache-Control'] = 'no-cache'
+    return resp
@@ -7,8 +7,9 @@ from rest_framework.validators import UniqueValidator
 from .models import (
     Rol, Permiso, RolPermiso, UserProfile, Bitacora,
     Cliente, Empleado, SolicitudCredito, PlanPago, PlanCuota,
-    ProductoFinanciero, DocumentoTipo, RequisitoProductoDocumento, DocumentoAdjunto
+    ProductoFinanciero, DocumentoTipo, RequisitoProductoDocumento, DocumentoAdjunto, Trabajo
 )
+from .services.tasas_efectivas import tasas_efectivas_planes
 
 # =========================================================
 #                    USUARIOS / PERSONAS
@@ -264,11 +265,11 @@ class UserDetailSerializer(serializers.ModelSerializer):
                   'rol_nombre', 'cliente_info', 'empleado_info']
 
     def get_cliente_info(self, obj):
-        try:
-            cliente = Cliente.objects.get(user=obj)
+        # relación inversa: sin consulta extra si la vista hizo select_related('cliente')
+        cliente = getattr(obj, 'cliente', None)
+        if cliente:
             return ClienteSerializer(cliente).data
-        except Cliente.DoesNotExist:
-            return None
+        return None
 
     def get_empleado_info(self, obj):
         empleado = getattr(obj, 'empleado', None)
@@ -386,7 +387,7 @@ class PlanCuotaDTO(serializers.ModelSerializer):
 
 
 class PlanPagoDTO(serializers.ModelSerializer):
-    cuotas = PlanCuotaDTO(many=True, read_only=True)
+    cuotas = PlanCuotaDTO(many=True, read_only=True, source='iter_cuotas')
     solicitud_id = serializers.UUIDField(source='solicitud.id', read_only=True)
 
     class Meta:
@@ -394,6 +395,24 @@ class PlanPagoDTO(serializers.ModelSerializer):
         fields = ['id', 'solicitud_id', 'metodo', 'moneda', 'primera_cuota_fecha',
                   'total_capital', 'total_interes', 'total_cuotas', 'redondeo_ajuste_total', 'cuotas']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'cuotas' in self.fields:
+            # TEA / CFT (services/tasas_efectivas.py) sobre las mismas cuotas
+            tasas = tasas_efectivas_planes([instance])[0]
+            for campo in ('tea', 'cft'):
+                # mismo formato que los DecimalField (texto)
+                data[campo] = str(tasas[campo]) if tasas[campo] is not None else None
+        return data
+
+
+class PlanPagoResumenDTO(PlanPagoDTO):
+    """Cabecera del plan sin cuotas (primera línea del modo NDJSON)."""
+    cuotas = None
+
+    class Meta(PlanPagoDTO.Meta):
+        fields = [f for f in PlanPagoDTO.Meta.fields if f != 'cuotas']
+
 
 # =========================================================
 #                REGISTRO PÚBLICO (User+Cliente)
@@ -570,3 +589,16 @@ class ChecklistItemSerializer(serializers.Serializer):
     archivo_url = serializers.CharField(allow_null=True, required=False)
     fecha_emision = serializers.DateField(allow_null=True, required=False)
     documento_tipo_id = serializers.IntegerField()
+
+
+# =========================================================
+#                 TRABAJOS EN SEGUNDO PLANO
+# =========================================================
+
+class TrabajoSerializer(serializers.ModelSerializer):
+    """Estado de un trabajo, para que el cliente lo consulte hasta que termine."""
+    class Meta:
+        model = Trabajo
+        fields = ['id', 'tipo', 'estado', 'prioridad', 'intentos', 'max_intentos', 'resultado', 'error',
+                  'disponible_en', 'creado_en', 'iniciado_en', 'terminado_en']
+        read_only_fields = fields
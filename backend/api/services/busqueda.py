@@ -0,0 +1,178 @@
+# api/services/busqueda.py
+"""
+Búsqueda del front-office sobre clientes, usuarios y solicitudes.
+
+Cada objeto tiene una fila en EntradaBusqueda con su texto normalizado
+(minúsculas, sin tildes): nombre, usuario, email, documento y teléfono del
+cliente; el id de la solicitud. Las señales (api/signals.py) la actualizan al
+guardar/borrar, y `reconstruir` la regenera completa (bulk_create y otras
+escrituras masivas no disparan señales).
+
+En PostgreSQL cada término filtra con LIKE '%término%' y el orden es la
+distancia de trigramas de palabra (<<->); ambos los resuelve el índice GiST
+pg_trgm de la migración 0011, así el costo no depende del tamaño de la tabla.
+"""
+from __future__ import annotations
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from ..models import Cliente, EntradaBusqueda, SolicitudCredito
+
+MIN_CARACTERES = 3  # por debajo de un trigrama el índice no sirve
+_NO_BUSCABLE = re.compile(r"[^a-z0-9@._+-]+")
+
+# Campos que, si un save(update_fields=...) no los toca, no cambian la entrada
+CAMPOS_USUARIO = {"username", "first_name", "last_name", "email"}
+CAMPOS_CLIENTE = {"user", "tipo_documento", "numero_documento", "telefono"}
+CAMPOS_SOLICITUD = {"monto", "moneda", "estado", "is_deleted"}
+
+
+def normalizar(texto: Any) -> str:
+    """Minúsculas, sin tildes y sin signos (salvo los de emails e ids)."""
+    s = unicodedata.normalize("NFKD", str(texto or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    return " ".join(_NO_BUSCABLE.sub(" ", s).split())
+
+
+def _nombre(user: User) -> str:
+    return user.get_full_name() or user.username
+
+
+# =========================================================
+#                  ENTRADAS
+# =========================================================
+def entrada_cliente(cliente: Cliente) -> EntradaBusqueda:
+    u = cliente.user
+    digitos = re.sub(r"\D", "", cliente.telefono or "")
+    return EntradaBusqueda(
+        tipo="cliente", objeto_id=str(cliente.pk),
+        texto=normalizar(" ".join([u.first_name, u.last_name, u.username, u.email,
+                                   cliente.numero_documento, cliente.telefono, digitos])),
+        titulo=_nombre(u)[:200],
+        subtitulo=f"{cliente.tipo_documento} {cliente.numero_documento} · {cliente.telefono}"[:200],
+    )
+
+
+def entrada_usuario(user: User) -> EntradaBusqueda:
+    return EntradaBusqueda(
+        tipo="usuario", objeto_id=str(user.pk),
+        texto=normalizar(" ".join([user.first_name, user.last_name, user.username, user.email])),
+        titulo=_nombre(user)[:200],
+        subtitulo=user.email[:200],
+    )
+
+
+def entrada_solicitud(sol: SolicitudCredito) -> EntradaBusqueda:
+    return EntradaBusqueda(
+        tipo="solicitud", objeto_id=str(sol.pk),
+        texto=f"{sol.pk} {sol.pk.hex}",
+        titulo=f"Solicitud {str(sol.pk)[:8]}",
+        subtitulo=f"{sol.monto} {sol.moneda} · {sol.estado}",
+    )
+
+
+def guardar(entradas: Iterable[EntradaBusqueda]) -> None:
+    """Upsert por (tipo, objeto_id) en una sola sentencia."""
+    entradas = list(entradas)
+    if not entradas:
+        return
+    ahora = now()
+    for e in entradas:
+        e.actualizado_en = ahora
+    EntradaBusqueda.objects.bulk_create(
+        entradas, update_conflicts=True, unique_fields=["tipo", "objeto_id"],
+        update_fields=["texto", "titulo", "subtitulo", "actualizado_en"])
+
+
+def quitar(tipo: str, objeto_id: Any) -> None:
+    EntradaBusqueda.objects.filter(tipo=tipo, objeto_id=str(objeto_id)).delete()
+
+
+def indexar_cliente(cliente: Cliente) -> None:
+    # El usuario de un cliente se encuentra como cliente, no dos veces
+    guardar([entrada_cliente(cliente)])
+    quitar("usuario", cliente.user_id)
+
+
+def indexar_usuario(user: User) -> None:
+    cliente = Cliente.objects.filter(user=user).first()
+    if cliente is not None:
+        cliente.user = user
+        guardar([entrada_cliente(cliente)])
+    else:
+        guardar([entrada_usuario(user)])
+
+
+def indexar_solicitud(sol: SolicitudCredito) -> None:
+    if sol.is_deleted:
+        quitar("solicitud", sol.pk)
+    else:
+        guardar([entrada_solicitud(sol)])
+
+
+def reconstruir(lote: int = 2000) -> int:
+    """Regenera todo el índice. Retorna las entradas creadas."""
+    def entradas():
+        for c in Cliente.objects.select_related("user").iterator(chunk_size=lote):
+            yield entrada_cliente(c)
+        for u in User.objects.filter(cliente__isnull=True).iterator(chunk_size=lote):
+            yield entrada_usuario(u)
+        for s in SolicitudCredito.objects.filter(is_deleted=False).iterator(chunk_size=lote):
+            yield entrada_solicitud(s)
+
+    total = 0
+    with transaction.atomic():
+        EntradaBusqueda.objects.all().delete()
+        buffer = []
+        for e in entradas():
+            buffer.append(e)
+            if len(buffer) >= lote:
+                EntradaBusqueda.objects.bulk_create(buffer)
+                total += len(buffer)
+                buffer = []
+        if buffer:
+            EntradaBusqueda.objects.bulk_create(buffer)
+            total += len(buffer)
+    return total
+
+
+# =========================================================
+#                  CONSULTA
+# =========================================================
+def buscar(q: str, tipo: Optional[str] = None, limite: int = 20) -> List[Dict[str, Any]]:
+    """
+    Resultados [{tipo, id, titulo, subtitulo, rank}] que contienen todos los
+    términos de `q`, del más parecido al menos (rank en [0, 1]; None fuera de
+    PostgreSQL, donde se ordena por tipo y título).
+    """
+    consulta = normalizar(q)
+    if len(consulta) < MIN_CARACTERES:
+        raise ValueError(f"La búsqueda debe tener al menos {MIN_CARACTERES} caracteres.")
+
+    qs = EntradaBusqueda.objects.all()
+    if tipo:
+        qs = qs.filter(tipo=tipo)
+    for termino in consulta.split():
+        qs = qs.filter(texto__contains=termino)
+
+    campos = ["tipo", "objeto_id", "titulo", "subtitulo"]
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordDistance
+
+        qs = qs.annotate(distancia=TrigramWordDistance(consulta, "texto")).order_by("distancia", "tipo")
+        campos.append("distancia")
+    else:
+        qs = qs.order_by("tipo", "titulo")
+
+    resultados = []
+    for fila in qs.values(*campos)[:limite]:
+        distancia = fila.pop("distancia", None)
+        fila["id"] = fila.pop("objeto_id")
+        fila["rank"] = round(1 - distancia, 4) if distancia is not None else None
+        resultados.append(fila)
+    return resultados
@@ -0,0 +1,138 @@
+# api/services/centavos.py
+"""
+Aritmética de punto fijo en centavos para los cronogramas de pago.
+
+Todos los importes viajan como `int` en centavos; `Decimal` sólo aparece en
+los bordes (entrada de la API/ORM y salida de DTOs) y en los cálculos que se
+hacen UNA vez por plan (tasa mensual y cuota fija).
+
+Semántica de redondeo (la misma que el camino Decimal histórico de plan_pago):
+  - A centavos: HALF_UP, es decir, el medio centavo se aleja de cero
+    (0.005 -> 0.01, -0.005 -> -0.01).
+  - Tasa mensual r = tna / 1200 con 28 dígitos significativos (ROUND_HALF_EVEN),
+    y el producto saldo * r también se redondea a 28 dígitos antes de llevarlo
+    a centavos. `interes_centavos` reproduce ese doble redondeo con enteros,
+    por lo que el resultado es idéntico al de `q2(saldo * r)`.
+
+Nada aquí modifica el contexto decimal global del proceso: los pasos Decimal
+corren dentro de `localcontext(CONTEXTO)`.
+"""
+from __future__ import annotations
+from decimal import Context, Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP, localcontext
+from typing import Optional
+
+PREC = 28
+CONTEXTO = Context(prec=PREC, rounding=ROUND_HALF_EVEN)
+Q2 = Decimal("0.01")
+
+# Ruta rápida: con tna de hasta 4 decimales, interés (centavos) = saldo * T / DEN
+ESCALA_TNA = 10 ** 4
+DEN = 1200 * ESCALA_TNA
+_POT_PREC = 10 ** PREC
+
+
+def div_half_up(num: int, den: int) -> int:
+    """num / den redondeado al entero más cercano; el empate se aleja de cero. den > 0."""
+    q, rem = divmod(abs(num), den)
+    if 2 * rem >= den:
+        q += 1
+    return -q if num < 0 else q
+
+
+def _div_half_even(num: int, den: int) -> int:
+    """num / den (num >= 0, den > 0) redondeado al entero más cercano; el empate va al par."""
+    q, rem = divmod(num, den)
+    if 2 * rem > den or (2 * rem == den and q % 2 == 1):
+        q += 1
+    return q
+
+
+def a_centavos(x) -> int:
+    """Convierte a centavos con HALF_UP (equivale a int(q2(x) * 100))."""
+    with localcontext(CONTEXTO):
+        return int(Decimal(x).quantize(Q2, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def a_decimal(c: int) -> Decimal:
+    """Centavos -> Decimal con 2 decimales (12345 -> Decimal('123.45'))."""
+    with localcontext(CONTEXTO):
+        return Decimal(c) * Q2
+
+
+class TasaMensual:
+    """
+    r = tna / 1200 tal como la calcula Decimal con 28 dígitos.
+
+    Guarda r como coeficiente entero y exponente (r = coef * 10**exp) y, si la
+    tna tiene a lo sumo 4 decimales, T = tna * 10**4 para la ruta rápida.
+    """
+    __slots__ = ("decimal", "coef", "exp", "T", "exacta")
+
+    def __init__(self, tna):
+        with localcontext(CONTEXTO):
+            tna = Decimal(tna)
+            r = tna / Decimal("1200")
+        signo, digitos, exp = r.as_tuple()
+        coef = int("".join(map(str, digitos))) if digitos else 0
+        self.decimal = r
+        self.coef = -coef if signo else coef
+        self.exp = exp
+        self.T: Optional[int] = int(tna.scaleb(4)) if tna.as_tuple().exponent >= -4 else None
+        # r exacta (sin truncar) sii tna*10^4 / 12e6 termina: T múltiplo de 3
+        self.exacta = self.T is not None and self.T % 3 == 0
+
+    def __bool__(self):
+        return self.coef != 0
+
+
+def _interes_decimal(saldo_c: int, tasa: TasaMensual) -> int:
+    """Emula q2(saldo * r) de Decimal: producto a 28 dígitos (HALF_EVEN) y luego HALF_UP a centavos."""
+    coef = abs(saldo_c) * abs(tasa.coef)
+    exp = tasa.exp - 2  # el saldo tiene exponente -2
+    if coef >= _POT_PREC:
+        sobra = len(str(coef)) - PREC
+        coef = _div_half_even(coef, 10 ** sobra)
+        exp += sobra
+    desplaza = exp + 2  # exponente relativo a centavos
+    if desplaza >= 0:
+        cent = coef * 10 ** desplaza
+    else:
+        cent = div_half_up(coef, 10 ** -desplaza)
+    negativo = (saldo_c < 0) != (tasa.coef < 0)
+    return -cent if negativo else cent
+
+
+def interes_centavos(saldo_c: int, tasa: TasaMensual) -> int:
+    """
+    Interés del período en centavos, idéntico a q2(saldo * r).
+
+    Con tna de hasta 4 decimales el valor exacto saldo*T/DEN dista al menos
+    1/(2*DEN) centavo de cualquier medio centavo salvo empate exacto, mucho más
+    que el error del truncado a 28 dígitos; sólo los empates con r inexacta
+    necesitan la emulación completa.
+    """
+    T = tasa.T
+    if T is None or T < 0:
+        return _interes_decimal(saldo_c, tasa)
+    q, rem = divmod(abs(saldo_c) * T, DEN)
+    dos_rem = 2 * rem
+    if dos_rem == DEN and not tasa.exacta:
+        return _interes_decimal(saldo_c, tasa)
+    if dos_rem >= DEN:
+        q += 1
+    return -q if saldo_c < 0 else q
+
+
+def cuota_frances_centavos(P_c: int, tasa: TasaMensual, n: int) -> int:
+    """
+    Cuota fija (PMT) en centavos: q2(P * r / (1 - (1 + r) ** -n)), o q2(P / n) sin tasa.
+    Se calcula una sola vez por plan con Decimal en contexto local.
+    """
+    with localcontext(CONTEXTO):
+        P = a_decimal(P_c)
+        r = tasa.decimal
+        if r == 0:
+            pmt = P / n
+        else:
+            pmt = P * r / (Decimal(1) - (Decimal(1) + r) ** (-n))
+        return a_centavos(pmt)
@@ -0,0 +1,196 @@
+# api/services/estadisticas.py
+"""
+Estadísticas de solicitudes pre-agregadas (EstadisticaSolicitudMensual).
+
+Cada solicitud viva aporta a una fila (mes de creación, estado, producto,
+tipo de crédito, moneda): 1 a `cantidad`, su monto, y los segundos hasta la
+evaluación/aprobación si ya ocurrieron. Al cambiar una solicitud se resta su
+aporte anterior y se suma el nuevo:
+
+    antes = estadisticas.instantanea(sol)
+    ... modificar y guardar sol ...
+    estadisticas.registrar_cambio(antes, sol)
+
+`reconstruir` recalcula todo con el mismo `acumular`, así los contadores
+incrementales y la reconciliación no pueden divergir en la lógica.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.timezone import now
+
+from ..models import EstadisticaSolicitudMensual, SolicitudCredito
+from .centavos import a_centavos, a_decimal
+
+# (mes, estado, producto_id, tipo_credito, moneda)
+Clave = Tuple[Any, str, Optional[int], str, str]
+# [cantidad, monto (centavos), evaluadas, seg. evaluación, aprobadas, seg. aprobación]
+CAMPOS = ("cantidad", "monto_total", "evaluadas", "segundos_evaluacion", "aprobadas", "segundos_aprobacion")
+DIMENSIONES = {"estado": "estado", "producto": "producto_id", "tipo_credito": "tipo_credito", "mes": "mes"}
+
+
+def nuevos_deltas() -> Dict[Clave, List[int]]:
+    return defaultdict(lambda: [0] * len(CAMPOS))
+
+
+def _segundos(desde, hasta) -> int:
+    return max(int((hasta - desde).total_seconds()), 0)
+
+
+def acumular(deltas, v: Dict[str, Any], signo: int = 1) -> None:
+    """Suma (o resta) en `deltas` el aporte de una solicitud, dada como dict de valores."""
+    if v["is_deleted"] or v["created_at"] is None:
+        return
+    mes = timezone.localtime(v["created_at"]).date().replace(day=1)
+    d = deltas[(mes, v["estado"], v["producto_id"], v["tipo_credito"], v["moneda"])]
+    d[0] += signo
+    d[1] += signo * a_centavos(v["monto"])
+    if v["fecha_evaluacion"]:
+        d[2] += signo
+        d[3] += signo * _segundos(v["created_at"], v["fecha_evaluacion"])
+    if v["fecha_aprobacion"]:
+        d[4] += signo
+        d[5] += signo * _segundos(v["created_at"], v["fecha_aprobacion"])
+
+
+_CAMPOS_SOLICITUD = ("is_deleted", "created_at", "estado", "producto_id", "tipo_credito",
+                     "moneda", "monto", "fecha_evaluacion", "fecha_aprobacion")
+
+
+def instantanea(sol: Optional[SolicitudCredito]) -> Optional[Dict[str, Any]]:
+    """Valores que determinan el aporte de `sol`, para restarlos tras modificarla."""
+    if sol is None:
+        return None
+    return {c: getattr(sol, c) for c in _CAMPOS_SOLICITUD}
+
+
+def registrar_cambio(antes: Optional[Dict[str, Any]], despues: Optional[SolicitudCredito]) -> None:
+    """Aplica la diferencia entre la instantánea previa y el estado actual (None = no existe)."""
+    deltas = nuevos_deltas()
+    if antes is not None:
+        acumular(deltas, antes, signo=-1)
+    if despues is not None:
+        acumular(deltas, instantanea(despues))
+    aplicar_deltas(deltas)
+
+
+def registrar_cambios(pares) -> None:
+    """Como `registrar_cambio` para muchas solicitudes [(antes, despues)], con una sola escritura."""
+    deltas = nuevos_deltas()
+    for antes, despues in pares:
+        if antes is not None:
+            acumular(deltas, antes, signo=-1)
+        if despues is not None:
+            acumular(deltas, instantanea(despues))
+    aplicar_deltas(deltas)
+
+
+def aplicar_deltas(deltas) -> None:
+    deltas = {k: v for k, v in deltas.items() if any(v)}
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            _aplicar(deltas)
+    except IntegrityError:
+        # Otra transacción creó la misma fila en paralelo
+        with transaction.atomic():
+            _aplicar(deltas)
+
+
+def _aplicar(deltas) -> None:
+    filas = (EstadisticaSolicitudMensual.objects
+             .select_for_update()
+             .filter(mes__in={k[0] for k in deltas}, estado__in={k[1] for k in deltas}))
+    existentes = {(f.mes, f.estado, f.producto_id, f.tipo_credito, f.moneda): f for f in filas}
+
+    ahora = now()
+    cambiadas, nuevas = [], []
+    for clave, d in deltas.items():
+        fila = existentes.get(clave)
+        if fila is None:
+            fila = EstadisticaSolicitudMensual(mes=clave[0], estado=clave[1], producto_id=clave[2],
+                                               tipo_credito=clave[3], moneda=clave[4])
+            nuevas.append(fila)
+        else:
+            cambiadas.append(fila)
+        fila.cantidad += d[0]
+        fila.monto_total = a_decimal(a_centavos(fila.monto_total) + d[1])
+        fila.evaluadas += d[2]
+        fila.segundos_evaluacion += d[3]
+        fila.aprobadas += d[4]
+        fila.segundos_aprobacion += d[5]
+        fila.actualizado_en = ahora  # bulk_update no aplica auto_now
+
+    if cambiadas:
+        EstadisticaSolicitudMensual.objects.bulk_update(cambiadas, [*CAMPOS, "actualizado_en"])
+    if nuevas:
+        EstadisticaSolicitudMensual.objects.bulk_create(nuevas)
+
+
+def reconstruir() -> int:
+    """Recalcula todos los contadores desde las solicitudes. Retorna las filas creadas."""
+    deltas = nuevos_deltas()
+    for valores in SolicitudCredito.objects.values(*_CAMPOS_SOLICITUD).iterator(chunk_size=2000):
+        acumular(deltas, valores)
+
+    filas = [
+        EstadisticaSolicitudMensual(
+            mes=mes, estado=estado, producto_id=producto_id, tipo_credito=tipo, moneda=moneda,
+            cantidad=d[0], monto_total=a_decimal(d[1]), evaluadas=d[2], segundos_evaluacion=d[3],
+            aprobadas=d[4], segundos_aprobacion=d[5])
+        for (mes, estado, producto_id, tipo, moneda), d in deltas.items() if d[0]
+    ]
+    with transaction.atomic():
+        EstadisticaSolicitudMensual.objects.all().delete()
+        EstadisticaSolicitudMensual.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+# =========================================================
+#                  LECTURA
+# =========================================================
+def _horas(segundos, n):
+    return round(segundos / n / 3600, 2) if n else None
+
+
+def resumen(desde=None, hasta=None, moneda: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Totales agrupados por estado, producto, tipo de crédito y mes (de creación),
+    con el promedio de horas hasta la evaluación y la aprobación.
+    """
+    qs = EstadisticaSolicitudMensual.objects.all()
+    if desde is not None:
+        qs = qs.filter(mes__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(mes__lte=hasta)
+    if moneda:
+        qs = qs.filter(moneda=moneda)
+
+    sumas = {c: Sum(c) for c in CAMPOS}
+    resultado = {}
+    for nombre, campo in [("total", None), *DIMENSIONES.items()]:
+        agrupado = qs.values(*([campo, "moneda"] if campo else ["moneda"])).annotate(**sumas)
+        filas = []
+        for r in agrupado.order_by(*([campo, "moneda"] if campo else ["moneda"])):
+            if not r["cantidad"]:
+                continue
+            fila = {nombre: r[campo]} if campo else {}
+            fila.update({
+                "moneda": r["moneda"],
+                "cantidad": r["cantidad"],
+                "monto_total": a_decimal(a_centavos(r["monto_total"])),
+                "evaluadas": r["evaluadas"],
+                "horas_promedio_evaluacion": _horas(r["segundos_evaluacion"], r["evaluadas"]),
+                "aprobadas": r["aprobadas"],
+                "horas_promedio_aprobacion": _horas(r["segundos_aprobacion"], r["aprobadas"]),
+            })
+            if nombre == "mes":
+                fila["mes"] = fila["mes"].strftime("%Y-%m")
+            filas.append(fila)
+        resultado[nombre] = filas
+    return resultado
@@ -0,0 +1,160 @@
+# api/services/exportacion.py
+"""
+Exportación de planes de pago a archivos descargables.
+
+Las filas salen de PlanPago.iter_cuotas(chunk_size=...), que lee las cuotas
+por bloques (o desempaqueta el formato compacto), y se escriben con
+xlsx_streaming: ni las cuotas ni el archivo se tienen completos en memoria.
+
+La exportación masiva (varios planes) recorre los planes con iterator() y
+produce un ZIP con un PDF/XLSX por plan o un solo libro con una hoja por
+plan, ambos en streaming. Los PDF que no están en caché se renderizan en un
+pool acotado de procesos (ReportLab es CPU puro: con hilos el GIL los
+serializa), con a lo sumo EXPORTACION_PLANES['VENTANA'] planes en vuelo. Las
+cuotas se leen en el proceso principal y viajan con el plan: los procesos
+hijos sólo renderizan y escriben en la caché, nunca tocan la BD. Los hijos
+salen de un forkserver (o spawn): no son copias del proceso que atiende la
+petición, con sus conexiones a la BD y sockets abiertos; a cambio cada uno
+carga Django al arrancar, una vez por exportación.
+"""
+from __future__ import annotations
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, Optional, Sequence
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import PlanPago
+from . import pdf_procesos, plan_pdf
+from .xlsx_streaming import Negrita, ZipStreaming, xlsx_streaming
+
+CHUNK_CUOTAS = 500
+CHUNK_PLANES = 20
+BLOQUE_ARCHIVO = 64 * 1024
+CABECERA_PLAN = ("#", "Vencimiento", "Capital", "Interés", "Cuota", "Saldo")
+CABECERA_RESUMEN = ("Solicitud", "Plan", "Moneda", "Monto", "Plazo", "Primera cuota",
+                    "Capital", "Interés", "Total cuotas", "Generado")
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP = "application/zip"
+
+
+def filas_plan(plan: PlanPago, chunk_size: Optional[int] = CHUNK_CUOTAS) -> Iterator[Sequence[Any]]:
+    """
+    Encabezado, una fila por cuota, una vacía y los totales (como la exportación
+    original). chunk_size=None usa las cuotas de prefetch_related.
+    """
+    yield Negrita(CABECERA_PLAN)
+    for c in plan.iter_cuotas(chunk_size=chunk_size):
+        yield (c.nro_cuota, str(c.fecha_vencimiento), c.capital, c.interes, c.cuota, c.saldo)
+    yield ()
+    yield Negrita(("Totales", "", plan.total_capital, plan.total_interes, plan.total_cuotas, ""))
+
+
+def xlsx_plan(plan: PlanPago, chunk_size: Optional[int] = CHUNK_CUOTAS) -> Iterator[bytes]:
+    """Bloques del .xlsx de un plan, para StreamingHttpResponse."""
+    return xlsx_streaming([("Plan", filas_plan(plan, chunk_size))])
+
+
+# =========================================================
+#                  EXPORTACIÓN MASIVA
+# =========================================================
+def _conf():
+    conf = getattr(settings, "EXPORTACION_PLANES", {})
+    return conf.get("TRABAJADORES", 4), conf.get("VENTANA", 8)
+
+
+def planes(desde=None, hasta=None, oficial_id=None, producto_id=None, moneda=None):
+    """PlanPago por fecha de generación (fechas inclusive), oficial, producto y moneda."""
+    qs = PlanPago.objects.filter(solicitud__is_deleted=False)
+    if desde is not None:
+        qs = qs.filter(generado_en__date__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(generado_en__date__lte=hasta)
+    if oficial_id is not None:
+        qs = qs.filter(solicitud__oficial_id=oficial_id)
+    if producto_id is not None:
+        qs = qs.filter(solicitud__producto_id=producto_id)
+    if moneda:
+        qs = qs.filter(moneda=moneda)
+    return qs.order_by("generado_en", "pk")
+
+
+def _contexto_procesos():
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+def _pdfs(qs, trabajadores: int, ventana: int) -> Iterator[Any]:
+    """
+    (plan, ruta del PDF) en el orden de `qs`. Los que faltan en caché se
+    renderizan en el pool con a lo sumo `ventana` planes en vuelo; si el
+    consumidor abandona (cliente desconectado) se cancelan los pendientes.
+    """
+    pool = None
+    en_vuelo = deque()
+
+    def siguiente():
+        plan, pendiente = en_vuelo.popleft()
+        return plan, pendiente.result() if hasattr(pendiente, "result") else pendiente
+
+    try:
+        for plan in qs.iterator(chunk_size=CHUNK_PLANES):
+            ruta = plan_pdf.ruta(plan)
+            if ruta.exists():
+                en_vuelo.append((plan, ruta))
+            else:
+                if pool is None:  # sólo si algún plan no está en caché
+                    pool = ProcessPoolExecutor(max_workers=trabajadores, mp_context=_contexto_procesos(),
+                                               initializer=pdf_procesos.iniciar,
+                                               initargs=(dict(settings.PLAN_PDF_CACHE),))
+                cuotas = list(plan.iter_cuotas(chunk_size=CHUNK_CUOTAS))
+                en_vuelo.append((plan, pool.submit(pdf_procesos.renderizar, (plan, cuotas))))
+            if len(en_vuelo) >= ventana:
+                yield siguiente()
+        while en_vuelo:
+            yield siguiente()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _leer(plan, ruta) -> Iterator[bytes]:
+    try:
+        f = open(ruta, "rb")
+    except FileNotFoundError:  # invalidado mientras tanto (plan regenerado): se renderiza aquí
+        f = open(plan_pdf.pdf_plan(plan), "rb")
+    with f:
+        while bloque := f.read(BLOQUE_ARCHIVO):
+            yield bloque
+
+
+def zip_planes(qs, archivo: str = "pdf") -> Iterator[bytes]:
+    """ZIP en streaming con plan_<solicitud>.pdf|xlsx por plan de `qs`."""
+    zs = ZipStreaming()
+    if archivo == "xlsx":
+        for plan in qs.prefetch_related("cuotas").iterator(chunk_size=CHUNK_PLANES):
+            yield from zs.escribir(f"plan_{plan.solicitud_id}.xlsx", xlsx_plan(plan, chunk_size=None))
+    else:
+        for plan, ruta in _pdfs(qs, *_conf()):
+            yield from zs.escribir(f"plan_{plan.solicitud_id}.pdf", _leer(plan, ruta))
+    yield from zs.cerrar()
+
+
+def _filas_resumen(qs) -> Iterator[Sequence[Any]]:
+    yield Negrita(CABECERA_RESUMEN)
+    for p in qs.select_related("solicitud").iterator(chunk_size=500):
+        yield (str(p.solicitud_id), str(p.pk), p.moneda, p.solicitud.monto, p.solicitud.plazo_meses,
+               str(p.primera_cuota_fecha), p.total_capital, p.total_interes, p.total_cuotas,
+               f"{timezone.localtime(p.generado_en):%Y-%m-%d %H:%M}")
+
+
+def xlsx_planes(qs) -> Iterator[bytes]:
+    """Un libro en streaming: hoja 'Resumen' y una hoja por plan (Sol <id corto>)."""
+    def hojas():
+        yield "Resumen", _filas_resumen(qs)
+        for plan in qs.prefetch_related("cuotas").iterator(chunk_size=CHUNK_PLANES):
+            yield f"Sol {plan.solicitud_id.hex[:8]}", filas_plan(plan, chunk_size=None)
+
+    return xlsx_streaming(hojas())
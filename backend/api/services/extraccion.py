@@ -0,0 +1,285 @@
+# api/services/extraccion.py
+"""
+Extracción columnar de la cartera (solicitudes, planes y cuotas) para análisis.
+
+Cada conjunto se lee con values_list().iterator(chunk_size=FILAS_POR_LOTE): en
+PostgreSQL es un cursor del lado del servidor, así que ni la consulta ni el
+archivo se tienen completos en memoria. Las filas se agrupan en lotes que
+salen como CSV, Parquet (un row group por lote) o Arrow IPC (stream).
+
+    ext = Extraccion('planes', desde=marca_anterior)
+    for bloque in ext.bloques('parquet'):
+        ...
+    guardar(ext.hasta)   # marca para la próxima extracción incremental
+
+Extracción incremental por marca de agua: (updated_at, id) para solicitudes y
+(generado_en, id) del plan para planes y cuotas; una marca es
+'<instante UTC>,<id>'. La cota superior `hasta` se fija al crear la
+Extracción (la última fila en ese momento), así que se conoce antes de
+escribir y una segunda pasada desde ella no repite filas. Un plan
+regenerado o recalculado cambia su generado_en y vuelve a salir completo,
+con todas sus cuotas: del lado del análisis se reemplaza por plan_id.
+Los borrados físicos no se ven en una extracción incremental.
+
+updated_at y generado_en se asignan al guardar, no al confirmar: una
+transacción abierta puede confirmar después una fila con un instante anterior
+a una `hasta` ya entregada, y la pasada siguiente la saltaría. Por eso sólo
+se extraen filas con marca <= ahora - EXTRACCION_CARTERA['MARGEN_SEG'] (lo
+más reciente sale en la corrida siguiente). El margen tiene que superar la
+transacción de escritura más larga (los lotes de generar_planes_aprobados) y
+la diferencia de reloj entre servidores; una transacción que dure más que el
+margen todavía puede perder filas, y sólo una extracción completa las recupera.
+
+Parquet y Arrow requieren pyarrow (opcional: pip install pyarrow); CSV no.
+"""
+from __future__ import annotations
+import csv
+import io
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils.timezone import now
+
+from ..models import PlanCuota, PlanPago, SolicitudCredito
+from .plan_compacto import desempaquetar
+from .xlsx_streaming import SalidaBloques
+
+FILAS_POR_LOTE = 10_000
+PLANES_POR_LOTE = 500  # planes cuyas cuotas se leen juntas (conjunto 'cuotas')
+FORMATOS = ('csv', 'parquet', 'arrow')
+EXTENSIONES = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrows'}
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+class Columna(NamedTuple):
+    nombre: str
+    tipo: str             # texto | entero | decimal | fecha | instante | booleano
+    precision: int = 0    # sólo decimal
+    escala: int = 0
+
+
+def _d(nombre, precision, escala):
+    return Columna(nombre, 'decimal', precision, escala)
+
+
+# Columnas exportadas de cada conjunto, en orden (mismo orden que los values_list)
+COLUMNAS: Dict[str, Tuple[Columna, ...]] = {
+    'solicitudes': (
+        Columna('id', 'texto'), Columna('cliente_id', 'entero'), Columna('oficial_id', 'entero'),
+        Columna('producto_id', 'entero'), _d('monto', 14, 2), Columna('plazo_meses', 'entero'),
+        _d('tasa_nominal_anual', 7, 4), Columna('moneda', 'texto'), Columna('estado', 'texto'),
+        Columna('tipo_credito', 'texto'), Columna('tipo_trabajador', 'texto'), _d('score_riesgo', 5, 2),
+        Columna('fecha_evaluacion', 'instante'), Columna('fecha_aprobacion', 'instante'),
+        Columna('created_at', 'instante'), Columna('updated_at', 'instante'), Columna('is_deleted', 'booleano'),
+    ),
+    'planes': (
+        Columna('id', 'texto'), Columna('solicitud_id', 'texto'), Columna('metodo', 'texto'),
+        Columna('moneda', 'texto'), Columna('primera_cuota_fecha', 'fecha'), _d('total_capital', 16, 2),
+        _d('total_interes', 16, 2), _d('total_cuotas', 16, 2), _d('redondeo_ajuste_total', 16, 2),
+        _d('tasa_nominal_anual', 7, 4), Columna('generado_por_id', 'entero'), Columna('generado_en', 'instante'),
+    ),
+    'cuotas': (
+        Columna('plan_id', 'texto'), Columna('solicitud_id', 'texto'), Columna('plan_generado_en', 'instante'),
+        Columna('nro_cuota', 'entero'), Columna('fecha_vencimiento', 'fecha'), _d('capital', 16, 2),
+        _d('interes', 16, 2), _d('cuota', 16, 2), _d('saldo', 16, 2), _d('ajuste_redondeo', 16, 2),
+    ),
+}
+CONJUNTOS = tuple(COLUMNAS)
+
+# Modelo y campo de la marca de agua de cada conjunto
+_ORIGEN = {
+    'solicitudes': (SolicitudCredito, 'updated_at'),
+    'planes': (PlanPago, 'generado_en'),
+    'cuotas': (PlanPago, 'generado_en'),
+}
+_CAMPOS_CUOTA = ('nro_cuota', 'fecha_vencimiento', 'capital', 'interes', 'cuota', 'saldo', 'ajuste_redondeo')
+
+
+# =========================================================
+#                  MARCAS DE AGUA
+# =========================================================
+Marca = Tuple[datetime, Any]
+
+
+def formatear_marca(marca: Optional[Marca]) -> Optional[str]:
+    if marca is None:
+        return None
+    instante, pk = marca
+    return f"{instante.astimezone(dt_timezone.utc):%Y-%m-%dT%H:%M:%S.%f}Z,{pk}"
+
+
+def leer_marca(texto: Optional[str]) -> Optional[Marca]:
+    """'<instante ISO>,<id>' -> (datetime, id). ValueError si no es válida."""
+    if not texto:
+        return None
+    instante, _, pk = str(texto).partition(',')
+    momento = datetime.fromisoformat(instante)
+    if momento.tzinfo is None or not pk:
+        raise ValueError(f"Marca de agua inválida: {texto!r}")
+    return momento, uuid.UUID(pk)
+
+
+def _despues_de(campo: str, marca: Marca) -> Q:
+    return Q(**{f'{campo}__gt': marca[0]}) | Q(**{campo: marca[0], 'pk__gt': marca[1]})
+
+
+def _hasta(campo: str, marca: Marca) -> Q:
+    return Q(**{f'{campo}__lt': marca[0]}) | Q(**{campo: marca[0], 'pk__lte': marca[1]})
+
+
+def _corte() -> datetime:
+    """Instante más reciente que puede entrar en una extracción (ver el docstring del módulo)."""
+    margen = getattr(settings, 'EXTRACCION_CARTERA', {}).get('MARGEN_SEG', 300)
+    return now() - timedelta(seconds=margen)
+
+
+# =========================================================
+#                  EXTRACCIÓN
+# =========================================================
+class Extraccion:
+    """
+    Un conjunto entre la marca `desde` (excluida) y `hasta` (incluida), que es
+    la última fila anterior al corte (ahora - margen) al momento de crearla.
+    Sin filas nuevas, hasta == desde. `filas` cuenta las filas escritas por `bloques`.
+    """
+
+    def __init__(self, conjunto: str, desde: Optional[Marca] = None):
+        if conjunto not in COLUMNAS:
+            raise ValueError(f"Conjunto desconocido: {conjunto!r} (use {', '.join(CONJUNTOS)})")
+        self.conjunto = conjunto
+        self.columnas = COLUMNAS[conjunto]
+        self.desde = desde
+        modelo, self._campo = _ORIGEN[conjunto]
+        qs = modelo.objects.filter(**{f'{self._campo}__lte': _corte()})
+        if desde is not None:
+            qs = qs.filter(_despues_de(self._campo, desde))
+        ultima = qs.order_by(f'-{self._campo}', '-pk').values_list(self._campo, 'pk').first()
+        self.hasta: Optional[Marca] = ultima or desde
+        self._qs = qs.filter(_hasta(self._campo, ultima)) if ultima else qs.none()
+        self.filas = 0
+
+    def _lotes(self) -> Iterator[List[tuple]]:
+        filas = self._filas()
+        while lote := list(islice(filas, FILAS_POR_LOTE)):
+            self.filas += len(lote)
+            yield lote
+
+    def _filas(self) -> Iterator[tuple]:
+        qs = self._qs.order_by(self._campo, 'pk')
+        if self.conjunto == 'cuotas':
+            return self._filas_cuotas(qs)
+        return qs.values_list(*(c.nombre for c in self.columnas)).iterator(chunk_size=FILAS_POR_LOTE)
+
+    def _filas_cuotas(self, qs) -> Iterator[tuple]:
+        # Planes en orden de marca; las cuotas en filas se leen por bloques de
+        # planes y las compactas se desempaquetan del blob
+        planes = qs.values_list('pk', 'solicitud_id', 'generado_en', 'cuotas_compactas') \
+                   .iterator(chunk_size=PLANES_POR_LOTE)
+        while bloque := list(islice(planes, PLANES_POR_LOTE)):
+            en_filas = [p[0] for p in bloque if p[3] is None]
+            por_plan: Dict[Any, List[tuple]] = {}
+            if en_filas:
+                for plan_id, *cuota in (PlanCuota.objects.filter(plan_id__in=en_filas)
+                                        .order_by('plan_id', 'nro_cuota')
+                                        .values_list('plan_id', *_CAMPOS_CUOTA)):
+                    por_plan.setdefault(plan_id, []).append(tuple(cuota))
+            for plan_id, solicitud_id, generado_en, blob in bloque:
+                cuotas = por_plan.pop(plan_id, ()) if blob is None else (c[:7] for c in desempaquetar(blob))
+                for cuota in cuotas:
+                    yield (plan_id, solicitud_id, generado_en, *cuota)
+
+    def bloques(self, formato: str) -> Iterator[bytes]:
+        """Bytes del archivo en el formato pedido, a medida que se leen los lotes."""
+        if formato == 'csv':
+            return _csv(self.columnas, self._lotes())
+        if formato in ('parquet', 'arrow'):
+            return _arrow(self.columnas, self._lotes(), formato)
+        raise ValueError(f"Formato desconocido: {formato!r} (use {', '.join(FORMATOS)})")
+
+
+# =========================================================
+#                  ESCRITORES
+# =========================================================
+def _texto_csv(valor: Any) -> Any:
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    if isinstance(valor, datetime):
+        return valor.astimezone(dt_timezone.utc).isoformat()
+    return valor  # Decimal, date, UUID, int y str: su str() ya es el literal
+
+
+def _csv(columnas, lotes: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    w = csv.writer(buffer, lineterminator='\n')
+    w.writerow([c.nombre for c in columnas])
+    for lote in lotes:
+        w.writerows([_texto_csv(v) for v in fila] for fila in lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # sin lotes: sólo el encabezado
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured("Parquet/Arrow requieren pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def formato_disponible(formato: str) -> bool:
+    if formato not in FORMATOS:
+        return False
+    if formato == 'csv':
+        return True
+    try:
+        _pyarrow()
+    except ImproperlyConfigured:
+        return False
+    return True
+
+
+def _esquema(pa, columnas):
+    tipos = {
+        'texto': pa.string(), 'entero': pa.int64(), 'fecha': pa.date32(),
+        'instante': pa.timestamp('us', tz='UTC'), 'booleano': pa.bool_(),
+    }
+    return pa.schema([
+        pa.field(c.nombre, pa.decimal128(c.precision, c.escala) if c.tipo == 'decimal' else tipos[c.tipo])
+        for c in columnas
+    ])
+
+
+def _arrow(columnas, lotes: Iterable[List[tuple]], formato: str) -> Iterator[bytes]:
+    pa = _pyarrow()
+    esquema = _esquema(pa, columnas)
+    textos = [i for i, c in enumerate(columnas) if c.tipo == 'texto']
+    salida = SalidaBloques()
+    if formato == 'parquet':
+        escritor = pa.parquet.ParquetWriter(salida, esquema, compression='zstd')
+    else:
+        escritor = pa.ipc.new_stream(salida, esquema)
+    with escritor:
+        for lote in lotes:
+            datos = list(zip(*lote))
+            for i in textos:  # UUID -> str
+                datos[i] = [None if v is None else str(v) for v in datos[i]]
+            escritor.write_batch(pa.record_batch(
+                [pa.array(col, type=campo.type) for col, campo in zip(datos, esquema)], schema=esquema))
+            yield salida.retirar()
+    yield salida.retirar()  # pie (Parquet) / fin de stream (Arrow)
@@ -0,0 +1,63 @@
+# api/services/historial.py
+"""
+Historial de solicitudes (EventoSolicitud), sólo de agregado.
+
+Lo escriben quienes cambian la solicitud, dentro de su misma transacción:
+creación, evaluación, decisión (individual o en lote), cambios de estado por
+PATCH y generación/recálculo del plan. `seguimiento` lo lee con una sola
+consulta por rango sobre el índice (solicitud, id); `desde` es el id del
+último evento ya visto, así el cliente sólo trae lo nuevo.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..models import EventoSolicitud
+
+CREADA = 'CREADA'
+PLAN_GENERADO = 'PLAN_GENERADO'
+PLAN_REGENERADO = 'PLAN_REGENERADO'
+PLAN_RECALCULADO = 'PLAN_RECALCULADO'
+
+
+def _usuario(usuario):
+    # AnonymousUser (o ninguno) no se guarda
+    return usuario if getattr(usuario, 'pk', None) is not None else None
+
+
+def evento(solicitud_id, evento: str, usuario=None, *, anterior: str = '', nuevo: str = '',
+           detalle: Optional[Dict[str, Any]] = None) -> EventoSolicitud:
+    """Evento sin guardar, para `registrar`."""
+    return EventoSolicitud(solicitud_id=solicitud_id, evento=evento, usuario=_usuario(usuario),
+                           estado_anterior=anterior, estado_nuevo=nuevo, detalle=detalle or {})
+
+
+def cambio_estado(sol, anterior: str, usuario=None, detalle=None) -> EventoSolicitud:
+    """ESTADO_<nuevo>; también cuando se re-evalúa sin cambiar de estado."""
+    return evento(sol.pk, f'ESTADO_{sol.estado}', usuario, anterior=anterior, nuevo=sol.estado, detalle=detalle)
+
+
+def registrar(eventos: Iterable[EventoSolicitud]) -> None:
+    """Agrega los eventos en una sola sentencia."""
+    eventos = list(eventos)
+    if eventos:
+        EventoSolicitud.objects.bulk_create(eventos)
+
+
+def seguimiento(solicitud_id, desde: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Eventos de la solicitud en orden, posteriores al id `desde` si se indica."""
+    qs = EventoSolicitud.objects.filter(solicitud_id=solicitud_id)
+    if desde is not None:
+        qs = qs.filter(id__gt=desde)
+    return [
+        {
+            'id': e['id'],
+            'evento': e['evento'],
+            'fecha': e['fecha'],
+            'estado_anterior': e['estado_anterior'] or None,
+            'estado_nuevo': e['estado_nuevo'] or None,
+            'usuario': e['usuario__username'],
+            'detalle': e['detalle'],
+        }
+        for e in qs.order_by('id').values('id', 'evento', 'fecha', 'estado_anterior', 'estado_nuevo',
+                                          'usuario__username', 'detalle')
+    ]
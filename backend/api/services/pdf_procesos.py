@@ -0,0 +1,26 @@
+# api/services/pdf_procesos.py
+"""
+Punto de entrada de los procesos que renderizan PDF en la exportación masiva
+(services/exportacion.py). Con forkserver/spawn el hijo importa este módulo
+antes de tener Django cargado, así que no importa modelos a nivel de módulo:
+`iniciar` hace django.setup() y recién ahí se puede usar plan_pdf.
+"""
+
+
+def iniciar(cache_pdf):
+    """Initializer del pool: carga Django y usa la misma caché de PDF que el proceso principal."""
+    import django
+    from django.apps import apps
+    from django.conf import settings
+
+    if not apps.ready:
+        django.setup()
+    settings.PLAN_PDF_CACHE = cache_pdf
+
+
+def renderizar(plan_y_cuotas):
+    """(plan, cuotas ya leídas) -> ruta del PDF en caché; sin tocar la BD."""
+    from . import plan_pdf
+
+    plan, cuotas = plan_y_cuotas
+    return plan_pdf.pdf_plan(plan, cuotas)
@@ -0,0 +1,104 @@
+# api/services/plan_compacto.py
+"""
+Formato compacto del cronograma: todas las cuotas de un plan en un solo blob.
+
+Disposición (little-endian):
+  cabecera  b"PC" | versión (uint8) | n (uint32)
+  cuerpo    zlib( fechas[n] int32 (ordinal) | capital[n] | interes[n] |
+                  cuota[n] | saldo[n] | ajuste_redondeo[n]  (int64, centavos) )
+
+nro_cuota es implícito (1..n). Guardar por columnas hace que zlib comprima
+bien las fechas consecutivas y la cuota fija repetida.
+"""
+from __future__ import annotations
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date
+from decimal import Decimal, localcontext
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+from .centavos import CONTEXTO, Q2, a_centavos
+
+MAGIC = b"PC"
+VERSION = 1
+_CABECERA = struct.Struct("<2sBI")
+COLUMNAS = ("capital", "interes", "cuota", "saldo", "ajuste_redondeo")
+
+
+class CuotaCompacta(NamedTuple):
+    """Cuota leída del blob; mismos atributos de lectura que PlanCuota."""
+    nro_cuota: int
+    fecha_vencimiento: date
+    capital: Decimal
+    interes: Decimal
+    cuota: Decimal
+    saldo: Decimal
+    ajuste_redondeo: Decimal
+    nro_cuenta: int = 0
+
+
+def _a_le(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _desde_le(typecode: str, datos: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(datos)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _valor(c, campo):
+    return c[campo] if isinstance(c, dict) else getattr(c, campo)
+
+
+def empaquetar(cuotas: Iterable[Any]) -> bytes:
+    """
+    Empaqueta cuotas ordenadas por nro_cuota (dicts de cuotas_dto u objetos
+    con los atributos de PlanCuota) en el formato compacto.
+    """
+    cuotas = list(cuotas)
+    fechas = array("i", (_valor(c, "fecha_vencimiento").toordinal() for c in cuotas))
+    cuerpo = [_a_le(fechas)]
+    for campo in COLUMNAS:
+        cuerpo.append(_a_le(array("q", (a_centavos(_valor(c, campo)) for c in cuotas))))
+    return _CABECERA.pack(MAGIC, VERSION, len(cuotas)) + zlib.compress(b"".join(cuerpo))
+
+
+def _columnas(blob) -> List[array]:
+    blob = bytes(blob)  # psycopg entrega memoryview
+    magic, version, n = _CABECERA.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Cronograma compacto inválido (magic={magic!r}, versión={version}).")
+    cuerpo = zlib.decompress(blob[_CABECERA.size:])
+    fechas = _desde_le("i", cuerpo[:4 * n])
+    cols = [fechas]
+    pos = 4 * n
+    for _ in COLUMNAS:
+        cols.append(_desde_le("q", cuerpo[pos:pos + 8 * n]))
+        pos += 8 * n
+    return cols
+
+
+def desempaquetar(blob) -> Iterator[CuotaCompacta]:
+    """Genera las cuotas del blob en orden; los importes salen como Decimal con 2 decimales."""
+    fechas, *importes = _columnas(blob)
+    for i, ordinal in enumerate(fechas):
+        with localcontext(CONTEXTO):
+            montos = [Decimal(col[i]) * Q2 for col in importes]
+        yield CuotaCompacta(i + 1, date.fromordinal(ordinal), *montos)
+
+
+def cuotas_dto(blob) -> List[Dict[str, Any]]:
+    """Cuotas del blob como lista de dicts (mismas claves que cuotas_dto de plan_pago)."""
+    return [
+        {"nro_cuota": c.nro_cuota, "fecha_vencimiento": c.fecha_vencimiento,
+         **{campo: getattr(c, campo) for campo in COLUMNAS}}
+        for c in desempaquetar(blob)
+    ]
@@ -1,21 +1,72 @@
 # api/services/plan_pago.py
 from __future__ import annotations
-from decimal import Decimal, ROUND_HALF_UP, getcontext
-from typing import Optional, Tuple, List, Dict, Any
+import csv
+import io
+import uuid
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from calendar import monthrange
+from typing import Optional, Tuple, List, Dict, Any, Iterator
 from dateutil.relativedelta import relativedelta
 from django.utils.timezone import now
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 
 from ..models import PlanPago, PlanCuota, SolicitudCredito
+from .centavos import (
+    CONTEXTO, TasaMensual, a_centavos, a_decimal,
+    interes_centavos, cuota_frances_centavos,
+)
+from .plan_compacto import empaquetar
+from . import historial, proyeccion
 
-# Precisión alta para cálculos financieros
-getcontext().prec = 28
+# Los cálculos corren en centavos enteros (ver services/centavos.py); Decimal
+# sólo en los bordes y siempre con contexto local de 28 dígitos.
 Q2 = Decimal("0.01")
+UN_MES = relativedelta(months=+1)
 
 
 def q2(x) -> Decimal:
     """Redondeo a 2 decimales con HALF_UP."""
-    return Decimal(x).quantize(Q2, rounding=ROUND_HALF_UP)
+    with localcontext(CONTEXTO):
+        return Decimal(x).quantize(Q2, rounding=ROUND_HALF_UP)
+
+
+def _filas_centavos(P: int, n: int, tasa: TasaMensual, pmt: int) -> Iterator[Tuple[int, int, int, int, int, int]]:
+    """
+    Genera las cuotas del método francés en centavos, una a una:
+    (nro_cuota, capital, interes, cuota, saldo, ajuste_redondeo).
+    El ajuste sólo es distinto de 0 en la última cuota.
+    """
+    saldo = P
+    tot_int = 0
+    for k in range(1, n + 1):
+        if tasa:
+            interes = interes_centavos(saldo, tasa)
+            capital_k = pmt - interes
+            cuota_k = pmt
+        else:
+            interes = 0
+            capital_k = pmt
+            cuota_k = capital_k
+
+        ajuste = 0
+        # Ajuste de la última cuota para cerrar el saldo en 0.00
+        if k == n:
+            capital_k = saldo
+            cuota_k = capital_k + interes
+            # Ajuste informativo de redondeos
+            ajuste = (P + tot_int + interes) - (pmt * (n - 1) + cuota_k)
+
+        saldo -= capital_k
+        tot_int += interes
+        yield k, capital_k, interes, cuota_k, saldo, ajuste
+
+
+def _fecha_base(primera_cuota_fecha):
+    """Primera fecha de vencimiento: la indicada o, por defecto, hoy + 1 mes."""
+    if primera_cuota_fecha:
+        return primera_cuota_fecha
+    return now().date() + relativedelta(months=+1)
 
 
 def _calcular_cronograma_frances(
@@ -28,73 +79,178 @@ def _calcular_cronograma_frances(
     """
     Calcula el plan (método francés) sin tocar BD.
     Retorna (plan_dto, cuotas_dto).
+
+    El bucle trabaja en centavos enteros; los importes se convierten a Decimal
+    (2 decimales) al armar los DTOs.
     """
-    P = q2(capital)
+    P = a_centavos(capital)
     n = int(plazo_meses)
     # tasa mensual
-    r = Decimal(tna) / Decimal("1200")
+    tasa = TasaMensual(tna)
 
     # PMT:
-    if r == 0:
-        pmt = q2(P / n)
-    else:
-        pmt = q2(P * r / (Decimal(1) - (Decimal(1) + r) ** (-n)))
-
-    # Primera fecha de vencimiento
-    if primera_cuota_fecha:
-        base_date = primera_cuota_fecha
-    else:
-        base_date = now().date() + relativedelta(months=+1)
+    pmt = cuota_frances_centavos(P, tasa, n)
 
+    base_date = _fecha_base(primera_cuota_fecha)
     fecha = base_date
 
-    cuotas: List[Dict[str, Any]] = []
-    saldo = P
-    tot_cap = Decimal("0.00")
-    tot_int = Decimal("0.00")
-    ajuste_total = Decimal("0.00")
-
-    for k in range(1, n + 1):
-        interes = q2(saldo * r) if r != 0 else Decimal("0.00")
-        capital_k = q2(pmt - interes) if r != 0 else q2(P / n)
-        cuota_k = pmt if r != 0 else q2(capital_k + interes)
+    filas: List[Tuple[int, Any, int, int, int, int, int]] = []
+    tot_cap = 0
+    tot_int = 0
+    ajuste_total = 0
 
-        # Ajuste de la última cuota para cerrar el saldo en 0.00
-        if k == n:
-            capital_k = q2(saldo)
-            cuota_k = q2(capital_k + interes)
-            # Ajuste informativo de redondeos
-            ajuste_total = q2((P + tot_int + interes) - (pmt * (n - 1) + cuota_k))
-
-        saldo = q2(saldo - capital_k)
-
-        cuotas.append({
-            "nro_cuota": k,
-            "fecha_vencimiento": fecha,
-            "capital": capital_k,
-            "interes": interes,
-            "cuota": cuota_k,
-            "saldo": saldo,
-            "ajuste_redondeo": Decimal("0.00") if k < n else ajuste_total,
-        })
-
-        fecha = fecha + relativedelta(months=+1)
+    for k, capital_k, interes, cuota_k, saldo, ajuste in _filas_centavos(P, n, tasa, pmt):
+        filas.append((k, fecha, capital_k, interes, cuota_k, saldo, ajuste))
+        fecha = fecha + UN_MES
         tot_cap += capital_k
         tot_int += interes
+        ajuste_total = ajuste
+
+    # Borde Decimal: centavos -> 2 decimales (D(c) * 0.01 es exacto)
+    with localcontext(CONTEXTO):
+        cuotas: List[Dict[str, Any]] = [{
+            "nro_cuota": k,
+            "fecha_vencimiento": f,
+            "capital": Decimal(cap) * Q2,
+            "interes": Decimal(inte) * Q2,
+            "cuota": Decimal(cuo) * Q2,
+            "saldo": Decimal(sal) * Q2,
+            "ajuste_redondeo": Decimal(aju) * Q2,
+        } for k, f, cap, inte, cuo, sal, aju in filas]
 
     plan_dto = {
         "metodo": "frances",
         "moneda": moneda,
         "primera_cuota_fecha": cuotas[0]["fecha_vencimiento"] if cuotas else base_date,
-        "total_capital": q2(tot_cap),
-        "total_interes": q2(tot_int),
-        "total_cuotas": q2(tot_cap + tot_int),
-        "redondeo_ajuste_total": q2(ajuste_total),
-        "cuota" : pmt,
+        "total_capital": a_decimal(tot_cap),
+        "total_interes": a_decimal(tot_int),
+        "total_cuotas": a_decimal(tot_cap + tot_int),
+        "redondeo_ajuste_total": a_decimal(ajuste_total),
+        "cuota" : a_decimal(pmt),
     }
     return plan_dto, cuotas
 
 
+def iter_cronograma_frances(
+    capital: Decimal,
+    plazo_meses: int,
+    tna: Decimal,
+    primera_cuota_fecha=None,
+    moneda: str = "BOB",
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Versión generadora de _calcular_cronograma_frances, para respuestas en streaming.
+    Emite ("resumen", {...}) con lo conocido de antemano, luego ("cuota", {...})
+    por cada vencimiento y al final ("totales", {...}). No acumula las cuotas:
+    el costo hasta el primer elemento no depende del plazo.
+    """
+    P = a_centavos(capital)
+    n = int(plazo_meses)
+    tasa = TasaMensual(tna)
+    pmt = cuota_frances_centavos(P, tasa, n)
+    fecha = _fecha_base(primera_cuota_fecha)
+
+    yield "resumen", {
+        "metodo": "frances",
+        "moneda": moneda,
+        "primera_cuota_fecha": fecha,
+        "plazo_meses": n,
+        "cuota": a_decimal(pmt),
+    }
+
+    tot_cap = 0
+    tot_int = 0
+    ajuste_total = 0
+    for k, capital_k, interes, cuota_k, saldo, ajuste in _filas_centavos(P, n, tasa, pmt):
+        # el dict se arma dentro del contexto local, pero se entrega fuera de él
+        with localcontext(CONTEXTO):
+            fila = {
+                "nro_cuota": k,
+                "fecha_vencimiento": fecha,
+                "capital": Decimal(capital_k) * Q2,
+                "interes": Decimal(interes) * Q2,
+                "cuota": Decimal(cuota_k) * Q2,
+                "saldo": Decimal(saldo) * Q2,
+                "ajuste_redondeo": Decimal(ajuste) * Q2,
+            }
+        yield "cuota", fila
+        fecha = fecha + UN_MES
+        tot_cap += capital_k
+        tot_int += interes
+        ajuste_total = ajuste
+
+    yield "totales", {
+        "total_capital": a_decimal(tot_cap),
+        "total_interes": a_decimal(tot_int),
+        "total_cuotas": a_decimal(tot_cap + tot_int),
+        "redondeo_ajuste_total": a_decimal(ajuste_total),
+    }
+
+
+def _fecha_cuota(base_date, nro_cuota: int):
+    """
+    Fecha de vencimiento de la cuota `nro_cuota` sin recorrer las anteriores.
+    Replica el encadenado de relativedelta(months=+1): el día queda "pegado" al
+    menor fin de mes atravesado. En 24 meses siempre se cruza un febrero no
+    bisiesto, así que basta mirar esa ventana.
+    """
+    dia = base_date.day
+    for j in range(1, min(nro_cuota - 1, 24) + 1):
+        f = base_date + relativedelta(months=+j)
+        dia = min(dia, monthrange(f.year, f.month)[1])
+    return base_date.replace(day=dia) + relativedelta(months=+(nro_cuota - 1))
+
+
+def recorrer_hasta_cuota(
+    capital: Decimal,
+    plazo_meses: int,
+    tna: Decimal,
+    nro_cuota: int,
+    primera_cuota_fecha=None,
+) -> Dict[str, Any]:
+    """
+    Cuota `nro_cuota` de un plan francés sin armar el cronograma completo.
+
+    Cuesta O(nro_cuota): recorre `_filas_centavos` en enteros hasta la cuota
+    pedida, con el mismo redondeo HALF_UP por mes y el mismo ajuste de la
+    última cuota, así que el resultado es idéntico a la fila k de
+    `_calcular_cronograma_frances`. No hay atajo O(1) exacto: el saldo de la
+    fórmula de anualidad ignora el redondeo del interés de cada mes, y el error
+    acumulado (hasta medio centavo por mes, capitalizado) no se deduce de la
+    fórmula. No crea DTOs ni Decimals intermedios y la fecha sale sin encadenar
+    meses. Retorna un dict con las claves de `cuotas_dto`.
+    """
+    P = a_centavos(capital)
+    n = int(plazo_meses)
+    k = int(nro_cuota)
+    if not 1 <= k <= n:
+        raise ValueError(f"nro_cuota debe estar entre 1 y {n}.")
+    tasa = TasaMensual(tna)
+    pmt = cuota_frances_centavos(P, tasa, n)
+
+    for fila in _filas_centavos(P, n, tasa, pmt):
+        if fila[0] == k:
+            break
+    _, capital_k, interes, cuota_k, saldo, ajuste = fila
+
+    base_date = _fecha_base(primera_cuota_fecha)
+    with localcontext(CONTEXTO):
+        return {
+            "nro_cuota": k,
+            "fecha_vencimiento": _fecha_cuota(base_date, k),
+            "capital": Decimal(capital_k) * Q2,
+            "interes": Decimal(interes) * Q2,
+            "cuota": Decimal(cuota_k) * Q2,
+            "saldo": Decimal(saldo) * Q2,
+            "ajuste_redondeo": Decimal(ajuste) * Q2,
+        }
+
+
+def fecha_primera_cuota(fecha_aprobacion=None):
+    """Por defecto, 1 mes después de la aprobación (o de hoy si no hay fecha)."""
+    return (fecha_aprobacion.date() if fecha_aprobacion else now().date()) + relativedelta(months=+1)
+
+
 def generar_plan(
     solicitud: Optional[SolicitudCredito] = None,
     usuario=None,
@@ -131,10 +287,9 @@ def generar_plan(
         if solicitud.estado != 'APROBADA':
             raise ValueError("La solicitud no está APROBADA.")
 
+        plan_existente = getattr(solicitud, "plan", None)
         if persistir:
-            if overwrite and hasattr(solicitud, "plan"):
-                solicitud.plan.delete()
-            elif not overwrite and hasattr(solicitud, "plan"):
+            if not overwrite and plan_existente is not None:
                 raise ValueError("El plan ya existe. Use overwrite=True para regenerar.")
             if usuario is None:
                 raise ValueError("Para persistir el plan se requiere 'usuario'.")
@@ -144,13 +299,11 @@ def generar_plan(
         n = int(solicitud.plazo_meses)
         tasa = Decimal(solicitud.tasa_nominal_anual)
         mon = solicitud.moneda
-        # Por defecto, 1 mes después de la aprobación (o hoy si no hay fecha)
-        base_date = (solicitud.fecha_aprobacion.date() if solicitud.fecha_aprobacion else now().date()) + relativedelta(months=+1)
-        if primera_cuota_fecha:
-            base_date = primera_cuota_fecha
+        base_date = primera_cuota_fecha or fecha_primera_cuota(solicitud.fecha_aprobacion)
 
     else:
         # Modo directo (simulador u otros)
+        plan_existente = None
         if capital is None or plazo_meses is None or tna is None:
             raise ValueError("Para el modo directo se requieren: capital, plazo_meses y tna.")
         P = Decimal(capital)
@@ -173,29 +326,184 @@ def generar_plan(
         return plan_dto, cuotas_dto
 
     # --- Persistencia en BD (flujo normal)
+    compacto = _formato_compacto()
+    campos_plan = _campos_plan(plan_dto, usuario)
+    campos_plan["cuotas_compactas"] = empaquetar(cuotas_dto) if compacto else None
+    campos_plan["tasa_nominal_anual"] = tasa
+    deltas = proyeccion.nuevos_deltas()
     with transaction.atomic():
-        plan = PlanPago.objects.create(
-            solicitud=solicitud,
-            metodo=plan_dto["metodo"],
-            moneda=plan_dto["moneda"],
-            primera_cuota_fecha=plan_dto["primera_cuota_fecha"],
-            total_capital=plan_dto["total_capital"],
-            total_interes=plan_dto["total_interes"],
-            total_cuotas=plan_dto["total_cuotas"],
-            redondeo_ajuste_total=plan_dto["redondeo_ajuste_total"],
-            generado_por=usuario
-        )
-        for c in cuotas_dto:
-            PlanCuota.objects.create(
-                plan=plan,
-                nro_cuota=c["nro_cuota"],
-                fecha_vencimiento=c["fecha_vencimiento"],
-                capital=c["capital"],
-                interes=c["interes"],
-                cuota=c["cuota"],
-                saldo=c["saldo"],
-                ajuste_redondeo=c["ajuste_redondeo"],
-            )
+        if plan_existente is not None:
+            # Regenerar en sitio: sin borrado en cascada ni reinserción completa
+            anteriores = proyeccion.cuotas_guardadas(plan_existente)
+            proyeccion.acumular(deltas, anteriores, plan_existente.moneda, solicitud.producto_id, signo=-1)
+            for campo, valor in campos_plan.items():
+                setattr(plan_existente, campo, valor)
+            plan_existente.generado_en = now()
+            plan_existente.save()
+            plan = plan_existente
+            if compacto:
+                PlanCuota.objects.filter(plan=plan).delete()
+            else:
+                filas = anteriores if anteriores and isinstance(anteriores[0], PlanCuota) else []
+                _reemplazar_cuotas(plan, cuotas_dto, existentes=filas)
+        else:
+            plan = PlanPago.objects.create(solicitud=solicitud, **campos_plan)
+            if not compacto:
+                _insertar_cuotas(plan, cuotas_dto)
+        proyeccion.acumular(deltas, cuotas_dto, plan.moneda, solicitud.producto_id)
+        proyeccion.aplicar_deltas(deltas)
+        historial.registrar([historial.evento(
+            solicitud.pk, historial.PLAN_REGENERADO if plan_existente is not None else historial.PLAN_GENERADO,
+            usuario, detalle={"plan_id": str(plan.pk), "cuotas": len(cuotas_dto)})])
 
     # Compatibilidad con el uso previo (retornar plan creado)
     return plan
+
+
+# =========================================================
+#              PERSISTENCIA POR LOTES DE CUOTAS
+# =========================================================
+_CAMPOS_CUOTA = ("fecha_vencimiento", "capital", "interes", "cuota", "saldo", "ajuste_redondeo")
+
+
+def _campos_plan(plan_dto: Dict[str, Any], usuario) -> Dict[str, Any]:
+    return dict(
+        metodo=plan_dto["metodo"],
+        moneda=plan_dto["moneda"],
+        primera_cuota_fecha=plan_dto["primera_cuota_fecha"],
+        total_capital=plan_dto["total_capital"],
+        total_interes=plan_dto["total_interes"],
+        total_cuotas=plan_dto["total_cuotas"],
+        redondeo_ajuste_total=plan_dto["redondeo_ajuste_total"],
+        generado_por=usuario,
+    )
+
+
+def _nuevas_cuotas(plan: PlanPago, cuotas_dto: List[Dict[str, Any]]) -> List[PlanCuota]:
+    return [PlanCuota(plan=plan, **{k: c[k] for k in ("nro_cuota",) + _CAMPOS_CUOTA}) for c in cuotas_dto]
+
+
+def _conf_persistencia():
+    conf = getattr(settings, "PLAN_PAGO_PERSISTENCIA", {})
+    return conf.get("BATCH_SIZE", 500), conf.get("COPY_MIN_CUOTAS")
+
+
+def _formato_compacto() -> bool:
+    """FORMATO 'compacto': las cuotas se guardan empaquetadas en PlanPago.cuotas_compactas."""
+    formato = getattr(settings, "PLAN_PAGO_PERSISTENCIA", {}).get("FORMATO", "filas")
+    if formato not in ("filas", "compacto"):
+        raise ValueError(f"PLAN_PAGO_PERSISTENCIA['FORMATO'] inválido: {formato!r} (use 'filas' o 'compacto').")
+    return formato == "compacto"
+
+
+def _insertar_cuotas(plan: PlanPago, cuotas_dto: List[Dict[str, Any]]) -> None:
+    """
+    Inserta las cuotas de `plan` en bloques (bulk_create por BATCH_SIZE).
+    En PostgreSQL, a partir de COPY_MIN_CUOTAS se usa COPY: un solo viaje para
+    todo el cronograma.
+    """
+    batch_size, copy_min = _conf_persistencia()
+    if copy_min is not None and len(cuotas_dto) >= copy_min and _copy_disponible():
+        _copy_cuotas(plan, cuotas_dto)
+        return
+    PlanCuota.objects.bulk_create(_nuevas_cuotas(plan, cuotas_dto), batch_size=batch_size)
+
+
+def _copy_disponible() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cur:
+        return hasattr(cur.cursor, "copy_expert")  # psycopg2
+
+
+def _copy_cuotas(plan: PlanPago, cuotas_dto: List[Dict[str, Any]]) -> None:
+    opts = PlanCuota._meta
+    columnas = [opts.get_field(f).column for f in ("id", "plan", "nro_cuenta", "nro_cuota") + _CAMPOS_CUOTA]
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for c in cuotas_dto:
+        w.writerow([uuid.uuid4(), plan.pk, 0, c["nro_cuota"]] + [c[k] for k in _CAMPOS_CUOTA])
+    buf.seek(0)
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        connection.ops.quote_name(opts.db_table),
+        ", ".join(connection.ops.quote_name(col) for col in columnas),
+    )
+    with connection.cursor() as cur:
+        cur.cursor.copy_expert(sql, buf)
+
+
+def _reemplazar_cuotas(
+    plan: PlanPago,
+    cuotas_dto: List[Dict[str, Any]],
+    desde: int = 1,
+    existentes: Optional[List[PlanCuota]] = None,
+) -> Tuple[int, int, int]:
+    """
+    Sincroniza las cuotas guardadas (nro_cuota >= desde) con `cuotas_dto`:
+    actualiza sólo las filas que cambiaron, crea las que faltan y borra las que
+    sobran (plazo menor). `existentes` evita releer filas ya cargadas.
+    Retorna (actualizadas, creadas, borradas).
+    """
+    batch_size, _ = _conf_persistencia()
+    if existentes is None:
+        existentes = PlanCuota.objects.filter(plan=plan, nro_cuota__gte=desde)
+    por_nro = {c.nro_cuota: c for c in existentes if c.nro_cuota >= desde}
+
+    cambiadas, nuevas = [], []
+    for c in cuotas_dto:
+        fila = por_nro.pop(c["nro_cuota"], None)
+        if fila is None:
+            nuevas.append(c)
+            continue
+        if any(getattr(fila, k) != c[k] for k in _CAMPOS_CUOTA):
+            for k in _CAMPOS_CUOTA:
+                setattr(fila, k, c[k])
+            cambiadas.append(fila)
+
+    if por_nro:
+        PlanCuota.objects.filter(pk__in=[c.pk for c in por_nro.values()]).delete()
+    if cambiadas:
+        PlanCuota.objects.bulk_update(cambiadas, _CAMPOS_CUOTA, batch_size=batch_size)
+    if nuevas:
+        _insertar_cuotas(plan, nuevas)
+    return len(cambiadas), len(nuevas), len(por_nro)
+
+
+def persistir_planes_lote(planes: List[Tuple[Any, Dict[str, Any], List[Dict[str, Any]]]], usuario) -> List[PlanPago]:
+    """
+    Guarda varios planes NUEVOS en una sola transacción: un bulk_create para
+    PlanPago y bloques de bulk_create para todas sus cuotas (en formato
+    compacto las cuotas van dentro del propio PlanPago).
+    `planes` es una lista de (solicitud_id, plan_dto, cuotas_dto).
+    """
+    batch_size, _ = _conf_persistencia()
+    compacto = _formato_compacto()
+    with transaction.atomic():
+        objs = [PlanPago(solicitud_id=sid, **_campos_plan(dto, usuario),
+                         cuotas_compactas=empaquetar(cuotas_dto) if compacto else None)
+                for sid, dto, cuotas_dto in planes]
+        PlanPago.objects.bulk_create(objs, batch_size=batch_size)
+
+        productos = dict(SolicitudCredito.objects
+                         .filter(pk__in=[sid for sid, _, _ in planes])
+                         .values_list("pk", "producto_id"))
+        deltas = proyeccion.nuevos_deltas()
+        for sid, dto, cuotas_dto in planes:
+            proyeccion.acumular(deltas, cuotas_dto, dto["moneda"], productos.get(sid))
+        proyeccion.aplicar_deltas(deltas)
+        historial.registrar(
+            historial.evento(sid, historial.PLAN_GENERADO, usuario,
+                             detalle={"plan_id": str(plan.pk), "cuotas": len(cuotas_dto)})
+            for plan, (sid, _, cuotas_dto) in zip(objs, planes))
+
+        if compacto:
+            return objs
+        cuotas: List[PlanCuota] = []
+        for plan, (_, _, cuotas_dto) in zip(objs, planes):
+            cuotas.extend(_nuevas_cuotas(plan, cuotas_dto))
+            if len(cuotas) >= batch_size:
+                PlanCuota.objects.bulk_create(cuotas, batch_size=batch_size)
+                cuotas = []
+        if cuotas:
+            PlanCuota.objects.bulk_create(cuotas, batch_size=batch_size)
+    return objs
@@ -0,0 +1,296 @@
+# api/services/plan_pago_lote.py
+"""
+Motor por lotes del método francés.
+
+Calcula muchos cronogramas a la vez con aritmética entera en centavos
+vectorizada (NumPy): cada paso del bucle procesa la cuota k de TODOS los
+préstamos del lote. El resultado coincide al centavo con
+`plan_pago._calcular_cronograma_frances`, incluido `ajuste_redondeo`.
+
+Comparte el núcleo de centavos (services/centavos.py) con el cálculo
+individual: la cuota fija (PMT) se calcula una vez por préstamo y los empates
+exactos a medio centavo se resuelven con `interes_centavos`.
+"""
+from __future__ import annotations
+from decimal import Decimal, localcontext
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.utils.timezone import now
+
+from .centavos import (
+    CONTEXTO, DEN, Q2, TasaMensual, a_centavos, a_decimal,
+    interes_centavos, cuota_frances_centavos,
+)
+from .plan_pago import UN_MES, _calcular_cronograma_frances
+
+# interés en centavos = saldo_centavos * T / DEN, con T = tna * 10^4
+# préstamos por bloque: acota la memoria de las matrices (bloque x plazo)
+TAM_BLOQUE = 4096
+_LIMITE_INT64 = 2 ** 62
+
+
+def _fechas_vencimiento(base_date, n: int, cache: Dict[Any, List]) -> List:
+    """Fechas iterando relativedelta como el cálculo individual (respeta el 'día pegado' tras febrero)."""
+    fechas = cache.get(base_date)
+    if fechas is None:
+        fechas = [base_date]
+        cache[base_date] = fechas
+    while len(fechas) < n:
+        fechas.append(fechas[-1] + UN_MES)
+    return fechas
+
+
+def _cronogramas_centavos(
+    P: np.ndarray,
+    n: np.ndarray,
+    T: np.ndarray,
+    pmt: np.ndarray,
+    tasas: Sequence[TasaMensual],
+    matrices: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Núcleo vectorizado. Todas las entradas son arrays int64 (centavos / T escalada)
+    de un mismo bloque; devuelve matrices (préstamos x max(n)) en centavos.
+    Las posiciones posteriores a n de cada préstamo quedan en 0.
+    Con matrices=False sólo devuelve los vectores de totales ("total_interes", "ajuste").
+    """
+    m = len(P)
+    nmax = int(n.max()) if m else 0
+    if matrices:
+        interes = np.zeros((m, nmax), dtype=np.int64)
+        capital = np.zeros((m, nmax), dtype=np.int64)
+        cuota = np.zeros((m, nmax), dtype=np.int64)
+        saldos = np.zeros((m, nmax), dtype=np.int64)
+
+    # r exacta (sin truncar a 28 dígitos) sii T es múltiplo de 3; si no, los empates
+    # a medio centavo dependen del redondeo de Decimal y se resuelven aparte.
+    inexacta = (T % 3) != 0
+    sin_tasa = T == 0
+    saldo = P.copy()
+    tot_int = np.zeros(m, dtype=np.int64)
+    ajuste = np.zeros(m, dtype=np.int64)
+
+    for k in range(1, nmax + 1):
+        activo = n >= k
+        ultima = n == k
+
+        num = np.abs(saldo) * T
+        signo = np.sign(saldo)
+        q, rem = np.divmod(num, DEN)
+        dos_rem = 2 * rem
+        int_k = signo * (q + (dos_rem >= DEN))
+
+        empates = np.nonzero(activo & inexacta & (dos_rem == DEN))[0]
+        for i in empates:
+            int_k[i] = interes_centavos(int(saldo[i]), tasas[i])
+
+        int_k[sin_tasa] = 0
+        cap_k = np.where(sin_tasa, pmt, pmt - int_k)
+        cuo_k = np.where(sin_tasa, cap_k + int_k, pmt)
+
+        # Ajuste de la última cuota para cerrar el saldo en 0.00
+        cap_k = np.where(ultima, saldo, cap_k)
+        cuo_k = np.where(ultima, cap_k + int_k, cuo_k)
+        ajuste = np.where(ultima, (P + tot_int + int_k) - (pmt * (n - 1) + cuo_k), ajuste)
+
+        saldo = np.where(activo, saldo - cap_k, saldo)
+        tot_int = np.where(activo, tot_int + int_k, tot_int)
+
+        if matrices:
+            col = k - 1
+            interes[:, col] = np.where(activo, int_k, 0)
+            capital[:, col] = np.where(activo, cap_k, 0)
+            cuota[:, col] = np.where(activo, cuo_k, 0)
+            saldos[:, col] = np.where(activo, saldo, 0)
+
+    if not matrices:
+        return {"total_interes": tot_int, "ajuste": ajuste}
+    return {
+        "total_interes": tot_int,
+        "capital": capital,
+        "interes": interes,
+        "cuota": cuota,
+        "saldo": saldos,
+        "ajuste": ajuste,
+    }
+
+
+def _preparar(capital, plazo_meses, tna) -> Optional[Tuple[int, int, int, int, TasaMensual]]:
+    """
+    Normaliza un préstamo a enteros (P, n, T, pmt, tasa).
+    Devuelve None si no es apto para la ruta entera (tna con más de 4 decimales,
+    plazo inválido o riesgo de desborde int64): esos van por la ruta individual.
+    """
+    n = int(plazo_meses)
+    if n < 1:
+        return None
+    tasa = TasaMensual(tna)
+    T = tasa.T
+    if T is None or T < 0:
+        return None
+    P = a_centavos(capital)
+    if abs(P) * max(T, 1) >= _LIMITE_INT64:
+        return None
+    pmt = cuota_frances_centavos(P, tasa, n)
+    return P, n, T, pmt, tasa
+
+
+def iter_cronogramas_lote(
+    capitales: Sequence,
+    plazos_meses: Sequence[int],
+    tnas: Sequence,
+    primeras_cuota_fecha: Optional[Sequence] = None,
+    moneda: str = "BOB",
+    tam_bloque: int = TAM_BLOQUE,
+) -> Iterator[Tuple[int, Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Versión en streaming de `calcular_cronogramas_lote`.
+    Produce (indice, plan_dto, cuotas_dto) por préstamo; el orden de salida
+    sigue los bloques internos (agrupados por plazo), no el de entrada.
+    """
+    total = len(capitales)
+    if not (len(plazos_meses) == len(tnas) == total):
+        raise ValueError("capitales, plazos_meses y tnas deben tener la misma longitud.")
+    if primeras_cuota_fecha is not None and len(primeras_cuota_fecha) != total:
+        raise ValueError("primeras_cuota_fecha debe tener la misma longitud que capitales.")
+
+    default_date = now().date() + relativedelta(months=+1)
+    bases = [
+        (primeras_cuota_fecha[i] if primeras_cuota_fecha is not None else None) or default_date
+        for i in range(total)
+    ]
+
+    aptos: List[Tuple[int, Tuple[int, int, int, int, TasaMensual]]] = []
+    for i in range(total):
+        prep = _preparar(capitales[i], plazos_meses[i], tnas[i])
+        if prep is None:
+            plan_dto, cuotas = _calcular_cronograma_frances(
+                capital=Decimal(capitales[i]),
+                plazo_meses=int(plazos_meses[i]),
+                tna=Decimal(tnas[i]),
+                primera_cuota_fecha=bases[i],
+                moneda=moneda,
+            )
+            yield i, plan_dto, cuotas
+        else:
+            aptos.append((i, prep))
+
+    # Agrupar por plazo reduce el relleno de las matrices de cada bloque
+    aptos.sort(key=lambda item: item[1][1])
+    fechas_cache: Dict[Any, List] = {}
+
+    for ini in range(0, len(aptos), tam_bloque):
+        bloque = aptos[ini:ini + tam_bloque]
+        P = np.array([p[0] for _, p in bloque], dtype=np.int64)
+        n = np.array([p[1] for _, p in bloque], dtype=np.int64)
+        T = np.array([p[2] for _, p in bloque], dtype=np.int64)
+        pmt = np.array([p[3] for _, p in bloque], dtype=np.int64)
+        tasas = [p[4] for _, p in bloque]
+
+        res = _cronogramas_centavos(P, n, T, pmt, tasas)
+        for fila, (i, (_, n_i, _, pmt_i, _)) in enumerate(bloque):
+            fechas = _fechas_vencimiento(bases[i], n_i, fechas_cache)
+            capital = res["capital"][fila, :n_i].tolist()
+            interes = res["interes"][fila, :n_i].tolist()
+            cuota = res["cuota"][fila, :n_i].tolist()
+            saldo = res["saldo"][fila, :n_i].tolist()
+            ajuste = int(res["ajuste"][fila])
+            cero = Decimal("0.00")
+            D, c = Decimal, Q2
+            # D(x) * 0.01 es exacto y deja exponente -2 (1200 -> 12.00), como a_decimal
+            with localcontext(CONTEXTO):
+                cuotas = [{
+                    "nro_cuota": k + 1,
+                    "fecha_vencimiento": fechas[k],
+                    "capital": D(capital[k]) * c,
+                    "interes": D(interes[k]) * c,
+                    "cuota": D(cuota[k]) * c,
+                    "saldo": D(saldo[k]) * c,
+                    "ajuste_redondeo": cero if k + 1 < n_i else a_decimal(ajuste),
+                } for k in range(n_i)]
+            tot_cap = sum(capital)
+            tot_int = sum(interes)
+            plan_dto = {
+                "metodo": "frances",
+                "moneda": moneda,
+                "primera_cuota_fecha": fechas[0],
+                "total_capital": a_decimal(tot_cap),
+                "total_interes": a_decimal(tot_int),
+                "total_cuotas": a_decimal(tot_cap + tot_int),
+                "redondeo_ajuste_total": a_decimal(ajuste),
+                "cuota": a_decimal(pmt_i),
+            }
+            yield i, plan_dto, cuotas
+
+
+def calcular_cronogramas_lote(
+    capitales: Sequence,
+    plazos_meses: Sequence[int],
+    tnas: Sequence,
+    primeras_cuota_fecha: Optional[Sequence] = None,
+    moneda: str = "BOB",
+) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Calcula los planes (método francés) de un lote de préstamos sin tocar BD.
+    Retorna una lista de (plan_dto, cuotas_dto) en el mismo orden de entrada,
+    idéntica a llamar `_calcular_cronograma_frances` préstamo por préstamo.
+    """
+    resultado: List[Any] = [None] * len(capitales)
+    for i, plan_dto, cuotas in iter_cronogramas_lote(
+        capitales, plazos_meses, tnas, primeras_cuota_fecha, moneda
+    ):
+        resultado[i] = (plan_dto, cuotas)
+    return resultado
+
+
+def resumir_cronogramas_lote(
+    capitales: Sequence,
+    plazos_meses: Sequence[int],
+    tnas: Sequence,
+) -> List[Dict[str, Decimal]]:
+    """
+    Sólo los totales de cada plan (cuota, total_capital, total_interes,
+    total_cuotas, redondeo_ajuste_total), sin armar filas ni fechas.
+    Mismo orden de entrada; mismos valores que el plan_dto completo.
+    """
+    total = len(capitales)
+    if not (len(plazos_meses) == len(tnas) == total):
+        raise ValueError("capitales, plazos_meses y tnas deben tener la misma longitud.")
+    claves = ("cuota", "total_capital", "total_interes", "total_cuotas", "redondeo_ajuste_total")
+    resultado: List[Any] = [None] * total
+
+    aptos = []
+    for i in range(total):
+        prep = _preparar(capitales[i], plazos_meses[i], tnas[i])
+        if prep is None:
+            plan_dto, _ = _calcular_cronograma_frances(
+                capital=Decimal(capitales[i]),
+                plazo_meses=int(plazos_meses[i]),
+                tna=Decimal(tnas[i]),
+                primera_cuota_fecha=now().date(),
+            )
+            resultado[i] = {k: plan_dto[k] for k in claves}
+        else:
+            aptos.append((i, prep))
+
+    for ini in range(0, len(aptos), TAM_BLOQUE):
+        bloque = aptos[ini:ini + TAM_BLOQUE]
+        P = np.array([p[0] for _, p in bloque], dtype=np.int64)
+        n = np.array([p[1] for _, p in bloque], dtype=np.int64)
+        T = np.array([p[2] for _, p in bloque], dtype=np.int64)
+        pmt = np.array([p[3] for _, p in bloque], dtype=np.int64)
+        res = _cronogramas_centavos(P, n, T, pmt, [p[4] for _, p in bloque], matrices=False)
+        tot_int = res["total_interes"].tolist()
+        ajuste = res["ajuste"].tolist()
+        for fila, (i, (P_i, _, _, pmt_i, _)) in enumerate(bloque):
+            # el último capital cierra el saldo: Σ capital == P
+            resultado[i] = {
+                "cuota": a_decimal(pmt_i),
+                "total_capital": a_decimal(P_i),
+                "total_interes": a_decimal(tot_int[fila]),
+                "total_cuotas": a_decimal(P_i + tot_int[fila]),
+                "redondeo_ajuste_total": a_decimal(ajuste[fila]),
+            }
+    return resultado
@@ -0,0 +1,167 @@
+# api/services/plan_pdf.py
+"""
+PDF del plan de pagos (platypus) con caché en disco.
+
+El documento usa una plantilla de página fija (encabezado con la solicitud y
+pie con el número de página) y tablas; estilos y plantilla se arman una vez
+por proceso. Las fuentes son las Type 1 estándar (Helvetica), que no se
+cargan ni se embeben.
+
+Cada PDF se guarda en PLAN_PDF_CACHE['DIR']/<plan_id>/<generado_en>.pdf. Como
+generar_plan (overwrite) y recalcular_desde actualizan `generado_en`, un plan
+regenerado nunca reutiliza el archivo anterior; además la señal post_save de
+PlanPago (api/signals.py) borra los artefactos viejos con `invalidar`.
+"""
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle
+
+from ..models import PlanPago
+
+CHUNK_CUOTAS = 500
+FILAS_POR_TABLA = 200  # tablas cortas: partir una sola tabla enorme en páginas es cuadrático
+CABECERA = ("#", "Vencimiento", "Capital", "Interés", "Cuota", "Saldo")
+_ANCHOS = [12 * mm, 28 * mm, 32 * mm, 32 * mm, 32 * mm, 36 * mm]
+
+
+# =========================================================
+#                  PLANTILLA Y ESTILOS
+# =========================================================
+@lru_cache(maxsize=1)
+def _estilos():
+    base = getSampleStyleSheet()
+    return {
+        'titulo': ParagraphStyle('PlanTitulo', parent=base['Heading2'], fontName='Helvetica-Bold',
+                                 fontSize=13, spaceAfter=4),
+        'texto': ParagraphStyle('PlanTexto', parent=base['Normal'], fontName='Helvetica', fontSize=9, leading=12),
+        'pie': ParagraphStyle('PlanPie', parent=base['Normal'], fontName='Helvetica', fontSize=7,
+                              alignment=TA_RIGHT, textColor=colors.grey),
+        'cuotas': TableStyle([
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e2e8f0')),
+            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
+            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#94a3b8')),
+            ('TOPPADDING', (0, 0), (-1, -1), 1.5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1.5),
+        ]),
+        'totales': TableStyle([
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', 9),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#94a3b8')),
+        ]),
+    }
+
+
+class _PlantillaPlan(BaseDocTemplate):
+    """A4 con un marco de contenido, encabezado y pie dibujados en cada página."""
+
+    def __init__(self, destino, plan: PlanPago):
+        super().__init__(destino, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm,
+                         topMargin=22 * mm, bottomMargin=16 * mm,
+                         title=f"Plan de pagos {plan.solicitud_id}", author="Entidad financiera")
+        self._encabezado = f"Plan de pagos – Solicitud {plan.solicitud_id}"
+        marco = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='contenido')
+        self.addPageTemplates([PageTemplate(id='plan', frames=[marco], onPage=self._decorar)])
+
+    def _decorar(self, canvas, doc):
+        ancho, alto = A4
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 9)
+        canvas.drawString(self.leftMargin, alto - 12 * mm, self._encabezado)
+        canvas.setStrokeColor(colors.HexColor('#94a3b8'))
+        canvas.line(self.leftMargin, alto - 14 * mm, ancho - self.rightMargin, alto - 14 * mm)
+        canvas.setFont('Helvetica', 7)
+        canvas.drawRightString(ancho - self.rightMargin, 9 * mm, f"Página {doc.page}")
+        canvas.restoreState()
+
+
+def _tablas_cuotas(cuotas):
+    estilo = _estilos()['cuotas']
+    filas = []
+    for c in cuotas:
+        filas.append((c.nro_cuota, str(c.fecha_vencimiento), c.capital, c.interes, c.cuota, c.saldo))
+        if len(filas) == FILAS_POR_TABLA:
+            yield Table([CABECERA, *filas], colWidths=_ANCHOS, style=estilo, repeatRows=1)
+            filas = []
+    if filas:
+        yield Table([CABECERA, *filas], colWidths=_ANCHOS, style=estilo, repeatRows=1)
+
+
+def renderizar(plan: PlanPago, destino, cuotas=None) -> None:
+    """
+    Escribe el PDF del plan en `destino` (ruta o archivo binario). `cuotas`
+    permite pasarlas ya leídas (p. ej. para renderizar en otro hilo sin BD).
+    """
+    if cuotas is None:
+        cuotas = plan.iter_cuotas(chunk_size=CHUNK_CUOTAS)
+    e = _estilos()
+    historia = [
+        Paragraph("Plan de pagos", e['titulo']),
+        Paragraph(f"Método: {plan.metodo} · Moneda: {plan.moneda} · "
+                  f"Primera cuota: {plan.primera_cuota_fecha}", e['texto']),
+        Spacer(0, 3 * mm),
+        Table([("Capital", "Interés", "Total cuotas"),
+               (plan.total_capital, plan.total_interes, plan.total_cuotas)],
+              colWidths=[40 * mm] * 3, style=e['totales'], hAlign='LEFT'),
+        Spacer(0, 5 * mm),
+        *_tablas_cuotas(cuotas),
+        Spacer(0, 3 * mm),
+        Paragraph(f"Generado: {timezone.localtime(plan.generado_en):%Y-%m-%d %H:%M}", e['pie']),
+    ]
+    _PlantillaPlan(destino, plan).build(historia)
+
+
+# =========================================================
+#                  CACHÉ EN DISCO
+# =========================================================
+def _directorio(plan_id) -> Path:
+    return Path(settings.PLAN_PDF_CACHE['DIR']) / str(plan_id)
+
+
+def ruta(plan: PlanPago) -> Path:
+    """Artefacto de esta versión del plan (id + generado_en)."""
+    return _directorio(plan.pk) / f"{plan.generado_en:%Y%m%dT%H%M%S%f}.pdf"
+
+
+def pdf_plan(plan: PlanPago, cuotas=None) -> Path:
+    """
+    Ruta al PDF del plan, renderizándolo sólo si no está en caché. Se escribe
+    en un temporal y se renombra: una descarga concurrente nunca ve un
+    archivo a medias.
+    """
+    destino = ruta(plan)
+    if destino.exists():
+        return destino
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            renderizar(plan, f, cuotas)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    for viejo in destino.parent.glob('*.pdf'):
+        if viejo != destino:
+            viejo.unlink(missing_ok=True)
+    return destino
+
+
+def invalidar(plan_id) -> None:
+    """Borra los PDF en caché de un plan (regenerado o eliminado)."""
+    shutil.rmtree(_directorio(plan_id), ignore_errors=True)
@@ -0,0 +1,205 @@
+# api/services/plan_recalculo.py
+"""
+Recálculo incremental de un plan persistido a partir de la cuota k.
+
+Casos: prepago parcial, cambio de plazo y cambio de tasa. Las cuotas 1..k-1 no
+se tocan: se parte del saldo guardado en la cuota k-1 (con k=1, del monto
+de la solicitud), se recalcula sólo la
+cola (método francés sobre el saldo restante) y se escriben únicamente las
+filas que cambiaron.
+"""
+from __future__ import annotations
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils.timezone import now
+
+from ..models import PlanPago, PlanCuota
+from .centavos import CONTEXTO, Q2, TasaMensual, a_centavos, a_decimal, cuota_frances_centavos
+from .plan_compacto import cuotas_dto as _cuotas_compactas, empaquetar
+from .plan_pago import UN_MES, _filas_centavos, _reemplazar_cuotas
+from . import historial, proyeccion
+
+# Límites de PlanPago.tasa_nominal_anual: DecimalField(max_digits=7, decimal_places=4)
+TNA_Q = Decimal("0.0001")
+TNA_MAX = Decimal("1000")
+
+
+def _cola(saldo_c: int, meses: int, tna, desde: int, fecha, pmt: Optional[int] = None):
+    """
+    Cuotas desde..desde+meses-1 de un francés sobre saldo_c, como cuotas_dto.
+    Con `pmt` se conserva esa cuota fija en vez de recalcularla sobre el saldo.
+    """
+    if saldo_c == 0 or meses <= 0:
+        return []
+    tasa = TasaMensual(tna)
+    if pmt is None:
+        pmt = cuota_frances_centavos(saldo_c, tasa, meses)
+    cuotas = []
+    with localcontext(CONTEXTO):
+        for j, cap, inte, cuo, sal, aju in _filas_centavos(saldo_c, meses, tasa, pmt):
+            cuotas.append({
+                "nro_cuota": desde + j - 1,
+                "fecha_vencimiento": fecha,
+                "capital": Decimal(cap) * Q2,
+                "interes": Decimal(inte) * Q2,
+                "cuota": Decimal(cuo) * Q2,
+                "saldo": Decimal(sal) * Q2,
+                "ajuste_redondeo": Decimal(aju) * Q2,
+            })
+            fecha = fecha + UN_MES
+    return cuotas
+
+
+def _tna_valida(tna) -> Decimal:
+    """
+    La tasa tal como se guardará en PlanPago.tasa_nominal_anual (7 dígitos, 4
+    decimales): la cola se calcula con este mismo valor. ValueError si no entra.
+    """
+    try:
+        with localcontext(CONTEXTO):
+            valor = Decimal(str(tna))
+            if not valor.is_finite():
+                raise ValueError
+            valor = valor.quantize(TNA_Q, rounding=ROUND_HALF_UP)
+    except (ArithmeticError, ValueError):
+        raise ValueError("Tasa nominal anual inválida.") from None
+    if valor < 0:
+        raise ValueError("La tasa no puede ser negativa.")
+    if valor >= TNA_MAX:
+        raise ValueError(f"La tasa debe ser menor que {TNA_MAX}.")
+    return valor
+
+
+def recalcular_desde(
+    plan: PlanPago,
+    desde_cuota: int,
+    *,
+    prepago=None,
+    plazo_meses: Optional[int] = None,
+    tna=None,
+    usuario=None,
+) -> Dict[str, Any]:
+    """
+    Recalcula el plan desde la cuota `desde_cuota` (k) en adelante.
+
+      - prepago: capital abonado entre la cuota k-1 y la k; reduce el saldo y,
+        con el mismo plazo, la cuota.
+      - plazo_meses: nuevo plazo TOTAL del plan (default: el actual).
+      - tna: nueva tasa nominal anual desde la cuota k (default: la vigente),
+        redondeada a 4 decimales como se guarda.
+
+    Las cuotas 1..k-1 quedan intactas; en formato por filas sólo se escriben
+    las filas de la cola que cambian. Los totales del plan pasan a ser la suma
+    de las cuotas (el prepago no es una cuota). Los prepagos no se guardan
+    aparte: recalcular desde una cuota k' <= k de un prepago anterior lo descarta.
+    Retorna {'plan', 'actualizadas', 'creadas', 'borradas'}.
+    """
+    k = int(desde_cuota)
+    if tna is not None:
+        tna = _tna_valida(tna)
+    prepago_c = a_centavos(prepago) if prepago is not None else 0
+    if prepago_c < 0:
+        raise ValueError("El prepago no puede ser negativo.")
+
+    with transaction.atomic():
+        # Bloquea el plan: dos recálculos simultáneos no deben pisarse
+        plan = PlanPago.objects.select_for_update(of=('self',)).select_related('solicitud').get(pk=plan.pk)
+        tna_vigente = Decimal(plan.tasa_vigente)
+        if tna is None:
+            tna = tna_vigente
+
+        if plan.es_compacto:
+            todas = _cuotas_compactas(plan.cuotas_compactas)
+            n_actual = len(todas)
+            previas = todas[:max(k - 1, 0)]
+            cap_prev = sum(a_centavos(c["capital"]) for c in previas)
+            int_prev = sum(a_centavos(c["interes"]) for c in previas)
+            anterior = previas[-1] if previas else None
+            actual = todas[k - 1] if 1 <= k <= n_actual else None
+            existentes = None
+        else:
+            qs = PlanCuota.objects.filter(plan=plan)
+            agg = qs.aggregate(
+                n=Max("nro_cuota"),
+                cap_prev=Sum("capital", filter=Q(nro_cuota__lt=k)),
+                int_prev=Sum("interes", filter=Q(nro_cuota__lt=k)),
+                previas=Count("pk", filter=Q(nro_cuota__lt=k)),
+            )
+            n_actual = agg["n"] or 0
+            cap_prev = a_centavos(agg["cap_prev"] or 0)
+            int_prev = a_centavos(agg["int_prev"] or 0)
+            # cuota k-1 (saldo de partida) y la cola actual en una sola lectura
+            existentes = list(qs.filter(nro_cuota__gte=k - 1))
+            anterior = next((c for c in existentes if c.nro_cuota == k - 1), None)
+            actual = next((c for c in existentes if c.nro_cuota == k), None)
+
+        if not 1 <= k <= n_actual:
+            raise ValueError(f"desde_cuota debe estar entre 1 y {n_actual}.")
+        if not plan.es_compacto and k > 1 and agg["previas"] != k - 1:
+            raise ValueError("El plan guardado tiene cuotas faltantes; regenérelo.")
+
+        if anterior is None:
+            # Capital desembolsado. No sirve total_capital: tras un prepago es la
+            # suma de las cuotas, que no incluye lo prepagado
+            saldo_c = a_centavos(plan.solicitud.monto)
+            fecha = plan.primera_cuota_fecha
+        else:
+            saldo_c = a_centavos(anterior["saldo"] if isinstance(anterior, dict) else anterior.saldo)
+            f_ant = anterior["fecha_vencimiento"] if isinstance(anterior, dict) else anterior.fecha_vencimiento
+            fecha = f_ant + UN_MES
+
+        if prepago_c > saldo_c:
+            raise ValueError("El prepago supera el saldo pendiente.")
+        saldo_c -= prepago_c
+
+        n_nuevo = int(plazo_meses) if plazo_meses is not None else n_actual
+        meses = n_nuevo - (k - 1)
+        if meses < 1 and saldo_c > 0:
+            raise ValueError(f"plazo_meses debe ser mayor que {k - 1}.")
+
+        # Sin cambios de condiciones se conserva la cuota fija vigente: recalcularla
+        # sobre el saldo redondeado puede moverla un centavo y tocar toda la cola
+        pmt = None
+        if prepago_c == 0 and n_nuevo == n_actual and tna == tna_vigente:
+            pmt = a_centavos(actual["cuota"] if isinstance(actual, dict) else actual.cuota)
+
+        cola = _cola(saldo_c, meses, tna, k, fecha, pmt)
+
+        tot_cap = cap_prev + sum(a_centavos(c["capital"]) for c in cola)
+        tot_int = int_prev + sum(a_centavos(c["interes"]) for c in cola)
+        plan.total_capital = a_decimal(tot_cap)
+        plan.total_interes = a_decimal(tot_int)
+        plan.total_cuotas = a_decimal(tot_cap + tot_int)
+        plan.redondeo_ajuste_total = cola[-1]["ajuste_redondeo"] if cola else a_decimal(0)
+        plan.tasa_nominal_anual = tna
+        plan.generado_en = now()
+        if usuario is not None:
+            plan.generado_por = usuario
+
+        # Rollup mensual: sale la cola anterior, entra la nueva
+        deltas = proyeccion.nuevos_deltas()
+        cola_anterior = todas[k - 1:] if plan.es_compacto else [c for c in existentes if c.nro_cuota >= k]
+        producto_id = plan.solicitud.producto_id
+        proyeccion.acumular(deltas, cola_anterior, plan.moneda, producto_id, signo=-1)
+        proyeccion.acumular(deltas, cola, plan.moneda, producto_id)
+        proyeccion.aplicar_deltas(deltas)
+
+        if plan.es_compacto:
+            # Un solo blob: se reescribe entero, pero sin filas que tocar
+            nuevas = previas + cola
+            plan.cuotas_compactas = empaquetar(nuevas)
+            cambios = (sum(1 for a, b in zip(todas[k - 1:], cola) if a != b),
+                       max(len(cola) - (n_actual - k + 1), 0),
+                       max((n_actual - k + 1) - len(cola), 0))
+        else:
+            cambios = _reemplazar_cuotas(plan, cola, desde=k, existentes=existentes)
+        plan.save()
+        historial.registrar([historial.evento(
+            plan.solicitud_id, historial.PLAN_RECALCULADO, usuario,
+            detalle={"plan_id": str(plan.pk), "desde_cuota": k})])
+
+    actualizadas, creadas, borradas = cambios
+    return {"plan": plan, "actualizadas": actualizadas, "creadas": creadas, "borradas": borradas}
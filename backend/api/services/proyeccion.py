@@ -0,0 +1,165 @@
+# api/services/proyeccion.py
+"""
+Proyección de cobros de la cartera: rollup mensual (ProyeccionCobroMensual)
+por mes de vencimiento, moneda y producto.
+
+Los servicios que escriben cuotas (generar_plan, persistir_planes_lote,
+recalcular_desde) acumulan la diferencia entre las cuotas que salen y las que
+entran con `acumular` y la aplican con `aplicar_deltas` dentro de su misma
+transacción. Los planes borrados (directamente o en cascada con su solicitud)
+se restan con `quitar_plan` desde el pre_delete de PlanPago (api/signals.py),
+dentro de la transacción del borrado. Sólo un borrado por SQL crudo dejaría
+el rollup desfasado; `reconstruir` lo corrige.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import now
+
+from ..models import PlanCuota, PlanPago, ProyeccionCobroMensual, SolicitudCredito
+from .centavos import a_centavos, a_decimal
+from .plan_compacto import desempaquetar
+
+Clave = Tuple[Any, str, Optional[int]]  # (mes, moneda, producto_id)
+
+
+def nuevos_deltas() -> Dict[Clave, List[int]]:
+    """{(mes, moneda, producto_id): [capital, interes, cuotas]} con importes en centavos."""
+    return defaultdict(lambda: [0, 0, 0])
+
+
+def _valor(c, campo):
+    return c[campo] if isinstance(c, dict) else getattr(c, campo)
+
+
+def acumular(deltas, cuotas: Iterable[Any], moneda: str, producto_id: Optional[int], signo: int = 1) -> None:
+    """Suma (signo=1) o resta (signo=-1) las cuotas dadas (dicts o PlanCuota) en `deltas`."""
+    for c in cuotas:
+        d = deltas[(_valor(c, "fecha_vencimiento").replace(day=1), moneda, producto_id)]
+        d[0] += signo * a_centavos(_valor(c, "capital"))
+        d[1] += signo * a_centavos(_valor(c, "interes"))
+        d[2] += signo
+
+
+def cuotas_guardadas(plan: PlanPago) -> List[Any]:
+    """Cuotas actuales del plan (filas PlanCuota o CuotaCompacta) para restarlas antes de reemplazarlas."""
+    if plan.es_compacto:
+        return list(desempaquetar(plan.cuotas_compactas))
+    return list(PlanCuota.objects.filter(plan=plan))
+
+
+def quitar_plan(plan: PlanPago) -> None:
+    """Resta del rollup todas las cuotas de un plan que se está por borrar."""
+    deltas = nuevos_deltas()
+    producto_id = (SolicitudCredito.objects.filter(pk=plan.solicitud_id)
+                   .values_list("producto_id", flat=True).first())
+    acumular(deltas, cuotas_guardadas(plan), plan.moneda, producto_id, signo=-1)
+    aplicar_deltas(deltas)
+
+
+def aplicar_deltas(deltas) -> None:
+    """Aplica los deltas al rollup: actualiza las filas existentes y crea las que falten."""
+    deltas = {k: v for k, v in deltas.items() if any(v)}
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            _aplicar(deltas)
+    except IntegrityError:
+        # Otra transacción creó la misma fila (mes, moneda, producto) en paralelo
+        with transaction.atomic():
+            _aplicar(deltas)
+
+
+def _aplicar(deltas) -> None:
+    meses = {k[0] for k in deltas}
+    monedas = {k[1] for k in deltas}
+    filas = (ProyeccionCobroMensual.objects
+             .select_for_update()
+             .filter(mes__in=meses, moneda__in=monedas))
+    existentes = {(f.mes, f.moneda, f.producto_id): f for f in filas}
+
+    ahora = now()
+    cambiadas, nuevas, vacias = [], [], []
+    for clave, (cap, inte, n) in deltas.items():
+        fila = existentes.get(clave)
+        if fila is None:
+            fila = ProyeccionCobroMensual(mes=clave[0], moneda=clave[1], producto_id=clave[2])
+            nuevas.append(fila)
+        elif fila.cuotas + n == 0:
+            # Ya no vence nada ese mes (plan regenerado o acortado): reconstruir() no tendría la fila
+            vacias.append(fila.pk)
+            continue
+        else:
+            cambiadas.append(fila)
+        fila.capital = a_decimal(a_centavos(fila.capital) + cap)
+        fila.interes = a_decimal(a_centavos(fila.interes) + inte)
+        fila.total = a_decimal(a_centavos(fila.capital) + a_centavos(fila.interes))
+        fila.cuotas += n
+        fila.actualizado_en = ahora  # bulk_update no aplica auto_now
+
+    if vacias:
+        ProyeccionCobroMensual.objects.filter(pk__in=vacias).delete()
+    if cambiadas:
+        ProyeccionCobroMensual.objects.bulk_update(
+            cambiadas, ["capital", "interes", "total", "cuotas", "actualizado_en"])
+    if nuevas:
+        ProyeccionCobroMensual.objects.bulk_create(nuevas)
+
+
+def reconstruir() -> int:
+    """Recalcula el rollup completo desde los planes guardados. Retorna las filas creadas."""
+    deltas = nuevos_deltas()
+    por_filas = (PlanCuota.objects
+                 .filter(plan__cuotas_compactas__isnull=True)
+                 .annotate(mes=TruncMonth("fecha_vencimiento"))
+                 .values("mes", "plan__moneda", "plan__solicitud__producto_id")
+                 .annotate(capital=Sum("capital"), interes=Sum("interes"), n=Count("pk"))
+                 .order_by())
+    for r in por_filas:
+        d = deltas[(r["mes"], r["plan__moneda"], r["plan__solicitud__producto_id"])]
+        d[0] += a_centavos(r["capital"])
+        d[1] += a_centavos(r["interes"])
+        d[2] += r["n"]
+
+    compactos = (PlanPago.objects
+                 .filter(cuotas_compactas__isnull=False)
+                 .values_list("moneda", "solicitud__producto_id", "cuotas_compactas"))
+    for moneda, producto_id, blob in compactos.iterator(chunk_size=500):
+        acumular(deltas, desempaquetar(blob), moneda, producto_id)
+
+    filas = [
+        ProyeccionCobroMensual(mes=mes, moneda=moneda, producto_id=producto_id,
+                               capital=a_decimal(cap), interes=a_decimal(inte),
+                               total=a_decimal(cap + inte), cuotas=n)
+        for (mes, moneda, producto_id), (cap, inte, n) in deltas.items() if n
+    ]
+    with transaction.atomic():
+        ProyeccionCobroMensual.objects.all().delete()
+        ProyeccionCobroMensual.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def proyeccion(desde=None, hasta=None, moneda: Optional[str] = None, producto_id: Optional[int] = None):
+    """Cobros programados por mes y moneda (sumando productos salvo que se filtre uno)."""
+    qs = ProyeccionCobroMensual.objects.all()
+    if desde is not None:
+        qs = qs.filter(mes__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(mes__lte=hasta)
+    if moneda:
+        qs = qs.filter(moneda=moneda)
+    if producto_id is not None:
+        qs = qs.filter(producto_id=producto_id)
+    filas = list(qs.values("mes", "moneda")
+                 .annotate(capital=Sum("capital"), interes=Sum("interes"),
+                           total=Sum("total"), cuotas=Sum("cuotas"))
+                 .order_by("mes", "moneda"))
+    for f in filas:
+        for campo in ("capital", "interes", "total"):
+            f[campo] = a_decimal(a_centavos(f[campo]))
+    return filas
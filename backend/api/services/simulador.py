@@ -1,56 +1,281 @@
 # api/services/simulador.py
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
 from inspect import signature
-from .plan_pago import generar_plan as _generar_plan
+from itertools import chain
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.timezone import now
+
+from .plan_pago import generar_plan as _generar_plan, iter_cronograma_frances, q2
+from .plan_pago_lote import _fechas_vencimiento, calcular_cronogramas_lote, resumir_cronogramas_lote
+from .tasas_efectivas import fecha_desembolso_por_defecto, tasas_efectivas_cuotas, tasas_efectivas_lote
+
+
+# ---- Adaptación de nombres de parámetros (se resuelve UNA vez al importar)
+def _primer_param(params, *nombres):
+    for nombre in nombres:
+        if nombre in params:
+            return nombre
+    return None
+
+
+_PARAMS = signature(_generar_plan).parameters
+_KW_MONTO = _primer_param(_PARAMS, 'capital', 'monto', 'principal')
+_KW_PLAZO = _primer_param(_PARAMS, 'plazo_meses', 'plazo', 'meses')
+_KW_TNA = _primer_param(_PARAMS, 'tna', 'tasa_nominal_anual', 'tasa')
+_KW_FECHA = _primer_param(_PARAMS, 'primera_cuota_fecha')
+
+_KWARGS_FIJOS = {}
+# ---- NO PERSISTIR en simulación
+if 'persistir' in _PARAMS:
+    _KWARGS_FIJOS['persistir'] = False
+# ---- Si la firma exige solicitud/usuario, pasa None (simulación)
+if 'solicitud' in _PARAMS:
+    _KWARGS_FIJOS['solicitud'] = None
+if 'usuario' in _PARAMS:
+    _KWARGS_FIJOS['usuario'] = None
+
+
+# =========================================================
+#                 CACHÉ DE SIMULACIONES
+# =========================================================
+class _CacheLRU:
+    """LRU en proceso, acotada por número de entradas."""
+    nombre = 'lru'
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entries:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class _CacheDjango:
+    """Caché compartida vía settings.CACHES (Redis, Memcached, BD...); la eviction la hace el backend."""
+    nombre = 'django'
+
+    def __init__(self, alias, timeout):
+        self._cache = caches[alias]
+        self.timeout = timeout
+
+    @staticmethod
+    def _key(clave):
+        return 'simulador:' + ':'.join(str(p) for p in clave)
+
+    def get(self, clave):
+        return self._cache.get(self._key(clave))
+
+    def set(self, clave, valor):
+        self._cache.set(self._key(clave), valor, self.timeout)
+
+    def clear(self):
+        pass  # la caché compartida puede tener otras claves: se deja expirar por TIMEOUT
+
+    def __len__(self):
+        return 0  # desconocido para backends compartidos
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = getattr(settings, 'SIMULADOR_CACHE', {})
+                backend = conf.get('BACKEND', 'lru')
+                if backend == 'lru':
+                    _cache = _CacheLRU(conf.get('MAX_ENTRIES', 1024))
+                elif backend == 'django':
+                    _cache = _CacheDjango(conf.get('ALIAS', 'default'), conf.get('TIMEOUT', 3600))
+                else:
+                    raise ValueError(f"SIMULADOR_CACHE['BACKEND'] inválido: {backend!r} (use 'lru' o 'django').")
+    return _cache
+
+
+def estadisticas_cache():
+    """Contadores de la caché del simulador (por proceso)."""
+    cache = _get_cache()
+    consultas = _stats['hits'] + _stats['misses']
+    return {
+        'backend': cache.nombre,
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'ratio': (_stats['hits'] / consultas) if consultas else 0.0,
+        'entradas': len(cache),
+    }
+
+
+def limpiar_cache():
+    """Vacía la caché, reinicia contadores y vuelve a leer la configuración."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.clear()
+        _cache = None
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def _norm_decimal(x):
+    s = format(Decimal(x), 'f')
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    return s
+
+
+def _norm_fecha(primera_cuota_fecha):
+    if not primera_cuota_fecha:
+        return now().date() + relativedelta(months=+1)
+    if isinstance(primera_cuota_fecha, datetime):
+        return primera_cuota_fecha.date()
+    if isinstance(primera_cuota_fecha, date):
+        return primera_cuota_fecha
+    return date.fromisoformat(str(primera_cuota_fecha))
+
+
+def _clave(monto, plazo_meses, tna, fecha):
+    """(monto, plazo, tna, fecha) normalizados: montos equivalentes tras q2 comparten entrada."""
+    return (str(q2(Decimal(monto))), int(plazo_meses), _norm_decimal(tna), fecha.isoformat())
 
 
 def simular_plan(monto, plazo_meses, tna, primera_cuota_fecha=None):
     """
     Simula un plan de pagos SIN persistir en BD, adaptando los nombres
     de parámetros que espera la función real generar_plan.
+    El resumen incluye TEA y CFT (services/tasas_efectivas.py).
+    Los resultados se memorizan según settings.SIMULADOR_CACHE.
     """
-    sig = signature(_generar_plan)
-    params = sig.parameters
-
-    kwargs = {}
-
-    # ---- capital (alias)
-    if 'capital' in params:
-        kwargs['capital'] = monto
-    elif 'monto' in params:
-        kwargs['monto'] = monto
-    elif 'principal' in params:
-        kwargs['principal'] = monto
-
-    # ---- plazo
-    if 'plazo_meses' in params:
-        kwargs['plazo_meses'] = plazo_meses
-    elif 'plazo' in params:
-        kwargs['plazo'] = plazo_meses
-    elif 'meses' in params:
-        kwargs['meses'] = plazo_meses
-
-    # ---- tasa nominal anual
-    if 'tna' in params:
-        kwargs['tna'] = tna
-    elif 'tasa_nominal_anual' in params:
-        kwargs['tasa_nominal_anual'] = tna
-    elif 'tasa' in params:
-        kwargs['tasa'] = tna
-
-    # ---- primera fecha (opcional)
-    if 'primera_cuota_fecha' in params:
-        kwargs['primera_cuota_fecha'] = primera_cuota_fecha
-
-    # ---- NO PERSISTIR en simulación
-    if 'persistir' in params:
-        kwargs['persistir'] = False
-
-    # ---- Si la firma exige solicitud/usuario, pasa None (simulación)
-    if 'solicitud' in params:
-        kwargs['solicitud'] = None
-    if 'usuario' in params:
-        kwargs['usuario'] = None
-
-    # Llamada final
-    plan, cuotas = _generar_plan(**kwargs)
-    return plan, cuotas
+    fecha = _norm_fecha(primera_cuota_fecha)
+    clave = _clave(monto, plazo_meses, tna, fecha)
+    cache = _get_cache()
+
+    hit = cache.get(clave)
+    with _stats_lock:
+        _stats['hits' if hit is not None else 'misses'] += 1
+
+    if hit is not None:
+        plan, cuotas = hit
+    else:
+        kwargs = dict(_KWARGS_FIJOS)
+        if _KW_MONTO:
+            kwargs[_KW_MONTO] = monto
+        if _KW_PLAZO:
+            kwargs[_KW_PLAZO] = plazo_meses
+        if _KW_TNA:
+            kwargs[_KW_TNA] = tna
+        if _KW_FECHA:
+            kwargs[_KW_FECHA] = fecha
+        plan, cuotas = _generar_plan(**kwargs)
+        plan = {**plan, **tasas_efectivas_cuotas(plan['total_capital'], cuotas)}
+        cache.set(clave, (plan, cuotas))
+
+    # Copias superficiales: quien llama puede modificar los dicts sin tocar la caché
+    return dict(plan), [dict(c) for c in cuotas]
+
+
+def iterar_simulacion(monto, plazo_meses, tna, primera_cuota_fecha=None):
+    """
+    Igual que simular_plan pero como generador de eventos ("resumen", "cuota"...,
+    "totales" con TEA/CFT) para el modo streaming; no usa la caché ni arma la lista de cuotas.
+    Los parámetros se validan antes de devolver el iterador (ValueError), de modo
+    que los errores se respondan con 400 y no a mitad del stream.
+    """
+    if int(plazo_meses) < 1:
+        raise ValueError("plazo_meses debe ser mayor o igual a 1.")
+    eventos = _con_tasas_efectivas(
+        iter_cronograma_frances(monto, plazo_meses, tna, _norm_fecha(primera_cuota_fecha)))
+    primero = next(eventos)  # calcula tasa y cuota fija ya, dentro del try de la vista
+    return chain([primero], eventos)
+
+
+def _con_tasas_efectivas(eventos):
+    """Agrega TEA y CFT al evento "totales"; sólo retiene fecha e importe de cada cuota."""
+    fechas, importes = [], []
+    for tipo, datos in eventos:
+        if tipo == 'cuota':
+            fechas.append(datos['fecha_vencimiento'])
+            importes.append(datos['cuota'])
+        elif tipo == 'totales' and fechas:
+            datos = {**datos, **tasas_efectivas_lote([(
+                datos['total_capital'], fecha_desembolso_por_defecto(fechas[0]), fechas, importes)])[0]}
+        yield tipo, datos
+
+
+# =========================================================
+#           GRILLA DE SENSIBILIDAD (tasa x plazo)
+# =========================================================
+def simular_grilla(monto, plazos_meses, tnas, primera_cuota_fecha=None, incluir_cuotas=False):
+    """
+    Simula todas las combinaciones plazo x tasa para un mismo monto en una sola
+    pasada vectorizada (mismo cálculo que simular_plan, sin persistir).
+    Por defecto devuelve sólo cuota, totales, TEA y CFT; con incluir_cuotas=True
+    agrega el cronograma completo de cada combinación.
+    """
+    combinaciones = [(int(n), t) for n in plazos_meses for t in tnas]
+    montos = [monto] * len(combinaciones)
+    plazos = [n for n, _ in combinaciones]
+    tasas = [t for _, t in combinaciones]
+    fecha = _norm_fecha(primera_cuota_fecha)
+    desembolso = fecha_desembolso_por_defecto(fecha)
+
+    if incluir_cuotas:
+        planes = calcular_cronogramas_lote(montos, plazos, tasas, [fecha] * len(combinaciones))
+        resumenes = [(plan, cuotas) for plan, cuotas in planes]
+        flujos = [(plan['total_capital'], desembolso,
+                   [c['fecha_vencimiento'] for c in cuotas], [c['cuota'] for c in cuotas])
+                  for plan, cuotas in planes]
+    else:
+        resumenes = [(r, None) for r in resumir_cronogramas_lote(montos, plazos, tasas)]
+        # Sin cronograma: todas las cuotas son la fija salvo la última (cierra el total)
+        cache_fechas = {}
+        flujos = []
+        for n, (r, _) in zip(plazos, resumenes):
+            ultima = r['total_cuotas'] - r['cuota'] * (n - 1)
+            flujos.append((r['total_capital'], desembolso, _fechas_vencimiento(fecha, n, cache_fechas)[:n],
+                           [r['cuota']] * (n - 1) + [ultima]))
+    efectivas = tasas_efectivas_lote(flujos)
+
+    resultados = []
+    for (n, t), (resumen, cuotas), tasas_ef in zip(combinaciones, resumenes, efectivas):
+        item = {
+            'plazo_meses': n,
+            'tasa_nominal_anual': t,
+            'cuota': resumen['cuota'],
+            'total_interes': resumen['total_interes'],
+            'total_cuotas': resumen['total_cuotas'],
+            **tasas_ef,
+        }
+        if cuotas is not None:
+            item['cuotas'] = cuotas
+        resultados.append(item)
+    return resultados
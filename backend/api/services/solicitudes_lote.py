@@ -0,0 +1,182 @@
+# api/services/solicitudes_lote.py
+"""
+Evaluación y decisión de solicitudes en lote (comités).
+
+Cada lote se resuelve en una transacción con un número fijo de consultas,
+sin importar cuántas solicitudes traiga:
+  1. el Empleado del usuario,
+  2. las solicitudes del lote con SELECT ... FOR UPDATE,
+  3. UPDATEs por conjunto (un CASE por id para los valores que varían),
+  4. contadores de estadísticas, índice de búsqueda e historial (ver sus
+     servicios), porque los UPDATE masivos no pasan por save() ni disparan señales.
+
+Los ítems inválidos (inexistentes, repetidos o con una transición no
+permitida) no abortan el lote: se informan en el resultado de cada uno.
+"""
+from __future__ import annotations
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, TextField, Value, When
+from django.utils.timezone import now
+
+from ..models import Empleado, SolicitudCredito
+from . import busqueda, estadisticas, historial
+
+MAX_LOTE = 1000
+SCORE_MAX = Decimal('1000')  # SolicitudCredito.score_riesgo: 5 dígitos, 2 decimales
+
+# Estados desde los que se permite cada operación
+ORIGENES_EVALUAR = {'DRAFT', 'ENVIADA', 'EVALUADA'}
+ORIGENES_DECIDIR = {'ENVIADA', 'EVALUADA'}
+DECISIONES = {'APROBAR': 'APROBADA', 'RECHAZAR': 'RECHAZADA'}
+
+
+def _preparar(items: Sequence[Dict[str, Any]], origenes, validar_item):
+    """
+    Valida la forma de los ítems y bloquea las solicitudes.
+    Retorna (resultados por posición, {id: (item, solicitud)} de los válidos).
+    """
+    if not isinstance(items, (list, tuple)) or not items:
+        raise ValueError('items debe ser una lista no vacía.')
+    if len(items) > MAX_LOTE:
+        raise ValueError(f'Máximo {MAX_LOTE} ítems por lote.')
+
+    resultados: List[Dict[str, Any]] = []
+    pedidos: Dict[UUID, int] = {}
+    for pos, item in enumerate(items):
+        crudo = item.get('id') if isinstance(item, dict) else None
+        resultados.append({'id': str(crudo) if crudo is not None else None, 'ok': False})
+        try:
+            sid = UUID(str(crudo))
+        except ValueError:
+            resultados[pos]['error'] = 'id inválido'
+            continue
+        if sid in pedidos:
+            resultados[pos]['error'] = 'id repetido en el lote'
+            continue
+        error = validar_item(item)
+        if error:
+            resultados[pos]['error'] = error
+            continue
+        pedidos[sid] = pos
+
+    solicitudes = {s.pk: s for s in (SolicitudCredito.objects
+                                     .select_for_update()
+                                     .filter(pk__in=list(pedidos), is_deleted=False)
+                                     .order_by('pk'))}  # orden fijo de bloqueo entre lotes
+    validos = {}
+    for sid, pos in pedidos.items():
+        sol = solicitudes.get(sid)
+        if sol is None:
+            resultados[pos]['error'] = 'no existe'
+        elif sol.estado not in origenes:
+            resultados[pos]['error'] = f'transición no permitida desde {sol.estado}'
+        else:
+            validos[sid] = (items[pos], sol, pos)
+    return resultados, validos
+
+
+def _cerrar(resultados, validos, antes, usuario, detalle=lambda item: None) -> List[Dict[str, Any]]:
+    """Contadores, índice de búsqueda, historial y resultados de los ítems aplicados."""
+    estadisticas.registrar_cambios((antes[sid], sol) for sid, (_, sol, _) in validos.items())
+    busqueda.guardar(busqueda.entrada_solicitud(sol) for _, sol, _ in validos.values())
+    historial.registrar(historial.cambio_estado(sol, antes[sid]['estado'], usuario, detalle(item))
+                        for sid, (item, sol, _) in validos.items())
+    for _, sol, pos in validos.values():
+        resultados[pos].update(ok=True, estado=sol.estado)
+    return resultados
+
+
+def _score(valor) -> Decimal:
+    """
+    score_riesgo tal como se guarda (DecimalField(max_digits=5, decimal_places=2)).
+    ValueError con el motivo si no entra: un valor así haría fallar el UPDATE
+    del lote entero en vez de sólo su ítem.
+    """
+    try:
+        score = Decimal(str(valor).strip())
+    except ArithmeticError:
+        raise ValueError('score_riesgo inválido') from None
+    if not score.is_finite():
+        raise ValueError('score_riesgo inválido')
+    if abs(score) >= SCORE_MAX:
+        raise ValueError(f'score_riesgo debe ser menor que {SCORE_MAX} en valor absoluto')
+    if score != score.quantize(Decimal('0.01')):
+        raise ValueError('score_riesgo admite hasta 2 decimales')
+    return score
+
+
+def _oficial_id(usuario):
+    return Empleado.objects.filter(user=usuario).values_list('pk', flat=True).first()
+
+
+def evaluar_lote(items: Sequence[Dict[str, Any]], usuario) -> List[Dict[str, Any]]:
+    """items: [{'id', 'score_riesgo', 'observacion_evaluacion'?}] -> EVALUADA."""
+    def validar(item):
+        if item.get('score_riesgo') is None:
+            return 'score_riesgo requerido'
+        try:
+            _score(item['score_riesgo'])
+        except ValueError as e:
+            return str(e)
+        return None
+
+    oficial_id = _oficial_id(usuario)
+    with transaction.atomic():
+        resultados, validos = _preparar(items, ORIGENES_EVALUAR, validar)
+        if not validos:
+            return resultados
+        ahora = now()
+        antes = {sid: estadisticas.instantanea(sol) for sid, (_, sol, _) in validos.items()}
+        scores = {sid: _score(item['score_riesgo']) for sid, (item, _, _) in validos.items()}
+        for sid, (item, sol, _) in validos.items():
+            sol.score_riesgo = scores[sid]
+            sol.observacion_evaluacion = item.get('observacion_evaluacion', '')
+            sol.fecha_evaluacion = ahora
+            sol.estado = 'EVALUADA'
+
+        cambios = dict(
+            estado='EVALUADA', fecha_evaluacion=ahora, updated_at=ahora,
+            score_riesgo=Case(*[When(pk=sid, then=Value(score)) for sid, score in scores.items()],
+                              output_field=DecimalField(max_digits=5, decimal_places=2)),
+            observacion_evaluacion=Case(*[When(pk=sid, then=Value(item.get('observacion_evaluacion', '')))
+                                          for sid, (item, _, _) in validos.items()],
+                                        output_field=TextField()),
+        )
+        if oficial_id is not None:
+            cambios['oficial_id'] = oficial_id
+        SolicitudCredito.objects.filter(pk__in=list(validos)).update(**cambios)
+        return _cerrar(resultados, validos, antes, usuario,
+                       lambda item: {'score_riesgo': str(_score(item['score_riesgo']))})
+
+
+def decidir_lote(items: Sequence[Dict[str, Any]], usuario) -> List[Dict[str, Any]]:
+    """items: [{'id', 'decision': 'APROBAR'|'RECHAZAR'}]. Un UPDATE por decisión."""
+    def validar(item):
+        if str(item.get('decision') or '').upper() not in DECISIONES:
+            return 'decision debe ser APROBAR o RECHAZAR'
+        return None
+
+    oficial_id = _oficial_id(usuario)
+    with transaction.atomic():
+        resultados, validos = _preparar(items, ORIGENES_DECIDIR, validar)
+        if not validos:
+            return resultados
+        ahora = now()
+        antes = {sid: estadisticas.instantanea(sol) for sid, (_, sol, _) in validos.items()}
+        por_estado: Dict[str, List[UUID]] = {}
+        for sid, (item, sol, _) in validos.items():
+            sol.estado = DECISIONES[str(item['decision']).upper()]
+            sol.fecha_aprobacion = ahora if sol.estado == 'APROBADA' else None
+            por_estado.setdefault(sol.estado, []).append(sid)
+
+        for estado, ids in por_estado.items():
+            cambios = dict(estado=estado, updated_at=ahora,
+                           fecha_aprobacion=ahora if estado == 'APROBADA' else None)
+            if oficial_id is not None:
+                cambios['oficial_id'] = oficial_id
+            SolicitudCredito.objects.filter(pk__in=ids).update(**cambios)
+        return _cerrar(resultados, validos, antes, usuario)
@@ -0,0 +1,161 @@
+# api/services/tasas_efectivas.py
+"""
+Tasas efectivas de un cronograma: TEA y CFT, resolviendo la TIR de los flujos.
+
+  - TEA: tasa efectiva anual de las cuotas tal como quedaron (con redondeos):
+    TIR mensual de [-capital, cuota_1, ..., cuota_n] en períodos 1..n,
+    anualizada como (1 + i)^12 - 1.
+  - CFT: costo financiero total anual. TIR con las fechas reales de
+    vencimiento (base 365 días) desde el desembolso, descontando del capital
+    recibido los costos iniciales si los hubiera.
+
+El solver trabaja sobre matrices (planes x flujos) con NumPy: Newton con
+respaldo de bisección dentro de un intervalo que siempre contiene la raíz, de
+modo que miles de planes se resuelven en unas pocas iteraciones vectoriales.
+"""
+from __future__ import annotations
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+Q4 = Decimal("0.0001")
+# (capital, fecha_desembolso, fechas de vencimiento, importes de cuota)
+Flujos = Tuple[Any, date, Sequence[date], Sequence[Any]]
+
+
+def _vpn(flujos: np.ndarray, tiempos: np.ndarray, x: np.ndarray):
+    """VPN y su derivada para cada fila, con tasa x por unidad de tiempo."""
+    with np.errstate(over="ignore", invalid="ignore"):
+        desc = flujos * np.exp(-tiempos * np.log1p(x)[:, None])
+        return desc.sum(axis=1), (-tiempos * desc).sum(axis=1) / (1.0 + x)
+
+
+def tir_lote(flujos: np.ndarray, tiempos: np.ndarray, tol: float = 1e-12, max_iter: int = 100) -> np.ndarray:
+    """
+    TIR de cada fila de `flujos` (m x T) con los instantes de `tiempos` (m x T).
+    Las posiciones de relleno deben tener flujo 0. Supone flujos convencionales
+    (un desembolso y luego cobros): el VPN es decreciente y la raíz es única.
+    Filas sin raíz en el intervalo de búsqueda devuelven NaN.
+    """
+    flujos = np.asarray(flujos, dtype=np.float64)
+    tiempos = np.asarray(tiempos, dtype=np.float64)
+    m = flujos.shape[0]
+    lo = np.full(m, -0.5)
+    hi = np.full(m, 1.0)
+
+    # Ampliar hi hasta que el VPN sea negativo (tasas por período muy altas)
+    f_hi, _ = _vpn(flujos, tiempos, hi)
+    for _ in range(30):
+        abiertos = f_hi > 0
+        if not abiertos.any():
+            break
+        hi[abiertos] *= 4.0
+        f_hi[abiertos], _ = _vpn(flujos[abiertos], tiempos[abiertos], hi[abiertos])
+    # Cota inferior: -50% por período evita el desborde de (1+x)^-t en plazos
+    # largos; si una última cuota negativa (ajuste) domina allí, se acerca a 0
+    f_lo, _ = _vpn(flujos, tiempos, lo)
+    for cota in (-0.1, -0.01, 0.0):
+        cerrados = ~(f_lo > 0)
+        if not cerrados.any():
+            break
+        lo[cerrados] = cota
+        f_lo[cerrados], _ = _vpn(flujos[cerrados], tiempos[cerrados], lo[cerrados])
+    validos = (f_lo > 0) & (f_hi <= 0)
+
+    x = np.full(m, np.nan)
+    # Sólo se itera sobre las filas que aún no convergieron
+    idx = np.flatnonzero(validos)
+    xa, lo, hi = np.clip(np.full(len(idx), 0.01), lo[idx], hi[idx]), lo[idx], hi[idx]
+    fa, ta = flujos[idx], tiempos[idx]
+    for _ in range(max_iter):
+        if not len(idx):
+            break
+        f, df = _vpn(fa, ta, xa)
+        # El VPN decrece con la tasa: f > 0 -> la raíz está a la derecha
+        lo = np.where(f > 0, xa, lo)
+        hi = np.where(f < 0, xa, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            nuevo = xa - f / df
+        fuera = ~np.isfinite(nuevo) | (nuevo <= lo) | (nuevo >= hi)
+        nuevo = np.where(fuera, (lo + hi) / 2.0, nuevo)
+        listo = (np.abs(nuevo - xa) <= tol * (1.0 + np.abs(xa))) | (f == 0)
+        x[idx] = nuevo
+        sigue = ~listo
+        idx, xa, lo, hi, fa, ta = idx[sigue], nuevo[sigue], lo[sigue], hi[sigue], fa[sigue], ta[sigue]
+    return x
+
+
+def _porcentaje(x: float) -> Optional[Decimal]:
+    if not np.isfinite(x):
+        return None
+    pct = (Decimal(repr(float(x))) * 100).quantize(Q4, rounding=ROUND_HALF_UP)
+    return pct.copy_abs() if pct == 0 else pct  # sin "-0.0000"
+
+
+def fecha_desembolso_por_defecto(primera_cuota_fecha: date) -> date:
+    """Sin fecha de desembolso conocida se asume un mes antes de la primera cuota."""
+    return primera_cuota_fecha - relativedelta(months=+1)
+
+
+def tasas_efectivas_lote(planes: Sequence[Flujos], costos_iniciales: Optional[Sequence[Any]] = None) -> List[Dict[str, Optional[Decimal]]]:
+    """
+    TEA y CFT (en %, 4 decimales) de cada plan.
+    `planes`: [(capital, fecha_desembolso, fechas, cuotas), ...].
+    `costos_iniciales`: importes descontados del desembolso, sólo afectan al CFT.
+    """
+    m = len(planes)
+    if m == 0:
+        return []
+    nmax = max(len(p[3]) for p in planes)
+    flujos = np.zeros((m, nmax + 1))
+    periodos = np.zeros((m, nmax + 1))
+    anios = np.zeros((m, nmax + 1))
+    recibido = np.zeros(m)
+    for i, (capital, desembolso, fechas, cuotas) in enumerate(planes):
+        n = len(cuotas)
+        costo = float(costos_iniciales[i]) if costos_iniciales is not None else 0.0
+        flujos[i, 0] = -float(capital)
+        recibido[i] = -(float(capital) - costo)
+        flujos[i, 1:n + 1] = [float(c) for c in cuotas]
+        periodos[i, 1:n + 1] = np.arange(1, n + 1)
+        origen = desembolso.toordinal()
+        anios[i, 1:n + 1] = [(f.toordinal() - origen) / 365.0 for f in fechas]
+
+    mensual = tir_lote(flujos, periodos)
+    flujos[:, 0] = recibido
+    anual = tir_lote(flujos, anios)
+    with np.errstate(invalid="ignore"):
+        tea = (1.0 + mensual) ** 12 - 1.0
+    return [{"tea": _porcentaje(t), "cft": _porcentaje(c)} for t, c in zip(tea, anual)]
+
+
+def tasas_efectivas_cuotas(capital, cuotas: Sequence[Any], fecha_desembolso: Optional[date] = None) -> Dict[str, Optional[Decimal]]:
+    """TEA/CFT de un cronograma (cuotas_dto o filas PlanCuota/CuotaCompacta)."""
+    if not cuotas:
+        return {"tea": None, "cft": None}
+    valor = (lambda c, k: c[k]) if isinstance(cuotas[0], dict) else getattr
+    fechas = [valor(c, "fecha_vencimiento") for c in cuotas]
+    desembolso = fecha_desembolso or fecha_desembolso_por_defecto(fechas[0])
+    return tasas_efectivas_lote([(capital, desembolso, fechas, [valor(c, "cuota") for c in cuotas])])[0]
+
+
+def tasas_efectivas_planes(planes: Sequence[Any]) -> List[Dict[str, Optional[Decimal]]]:
+    """
+    TEA/CFT de planes guardados (PlanPago con solicitud cargada), en una sola
+    resolución vectorial. El desembolso se toma de la fecha de aprobación.
+    En planes recalculados con prepago el resultado considera sólo las cuotas.
+    """
+    entrada = []
+    for plan in planes:
+        cuotas = list(plan.iter_cuotas())
+        fechas = [c.fecha_vencimiento for c in cuotas]
+        aprobacion = plan.solicitud.fecha_aprobacion
+        if aprobacion is not None:
+            desembolso = aprobacion.date()
+        else:
+            desembolso = fecha_desembolso_por_defecto(plan.primera_cuota_fecha)
+        entrada.append((plan.total_capital, desembolso, fechas, [c.cuota for c in cuotas]))
+    return tasas_efectivas_lote(entrada)
@@ -0,0 +1,186 @@
+# api/services/trabajos.py
+"""
+Cola local de trabajos en segundo plano, sobre la tabla Trabajo.
+
+Una vista encola y responde enseguida con el id; el cliente consulta
+/api/trabajos/<id>/ hasta que termina. Los procesos de
+`manage.py procesar_trabajos` toman los trabajos y los ejecutan:
+
+    @tarea('plan.pdf')
+    def renderizar_pdf_plan(trabajo, plan_id): ...
+
+    t = encolar('plan.pdf', {'plan_id': ...}, usuario=request.user)
+
+Las tareas de la aplicación están en api/tareas.py.
+
+Despacho: `tomar` elige el pendiente de mayor prioridad y más antiguo con
+SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL) y lo reclama con un UPDATE
+condicional sobre el estado, así dos trabajadores nunca ejecutan el mismo
+(en SQLite, sin FOR UPDATE, decide el UPDATE). Cada trabajo tomado tiene un
+plazo (`vence_en`); si el trabajador muere, `recuperar_vencidos` lo devuelve
+a la cola como un intento fallido.
+
+Errores: ErrorPermanente, ValueError o un objeto que ya no existe lo dejan
+FALLIDO sin reintentar; cualquier otra excepción (SMTP caído, BD ocupada...)
+se reintenta con espera exponencial hasta `max_intentos`.
+"""
+from __future__ import annotations
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import Trabajo
+
+logger = logging.getLogger(__name__)
+
+ACTIVOS = (Trabajo.PENDIENTE, Trabajo.EN_CURSO)
+
+
+class ErrorPermanente(Exception):
+    """La tarea no tiene sentido reintentarla (datos inválidos, objeto borrado...)."""
+
+
+PERMANENTES = (ErrorPermanente, ValueError, ObjectDoesNotExist)
+
+
+class Tarea(NamedTuple):
+    funcion: Callable[..., Any]
+    prioridad: int
+    max_intentos: int
+
+
+_TAREAS: Dict[str, Tarea] = {}
+
+
+def tarea(tipo: str, *, prioridad: int = 0, max_intentos: int = 3):
+    """Registra `funcion(trabajo, **parametros)` como tarea `tipo`; devuelve algo serializable a JSON."""
+    def registrar(funcion):
+        _TAREAS[tipo] = Tarea(funcion, prioridad, max_intentos)
+        return funcion
+    return registrar
+
+
+def _conf():
+    conf = getattr(settings, 'TRABAJOS', {})
+    return conf.get('PLAZO_SEG', 600), conf.get('REINTENTO_SEG', 30)
+
+
+# =========================================================
+#                  ENCOLAR
+# =========================================================
+def encolar(tipo: str, parametros: Optional[Dict[str, Any]] = None, *, usuario=None, clave: str = '',
+            prioridad: Optional[int] = None, max_intentos: Optional[int] = None) -> Trabajo:
+    """
+    Crea un trabajo pendiente. Con `clave`, si ya hay uno activo (pendiente o
+    en curso) del mismo tipo y clave se devuelve ése en lugar de duplicarlo.
+    """
+    if tipo not in _TAREAS:
+        raise ValueError(f"Tarea desconocida: {tipo!r}")
+    definicion = _TAREAS[tipo]
+    nuevo = Trabajo(
+        tipo=tipo, parametros=parametros or {}, clave=clave,
+        prioridad=definicion.prioridad if prioridad is None else prioridad,
+        max_intentos=definicion.max_intentos if max_intentos is None else max_intentos,
+        creado_por=usuario if getattr(usuario, 'pk', None) is not None else None,
+    )
+    if not clave:
+        nuevo.save()
+        return nuevo
+    while True:
+        activo = Trabajo.objects.filter(tipo=tipo, clave=clave, estado__in=ACTIVOS).first()
+        if activo is not None:
+            return activo
+        try:
+            with transaction.atomic():
+                nuevo.save(force_insert=True)
+            return nuevo
+        except IntegrityError:
+            continue  # otro lo encoló entre la consulta y el INSERT
+
+
+# =========================================================
+#                  TRABAJADOR
+# =========================================================
+def tomar(trabajador: str) -> Optional[Trabajo]:
+    """Reclama el siguiente trabajo disponible para `trabajador`, o None si no hay."""
+    plazo, _ = _conf()
+    while True:
+        ahora = timezone.now()
+        with transaction.atomic():
+            t = (Trabajo.objects.select_for_update(skip_locked=True)
+                 .filter(estado=Trabajo.PENDIENTE, disponible_en__lte=ahora)
+                 .order_by('-prioridad', 'disponible_en')
+                 .first())
+            if t is None:
+                return None
+            cambios = dict(estado=Trabajo.EN_CURSO, trabajador=trabajador, iniciado_en=ahora,
+                           vence_en=ahora + timedelta(seconds=plazo))
+            tomado = (Trabajo.objects.filter(pk=t.pk, estado=Trabajo.PENDIENTE)
+                      .update(intentos=F('intentos') + 1, **cambios))
+        if tomado:
+            for campo, valor in cambios.items():
+                setattr(t, campo, valor)
+            t.intentos += 1
+            return t
+        # Lo tomó otro trabajador entre el SELECT y el UPDATE: probar el siguiente
+
+
+def ejecutar(trabajo: Trabajo, trabajador: str) -> str:
+    """Corre la tarea y guarda resultado, reintento o fallo; devuelve el estado final."""
+    definicion = _TAREAS.get(trabajo.tipo)
+    try:
+        if definicion is None:
+            raise ErrorPermanente(f"Tarea desconocida: {trabajo.tipo!r}")
+        resultado = definicion.funcion(trabajo, **trabajo.parametros)
+    except Exception as e:
+        return _fallar(trabajo, trabajador, e)
+    _cerrar(trabajo, trabajador, estado=Trabajo.COMPLETADO, resultado=resultado, error='')
+    return Trabajo.COMPLETADO
+
+
+def _cerrar(trabajo: Trabajo, tomado_por: str, **cambios) -> bool:
+    # Sólo si sigue siendo nuestro: con el plazo vencido pudo retomarlo otro
+    if cambios['estado'] != Trabajo.PENDIENTE:
+        cambios['terminado_en'] = timezone.now()
+    cambios.setdefault('vence_en', None)
+    hecho = (Trabajo.objects.filter(pk=trabajo.pk, estado=Trabajo.EN_CURSO, trabajador=tomado_por)
+             .update(**cambios))
+    for campo, valor in cambios.items():
+        setattr(trabajo, campo, valor)
+    return bool(hecho)
+
+
+def _fallar(trabajo: Trabajo, trabajador: str, e: Exception) -> str:
+    error = f"{type(e).__name__}: {e}"
+    if isinstance(e, PERMANENTES) or trabajo.intentos >= trabajo.max_intentos:
+        logger.exception('Trabajo %s (%s) fallido: %s', trabajo.pk, trabajo.tipo, error)
+        _cerrar(trabajo, trabajador, estado=Trabajo.FALLIDO, error=error)
+        return Trabajo.FALLIDO
+    _, base = _conf()
+    espera = base * 2 ** (trabajo.intentos - 1)
+    logger.warning('Trabajo %s (%s) intento %s/%s: %s; reintento en %ss',
+                   trabajo.pk, trabajo.tipo, trabajo.intentos, trabajo.max_intentos, error, espera)
+    _cerrar(trabajo, trabajador, estado=Trabajo.PENDIENTE, error=error, trabajador='',
+            disponible_en=timezone.now() + timedelta(seconds=espera))
+    return Trabajo.PENDIENTE
+
+
+def recuperar_vencidos() -> int:
+    """
+    Trabajos en curso con el plazo vencido (trabajador caído): vuelven a la
+    cola si les quedan intentos, si no quedan FALLIDO. Devuelve cuántos.
+    """
+    ahora = timezone.now()
+    vencidos = Q(estado=Trabajo.EN_CURSO, vence_en__lt=ahora)
+    error = 'Plazo vencido: el trabajador no terminó'
+    fallidos = (Trabajo.objects.filter(vencidos, intentos__gte=F('max_intentos'))
+                .update(estado=Trabajo.FALLIDO, error=error, vence_en=None, terminado_en=ahora))
+    devueltos = (Trabajo.objects.filter(vencidos)
+                 .update(estado=Trabajo.PENDIENTE, error=error, trabajador='', vence_en=None, disponible_en=ahora))
+    return fallidos + devueltos
@@ -0,0 +1,199 @@
+# api/services/xlsx_streaming.py
+"""
+Escritura de XLSX (y ZIP) en streaming, con memoria constante.
+
+openpyxl arma el libro completo (o, en modo write-only, un temporal por hoja)
+antes de comprimir. Aquí cada fila se convierte en XML y se pasa al
+compresor del ZipFile a medida que llega; el ZipFile escribe sobre un
+destino no posicionable cuyos bytes se entregan en cuanto hay un bloque.
+Así la primera parte del archivo sale antes de leer la última cuota.
+
+    for bloque in xlsx_streaming([('Plan', filas)]):
+        ...   # bytes listos para StreamingHttpResponse
+
+Celdas: int/float/Decimal como número (Decimal sin pasar por float), None
+vacía, el resto como texto. Una fila de la forma Negrita(fila) va en negrita.
+"""
+from __future__ import annotations
+import io
+import zipfile
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+BLOQUE = 64 * 1024  # bytes acumulados antes de entregar un bloque
+
+
+class Negrita(tuple):
+    """Fila con estilo negrita (encabezados y totales)."""
+
+
+class SalidaBloques(io.RawIOBase):
+    """Destino no posicionable: ZipFile escribe, el generador retira los bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes: List[bytes] = []
+        self.pendiente = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._partes.append(bytes(b))
+        self.pendiente += len(b)
+        return len(b)
+
+    def retirar(self) -> bytes:
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        self.pendiente = 0
+        return datos
+
+
+class ZipStreaming:
+    """
+    ZipFile sobre SalidaBloques. `escribir(nombre, partes)` comprime un miembro a partir
+    de un iterable de bytes/str y va entregando los bloques listos.
+    """
+
+    def __init__(self, compresion=zipfile.ZIP_DEFLATED):
+        self._salida = SalidaBloques()
+        self._zip = zipfile.ZipFile(self._salida, mode='w', compression=compresion)
+
+    def escribir(self, nombre: str, partes: Iterable[Any], zip64: bool = False) -> Iterator[bytes]:
+        # Sin posicionar no se puede corregir la cabecera después: zip64=True si el
+        # miembro puede superar 4 GiB (Excel no lo necesita para una hoja normal)
+        with self._zip.open(nombre, mode='w', force_zip64=zip64) as miembro:
+            for parte in partes:
+                miembro.write(parte.encode('utf-8') if isinstance(parte, str) else parte)
+                if self._salida.pendiente >= BLOQUE:
+                    yield self._salida.retirar()
+        if self._salida.pendiente:
+            yield self._salida.retirar()
+
+    def cerrar(self) -> Iterator[bytes]:
+        self._zip.close()  # directorio central
+        yield self._salida.retirar()
+
+
+# =========================================================
+#                  SpreadsheetML mínimo
+# =========================================================
+def _columna(i: int) -> str:
+    letras = ''
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+
+def _celda(ref: str, valor: Any, estilo: str) -> str:
+    if valor is None or valor == '':
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"{estilo}><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{ref}"{estilo}><v>{valor}</v></c>'
+    texto = escape(str(valor))
+    return f'<c r="{ref}" t="inlineStr"{estilo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _hoja(filas: Iterable[Sequence[Any]]) -> Iterator[str]:
+    yield ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+    for n, fila in enumerate(filas, start=1):
+        estilo = ' s="1"' if isinstance(fila, Negrita) else ''
+        celdas = ''.join(_celda(f'{_columna(i)}{n}', v, estilo) for i, v in enumerate(fila))
+        yield f'<row r="{n}">{celdas}</row>'
+    yield '</sheetData></worksheet>'
+
+
+_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _nombre_hoja(nombre: str, usados: set) -> str:
+    # Excel: máx. 31 caracteres, sin []:*?/\ y sin repetir
+    base = ''.join('_' if c in '[]:*?/\\' else c for c in str(nombre))[:31] or 'Hoja'
+    candidato, i = base, 2
+    while candidato.lower() in usados:
+        sufijo = f' ({i})'
+        candidato, i = base[:31 - len(sufijo)] + sufijo, i + 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+_COMILLAS = {'"': '&quot;'}
+
+
+def _partes_finales(nombres: List[str]) -> List[Tuple[str, str]]:
+    hojas = ''.join(f'<sheet name="{escape(n, _COMILLAS)}" sheetId="{i}" r:id="rId{i}"/>'
+                    for i, n in enumerate(nombres, start=1))
+    rels = ''.join(f'<Relationship Id="rId{i}" '
+                   f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                   f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(nombres) + 1))
+    n = len(nombres)
+    tipos = ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType='
+                    f'"application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                    for i in range(1, n + 1))
+    cabecera = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    return [
+        ('xl/workbook.xml', cabecera +
+         '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+         f'<sheets>{hojas}</sheets></workbook>'),
+        ('xl/_rels/workbook.xml.rels', cabecera +
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         f'{rels}<Relationship Id="rId{n + 1}" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+         'Target="styles.xml"/></Relationships>'),
+        ('xl/styles.xml', _ESTILOS),
+        ('_rels/.rels', cabecera +
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+         'Target="xl/workbook.xml"/></Relationships>'),
+        ('[Content_Types].xml', cabecera +
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/xl/workbook.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+         '<Override PartName="/xl/styles.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+         f'{tipos}</Types>'),
+    ]
+
+
+def xlsx_streaming(hojas: Iterable[Tuple[str, Iterable[Sequence[Any]]]]) -> Iterator[bytes]:
+    """
+    Bloques de bytes de un .xlsx con una hoja por (nombre, filas). Tanto `hojas`
+    como cada `filas` se consumen perezosamente, una sola vez; el libro
+    (workbook.xml) se escribe al final, cuando ya se conocen los nombres.
+    """
+    zs = ZipStreaming()
+    nombres: List[str] = []
+    usados: set = set()
+    for nombre, filas in hojas:
+        nombres.append(_nombre_hoja(nombre, usados))
+        yield from zs.escribir(f'xl/worksheets/sheet{len(nombres)}.xml', _hoja(filas))
+    if not nombres:  # un libro necesita al menos una hoja
+        nombres.append('Hoja')
+        yield from zs.escribir('xl/worksheets/sheet1.xml', _hoja([]))
+    for nombre, contenido in _partes_finales(nombres):
+        yield from zs.escribir(nombre, [contenido])
+    yield from zs.cerrar()
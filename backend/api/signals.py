@@ -0,0 +1,76 @@
+# backend/api/signals.py
+"""
+Mantiene el índice de búsqueda (EntradaBusqueda) al guardar o borrar
+usuarios, clientes y solicitudes, resta del rollup de proyección los planes
+borrados y limpia los PDF en caché de los planes regenerados o borrados. Se
+conectan en ApiConfig.ready().
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Cliente, PlanPago, SolicitudCredito
+from .services import busqueda, plan_pdf, proyeccion
+
+
+def _relevante(update_fields, campos):
+    # save(update_fields=[...]) que no toca campos indexados (p. ej. last_login) no reindexa
+    return update_fields is None or bool(set(update_fields) & campos)
+
+
+@receiver(post_save, sender=User)
+def _usuario_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _relevante(update_fields, busqueda.CAMPOS_USUARIO):
+        busqueda.indexar_usuario(instance)
+
+
+@receiver(post_delete, sender=User)
+def _usuario_borrado(sender, instance, **kwargs):
+    busqueda.quitar('usuario', instance.pk)
+
+
+@receiver(post_save, sender=Cliente)
+def _cliente_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _relevante(update_fields, busqueda.CAMPOS_CLIENTE):
+        busqueda.indexar_cliente(instance)
+
+
+@receiver(post_delete, sender=Cliente)
+def _cliente_borrado(sender, instance, **kwargs):
+    busqueda.quitar('cliente', instance.pk)
+    # Si sólo se borró el cliente, su usuario vuelve a buscarse como usuario;
+    # en un borrado en cascada el post_delete del User lo quita enseguida
+    user = User.objects.filter(pk=instance.user_id).first()
+    if user is not None:
+        busqueda.guardar([busqueda.entrada_usuario(user)])
+
+
+@receiver(post_save, sender=SolicitudCredito)
+def _solicitud_guardada(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _relevante(update_fields, busqueda.CAMPOS_SOLICITUD):
+        busqueda.indexar_solicitud(instance)
+
+
+@receiver(post_delete, sender=SolicitudCredito)
+def _solicitud_borrada(sender, instance, **kwargs):
+    busqueda.quitar('solicitud', instance.pk)
+
+
+@receiver(post_save, sender=PlanPago)
+def _plan_guardado(sender, instance, created=False, raw=False, **kwargs):
+    # Tras el commit: si la transacción se revierte, el PDF en caché sigue siendo válido
+    if not created and not raw:
+        transaction.on_commit(lambda: plan_pdf.invalidar(instance.pk))
+
+
+@receiver(pre_delete, sender=PlanPago)
+def _plan_por_borrar(sender, instance, **kwargs):
+    # Antes del DELETE, en su misma transacción: las cuotas (filas que caen en
+    # cascada o el blob) todavía se pueden leer para restarlas del rollup
+    proyeccion.quitar_plan(instance)
+
+
+@receiver(post_delete, sender=PlanPago)
+def _plan_borrado(sender, instance, **kwargs):
+    transaction.on_commit(lambda: plan_pdf.invalidar(instance.pk))
@@ -0,0 +1,57 @@
+# backend/api/tareas.py
+"""
+Tareas de la cola de trabajos (services/trabajos.py). Se registran al
+importar el módulo, desde ApiConfig.ready; las ejecuta `procesar_trabajos`.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import PlanPago, SolicitudCredito
+from .services import plan_pdf
+from .services.plan_pago import generar_plan
+from .services.trabajos import ErrorPermanente, tarea
+
+RESTABLECER_PASSWORD = 'correo.restablecer_password'
+GENERAR_PLAN = 'plan.generar'
+PDF_PLAN = 'plan.pdf'
+
+
+def correo_restablecer_password(user):
+    """(asunto, mensaje) con el enlace para restablecer la contraseña de `user`."""
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_url = f"{settings.FRONTEND_URL}/password-reset-confirm/{uid}/{token}/"
+    return ('Restablecimiento de Contraseña',
+            f'Para restablecer tu contraseña, haz clic en el siguiente enlace: {reset_url}')
+
+
+# Alguien espera el correo: va primero, y el SMTP se reintenta más veces. El token
+# se arma al enviar, así el enlace no queda guardado en la tabla de trabajos
+@tarea(RESTABLECER_PASSWORD, prioridad=10, max_intentos=5)
+def enviar_restablecer_password(trabajo, user_id):
+    user = User.objects.get(pk=user_id)
+    asunto, mensaje = correo_restablecer_password(user)
+    send_mail(asunto, mensaje, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+
+
+@tarea(GENERAR_PLAN, prioridad=5)
+def generar_plan_solicitud(trabajo, solicitud_id, overwrite=False):
+    if trabajo.creado_por is None:
+        raise ErrorPermanente('El usuario que pidió el plan ya no existe')
+    sol = SolicitudCredito.objects.get(pk=solicitud_id, is_deleted=False)
+    plan = generar_plan(sol, trabajo.creado_por, overwrite=overwrite)
+    return {'plan_id': str(plan.id)}
+
+
+@tarea(PDF_PLAN)
+def renderizar_pdf_plan(trabajo, plan_id):
+    # Deja el PDF en la caché de disco; la descarga lo sirve sin renderizar
+    plan = PlanPago.objects.get(pk=plan_id)
+    ruta = plan_pdf.pdf_plan(plan)
+    descarga = reverse('solicitudcredito-export-plan', args=[plan.solicitud_id])
+    return {'plan_id': str(plan.id), 'bytes': ruta.stat().st_size, 'descarga': f'{descarga}?format=pdf'}
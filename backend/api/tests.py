@@ -1,3 +1,1512 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP, localcontext
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from unittest import skipUnless
+from unittest.mock import patch
+from uuid import UUID, uuid4
+from rest_framework.test import APIClient
+
+from .benchmarks import comparar, ejecutar
+from .consultas import PresupuestoConsultasExcedido, presupuesto_consultas
+from .models import (
+    Bitacora, Cliente, DocumentoAdjunto, DocumentoTipo, Empleado, EntradaBusqueda, PlanCuota, PlanPago,
+    ProyeccionCobroMensual, SolicitudCredito, Trabajo,
+)
+from .pagination import SAL_CURSOR
+from .services.centavos import (
+    CONTEXTO, TasaMensual, a_centavos, a_decimal, div_half_up, interes_centavos,
+)
+from .services import (
+    busqueda, estadisticas, plan_compacto, plan_pago, plan_pdf, proyeccion, simulador, tasas_efectivas, trabajos,
+)
+from .services.plan_pago import (
+    _calcular_cronograma_frances, fecha_primera_cuota, generar_plan, persistir_planes_lote, recorrer_hasta_cuota,
+)
+from .services.plan_pago_lote import calcular_cronogramas_lote
+from .services.plan_recalculo import recalcular_desde
+from .services.xlsx_streaming import Negrita, xlsx_streaming
+from .views import SimuladorGridAPIView
+
+
+# =========================================================
+#      REFERENCIA: camino Decimal original de plan_pago
+# =========================================================
+def _q2(x):
+    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _cronograma_decimal(capital, plazo_meses, tna, primera_cuota_fecha):
+    """Copia literal del cálculo previo a la aritmética en centavos."""
+    with localcontext(CONTEXTO):
+        P = _q2(capital)
+        n = int(plazo_meses)
+        r = Decimal(tna) / Decimal("1200")
+        if r == 0:
+            pmt = _q2(P / n)
+        else:
+            pmt = _q2(P * r / (Decimal(1) - (Decimal(1) + r) ** (-n)))
+        fecha = primera_cuota_fecha
+        cuotas = []
+        saldo = P
+        tot_cap = Decimal("0.00")
+        tot_int = Decimal("0.00")
+        ajuste_total = Decimal("0.00")
+        for k in range(1, n + 1):
+            interes = _q2(saldo * r) if r != 0 else Decimal("0.00")
+            capital_k = _q2(pmt - interes) if r != 0 else _q2(P / n)
+            cuota_k = pmt if r != 0 else _q2(capital_k + interes)
+            if k == n:
+                capital_k = _q2(saldo)
+                cuota_k = _q2(capital_k + interes)
+                ajuste_total = _q2((P + tot_int + interes) - (pmt * (n - 1) + cuota_k))
+            saldo = _q2(saldo - capital_k)
+            cuotas.append({
+                "nro_cuota": k,
+                "fecha_vencimiento": fecha,
+                "capital": capital_k,
+                "interes": interes,
+                "cuota": cuota_k,
+                "saldo": saldo,
+                "ajuste_redondeo": Decimal("0.00") if k < n else ajuste_total,
+            })
+            fecha = fecha + relativedelta(months=+1)
+            tot_cap += capital_k
+            tot_int += interes
+        plan = {
+            "metodo": "frances",
+            "moneda": "BOB",
+            "primera_cuota_fecha": cuotas[0]["fecha_vencimiento"],
+            "total_capital": _q2(tot_cap),
+            "total_interes": _q2(tot_int),
+            "total_cuotas": _q2(tot_cap + tot_int),
+            "redondeo_ajuste_total": _q2(ajuste_total),
+            "cuota": pmt,
+        }
+        return plan, cuotas
+
+
+def _casos_aleatorios(semilla, cantidad):
+    rnd = random.Random(semilla)
+    casos = []
+    for _ in range(cantidad):
+        capital = rnd.choice([
+            Decimal(rnd.randint(1, 10 ** 9)) / 100,
+            Decimal(60 * rnd.randint(1, 10 ** 5)) / 100,   # saldos propensos a empates con tna=10
+            rnd.uniform(100, 500000),                       # float, como llega del simulador
+        ])
+        plazo = rnd.choice([1, 2, 12, 36, 60, 120, 240, 360, rnd.randint(1, 480)])
+        tna = rnd.choice([
+            Decimal(0), Decimal(10), Decimal(7), Decimal("12.5"),
+            Decimal(rnd.randint(1, 600000)) / 10000,
+            rnd.uniform(0.5, 60),                           # float con muchos decimales
+        ])
+        fecha = date(rnd.randint(2020, 2030), rnd.choice([1, 3, 5, 8, 10, 12]), rnd.choice([1, 15, 28, 30, 31]))
+        casos.append((capital, plazo, tna, fecha))
+    return casos
+
+
+class CentavosTests(SimpleTestCase):
+    def test_div_half_up_aleja_de_cero(self):
+        self.assertEqual(div_half_up(5, 10), 1)
+        self.assertEqual(div_half_up(-5, 10), -1)
+        self.assertEqual(div_half_up(4, 10), 0)
+        self.assertEqual(div_half_up(15, 10), 2)
+        self.assertEqual(div_half_up(-14, 10), -1)
+
+    def test_a_centavos_half_up(self):
+        self.assertEqual(a_centavos(Decimal("0.005")), 1)
+        self.assertEqual(a_centavos(Decimal("-0.005")), -1)
+        self.assertEqual(a_centavos(Decimal("2.675")), 268)
+        self.assertEqual(a_centavos(10), 1000)
+        self.assertEqual(str(a_decimal(1200)), "12.00")
+        self.assertEqual(str(a_decimal(-5)), "-0.05")
+
+    def test_interes_igual_a_decimal(self):
+        rnd = random.Random(7)
+        for _ in range(20000):
+            saldo = rnd.choice([rnd.randint(0, 10 ** 10), 60 * (2 * rnd.randint(0, 10 ** 6) + 1)])
+            tna = rnd.choice([Decimal(10), Decimal(rnd.randint(0, 600000)) / 10000, rnd.uniform(0, 50)])
+            tasa = TasaMensual(tna)
+            with localcontext(CONTEXTO):
+                esperado = _q2(a_decimal(saldo) * (Decimal(tna) / Decimal("1200")))
+            self.assertEqual(interes_centavos(saldo, tasa), int(esperado.scaleb(2)), (saldo, tna))
+
+    def test_empate_con_tasa_inexacta(self):
+        # 0.60 * (10/1200): empate exacto a medio centavo, r truncada a 28 dígitos
+        with localcontext(CONTEXTO):
+            esperado = _q2(Decimal("0.60") * (Decimal(10) / Decimal("1200")))
+        self.assertEqual(interes_centavos(60, TasaMensual(10)), int(esperado.scaleb(2)))
+
+
+class CronogramaEquivalenciaTests(SimpleTestCase):
+    """El núcleo en centavos debe coincidir al centavo con el camino Decimal."""
+
+    def _comparar(self, obtenido, esperado, caso):
+        plan, cuotas = obtenido
+        plan_ref, cuotas_ref = esperado
+        self.assertEqual(plan, plan_ref, caso)
+        self.assertEqual(len(cuotas), len(cuotas_ref), caso)
+        for c, ref in zip(cuotas, cuotas_ref):
+            self.assertEqual(c, ref, (caso, c["nro_cuota"]))
+
+    def test_individual_aleatorio(self):
+        for caso in _casos_aleatorios(semilla=2024, cantidad=400):
+            self._comparar(_calcular_cronograma_frances(*caso), _cronograma_decimal(*caso), caso)
+
+    def test_lote_aleatorio(self):
+        casos = _casos_aleatorios(semilla=99, cantidad=400)
+        capitales, plazos, tnas, fechas = zip(*casos)
+        resultado = calcular_cronogramas_lote(capitales, plazos, tnas, fechas)
+        for caso, obtenido in zip(casos, resultado):
+            self._comparar(obtenido, _cronograma_decimal(*caso), caso)
+
+    def test_ajuste_ultima_cuota(self):
+        plan, cuotas = _calcular_cronograma_frances(Decimal("1000"), 7, Decimal("13.3333"), date(2025, 1, 31))
+        self.assertEqual(cuotas[-1]["saldo"], Decimal("0.00"))
+        self.assertEqual(sum(c["capital"] for c in cuotas), Decimal("1000.00"))
+        self.assertEqual(cuotas[1]["fecha_vencimiento"], date(2025, 2, 28))
+        self.assertEqual(cuotas[2]["fecha_vencimiento"], date(2025, 3, 28))
+
+    def test_cuota_individual_aleatoria(self):
+        rnd = random.Random(31)
+        for caso in _casos_aleatorios(semilla=5, cantidad=300):
+            _, cuotas = _calcular_cronograma_frances(*caso)
+            for k in {1, caso[1], rnd.randint(1, caso[1])}:
+                self.assertEqual(recorrer_hasta_cuota(caso[0], caso[1], caso[2], k, caso[3]), cuotas[k - 1], (caso, k))
+        with self.assertRaises(ValueError):
+            recorrer_hasta_cuota(Decimal("1000"), 12, Decimal("10"), 13)
+
+
+@override_settings(SIMULADOR_CACHE={'BACKEND': 'lru', 'MAX_ENTRIES': 2})
+class SimuladorCacheTests(SimpleTestCase):
+    FECHA = date(2025, 3, 10)
+
+    def setUp(self):
+        simulador.limpiar_cache()
+        self.addCleanup(simulador.limpiar_cache)
+
+    def test_acierto_devuelve_el_mismo_resultado(self):
+        primero = simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)
+        with patch.object(simulador, '_generar_plan', side_effect=AssertionError('no debía recalcular')):
+            segundo = simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)
+        self.assertEqual(primero, segundo)
+        stats = simulador.estadisticas_cache()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entradas']), (1, 1, 1))
+        # Las copias no comparten dicts con la caché
+        segundo[1][0]['cuota'] = Decimal("0")
+        self.assertEqual(simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA), primero)
+
+    def test_fallo_con_otros_parametros(self):
+        base = simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)
+        for otro in [(Decimal("1000.01"), 12, Decimal("10"), self.FECHA),
+                     (Decimal("1000"), 13, Decimal("10"), self.FECHA),
+                     (Decimal("1000"), 12, Decimal("10.01"), self.FECHA),
+                     (Decimal("1000"), 12, Decimal("10"), date(2025, 3, 11))]:
+            simulador.limpiar_cache()
+            simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)
+            self.assertNotEqual(simulador.simular_plan(*otro), base, otro)
+            self.assertEqual(simulador.estadisticas_cache()['misses'], 2, otro)
+
+    def test_claves_equivalentes(self):
+        simulador.simular_plan(Decimal("1000"), 12, Decimal("12.5"), self.FECHA)
+        for monto, plazo, tna, fecha in [(1000, '12', 12.5, self.FECHA),
+                                         (1000.0, 12, Decimal("12.50"), '2025-03-10'),
+                                         ('1000.004', 12.0, '12.500', self.FECHA)]:
+            simulador.simular_plan(monto, plazo, tna, fecha)
+        stats = simulador.estadisticas_cache()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entradas']), (3, 1, 1))
+        # Un float que no es exactamente 12.1 es otra tasa y otra entrada
+        self.assertNotEqual(simulador._clave(1000, 12, 12.1, self.FECHA),
+                            simulador._clave(1000, 12, Decimal("12.1"), self.FECHA))
+
+    def test_lru_descarta_el_menos_usado(self):
+        cache = simulador._CacheLRU(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c'), len(cache)), (1, None, 3, 2))
+
+        for plazo in (6, 12, 6, 24):
+            simulador.simular_plan(Decimal("1000"), plazo, Decimal("10"), self.FECHA)
+        simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)  # descartado por 24
+        stats = simulador.estadisticas_cache()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entradas']), (1, 4, 2))
+
+    @override_settings(SIMULADOR_CACHE={'BACKEND': 'django', 'ALIAS': 'default', 'TIMEOUT': 60})
+    def test_backend_django(self):
+        caches['default'].clear()
+        primero = simulador.simular_plan(Decimal("1000"), 12, Decimal("10"), self.FECHA)
+        self.assertEqual(simulador.simular_plan(1000, 12, 10, '2025-03-10'), primero)
+        stats = simulador.estadisticas_cache()
+        self.assertEqual((stats['backend'], stats['hits'], stats['misses']), ('django', 1, 1))
+
+
+class SimuladorGrillaTests(SimpleTestCase):
+    """Cada celda de la grilla es la misma simulación que simular_plan."""
+    FECHA = date(2025, 1, 31)
+
+    def setUp(self):
+        simulador.limpiar_cache()
+        self.addCleanup(simulador.limpiar_cache)
+
+    def test_celdas_iguales_a_simular_plan(self):
+        plazos, tasas = [1, 7, 12, 60], [Decimal('0'), Decimal('9.5'), Decimal('36')]
+        for incluir in (False, True):
+            grilla = simulador.simular_grilla(Decimal('12345.67'), plazos, tasas, self.FECHA, incluir_cuotas=incluir)
+            self.assertEqual([(c['plazo_meses'], c['tasa_nominal_anual']) for c in grilla],
+                             [(n, t) for n in plazos for t in tasas])
+            for celda in grilla:
+                plan, cuotas = simulador.simular_plan(Decimal('12345.67'), celda['plazo_meses'],
+                                                      celda['tasa_nominal_anual'], self.FECHA)
+                caso = (incluir, celda['plazo_meses'], celda['tasa_nominal_anual'])
+                for clave in ('cuota', 'total_interes', 'total_cuotas', 'tea', 'cft'):
+                    self.assertEqual(celda[clave], plan[clave], (caso, clave))
+                if incluir:
+                    self.assertEqual(celda['cuotas'], cuotas, caso)
+                else:
+                    self.assertNotIn('cuotas', celda)
+
+    def test_api_limites_y_validacion(self):
+        api = APIClient()
+        url = '/api/simulador/grid/'
+        base = {'monto': '5000', 'plazo_meses': [12, 24], 'tasa_nominal_anual': ['10', '12.5'],
+                'primera_cuota_fecha': '2025-01-31'}
+        resp = api.post(url, base, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['resultados']), 4)
+
+        limite = SimuladorGridAPIView.MAX_COMBINACIONES
+        self.assertEqual(api.post(url, {**base, 'plazo_meses': list(range(1, 21)),
+                                        'tasa_nominal_anual': list(range(limite // 20))}, format='json').status_code, 200)
+        self.assertEqual(api.post(url, {**base, 'plazo_meses': list(range(1, 22)),
+                                        'tasa_nominal_anual': list(range(limite // 20))}, format='json').status_code, 400)
+        for cambio in ({'monto': '-1'}, {'monto': 'abc'}, {'plazo_meses': [0, 12]}, {'plazo_meses': []},
+                       {'plazo_meses': 12}, {'tasa_nominal_anual': ['-1']}, {'tasa_nominal_anual': None},
+                       {'primera_cuota_fecha': '31/01/2025'}):
+            with self.subTest(cambio=cambio):
+                self.assertEqual(api.post(url, {**base, **cambio}, format='json').status_code, 400)
+
+
+class SimuladorNDJSONTests(SimpleTestCase):
+    """El modo streaming emite lo mismo que la respuesta JSON, línea por línea."""
+    DATOS = {'monto': '7500.50', 'plazo_meses': 18, 'tasa_nominal_anual': '14.25',
+             'primera_cuota_fecha': '2025-01-31'}
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def _lineas(self, resp):
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertTrue(resp['Content-Type'].startswith('application/x-ndjson'))
+        return [json.loads(linea) for linea in b''.join(resp.streaming_content).decode().splitlines()]
+
+    def test_igual_a_json(self):
+        completo = self.api.post('/api/simulador/', self.DATOS, format='json').json()
+        por_accept = self._lineas(self.api.post('/api/simulador/', self.DATOS, format='json',
+                                                HTTP_ACCEPT='application/x-ndjson'))
+        por_query = self._lineas(self.api.post('/api/simulador/?stream=ndjson', self.DATOS, format='json'))
+        self.assertEqual(por_accept, por_query)
+
+        tipos = [linea.pop('tipo') for linea in por_accept]
+        self.assertEqual(tipos, ['resumen'] + ['cuota'] * 18 + ['totales'])
+        resumen, cuotas, totales = por_accept[0], por_accept[1:-1], por_accept[-1]
+        self.assertEqual(cuotas, completo['cuotas'])
+        for clave in ('metodo', 'moneda', 'primera_cuota_fecha', 'cuota'):
+            self.assertEqual(resumen[clave], completo['resumen'][clave], clave)
+        self.assertEqual(totales, {k: completo['resumen'][k] for k in totales})
+        self.assertTrue({'total_capital', 'total_cuotas', 'tea', 'cft'} <= set(totales))
+
+    def test_parametros_invalidos_antes_del_stream(self):
+        for datos in ({**self.DATOS, 'plazo_meses': 0}, {**self.DATOS, 'monto': 'x'},
+                      {**self.DATOS, 'primera_cuota_fecha': 'mañana'}):
+            for extra in ({'HTTP_ACCEPT': 'application/x-ndjson'}, {}):
+                url = '/api/simulador/' if extra else '/api/simulador/?stream=ndjson'
+                with self.subTest(datos=datos, url=url):
+                    resp = self.api.post(url, datos, format='json', **extra)
+                    self.assertEqual(resp.status_code, 400)
+                    self.assertFalse(resp.streaming)
+                    self.assertIn('detail', json.loads(resp.content))
+
+
+class TasasEfectivasTests(SimpleTestCase):
+    """Solver vectorial de TEA/CFT."""
+    FECHA = date(2025, 2, 15)
+
+    def _tasas(self, capital, plazo, tna, costo=None):
+        _, cuotas = _calcular_cronograma_frances(Decimal(capital), plazo, Decimal(tna), self.FECHA)
+        flujos = (Decimal(capital), tasas_efectivas.fecha_desembolso_por_defecto(self.FECHA),
+                  [c['fecha_vencimiento'] for c in cuotas], [c['cuota'] for c in cuotas])
+        return tasas_efectivas.tasas_efectivas_lote([flujos], None if costo is None else [costo])[0]
+
+    def test_tea_de_un_plan_frances(self):
+        for plazo, tna in [(12, '12'), (36, '7.5'), (60, '24'), (240, '9.99'), (1, '30')]:
+            with self.subTest(plazo=plazo, tna=tna):
+                teorica = ((1 + Decimal(tna) / 1200) ** 12 - 1) * 100
+                tea = self._tasas('250000', plazo, tna)['tea']
+                self.assertLess(abs(tea - teorica), Decimal('0.001'), (tea, teorica))
+
+    def test_tasa_cero(self):
+        self.assertEqual(self._tasas('1000', 7, '0'), {'tea': Decimal('0.0000'), 'cft': Decimal('0.0000')})
+
+    def test_cft_con_costos_iniciales(self):
+        sin_costo = self._tasas('10000', 24, '12')
+        con_costo = self._tasas('10000', 24, '12', costo=Decimal('300'))
+        self.assertEqual(con_costo['tea'], sin_costo['tea'])
+        self.assertGreater(con_costo['cft'], con_costo['tea'])
+        self.assertGreater(con_costo['cft'], sin_costo['cft'])
+
+    def test_sin_convergencia(self):
+        fechas = [date(2025, m, 1) for m in (2, 3, 4)]
+        resultado = tasas_efectivas.tasas_efectivas_lote([
+            (Decimal('1000'), date(2025, 1, 1), fechas, [Decimal('0')] * 3),
+            (Decimal('1000'), date(2025, 1, 1), fechas, [Decimal('-5')] * 3),
+            (Decimal('1000'), date(2025, 1, 1), fechas, [Decimal('340')] * 3),
+        ])
+        self.assertEqual(resultado[:2], [{'tea': None, 'cft': None}] * 2)
+        self.assertIsNotNone(resultado[2]['tea'])
+        tir = tasas_efectivas.tir_lote([[-1000, 0, 0], [-1000, 600, 600]], [[0, 1, 2], [0, 1, 2]])
+        self.assertTrue(math.isnan(tir[0]))
+        self.assertAlmostEqual(tir[1], 0.1306623863, places=8)
+        self.assertEqual(tasas_efectivas.tasas_efectivas_cuotas(Decimal('1000'), []), {'tea': None, 'cft': None})
+
+
+class XlsxStreamingTests(SimpleTestCase):
+    def test_libro_legible_por_openpyxl(self):
+        import io
+        import openpyxl
+
+        filas = (Negrita(('#', 'Texto', 'Monto')), *((i, f'<fila & {i}>', Decimal('10.05') * i) for i in range(1, 2001)))
+        bloques = list(xlsx_streaming([('Plan: 1', iter(filas)), ('Plan: 1', iter([('x',)]))]))
+        self.assertGreater(len(bloques), 1)  # se entrega por partes, no al final
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(bloques)))
+        self.assertEqual(wb.sheetnames, ['Plan_ 1', 'Plan_ 1 (2)'])
+        ws = wb.worksheets[0]
+        self.assertTrue(ws['A1'].font.b)
+        self.assertEqual([c.value for c in ws[2001]], [2000, '<fila & 2000>', 20100])
+
+
+# =========================================================
+#                  BENCHMARKS
+# =========================================================
+class BenchmarkTests(SimpleTestCase):
+    def test_ejecutar_sin_bd(self):
+        doc = ejecutar('minimo', solo=['cronograma', 'lote'], con_bd=False)
+        self.assertIsNone(doc['meta']['bd'])
+        self.assertIn('cronograma/plazo=60', doc['resultados'])
+        self.assertIn('lote_resumen/n=100', doc['resultados'])
+        self.assertGreater(doc['resultados']['lote_resumen/n=100']['planes_por_seg'], 0)
+
+    def test_comparar_detecta_regresion(self):
+        base = {'resultados': {'a': {'mediana_seg': 1.0}, 'b': {'mediana_seg': 1.0}}}
+        actual = {'resultados': {'a': {'mediana_seg': 1.1}, 'b': {'mediana_seg': 1.5}, 'c': {'mediana_seg': 9.0}}}
+        filas = {f[0]: f for f in comparar(actual, base, tolerancia=0.2)}
+        self.assertEqual(set(filas), {'a', 'b'})
+        self.assertFalse(filas['a'][4])
+        self.assertTrue(filas['b'][4])
+
+
+class BenchmarkBDTests(TestCase):
+    def test_export_plan_no_deja_pdf_en_la_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with override_settings(PLAN_PDF_CACHE={'DIR': cache_dir}):
+            doc = ejecutar('minimo', solo=['export_plan'])
+        self.assertEqual(set(doc['resultados']), {'render_plan_pdf/plazo=12', 'export_plan_pdf_cache/plazo=12',
+                                                  'export_plan_xlsx/plazo=12'})
+        self.assertGreater(doc['resultados']['render_plan_pdf/plazo=12']['bytes'], 0)
+        self.assertEqual(os.listdir(cache_dir), [])
+        self.assertFalse(PlanPago.objects.exists())
+
+
+# =========================================================
+#                  PERSISTENCIA DE CUOTAS
+# =========================================================
+def _cuotas_guardadas(plan):
+    campos = ('nro_cuota', 'fecha_vencimiento', 'capital', 'interes', 'cuota', 'saldo', 'ajuste_redondeo')
+    return list(PlanCuota.objects.filter(plan=plan).order_by('nro_cuota').values(*campos))
+
+
+def _cuotas_esperadas(sol):
+    _, cuotas = _calcular_cronograma_frances(sol.monto, sol.plazo_meses, sol.tasa_nominal_anual,
+                                             fecha_primera_cuota(sol.fecha_aprobacion))
+    return cuotas
+
+
+class PersistenciaCuotasTests(TestCase):
+    """bulk_create por bloques, COPY (o su alternativa) y regeneración en sitio."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_pers', 'pe@x.com', 'x')
+        cls.cliente = Cliente.objects.create(user=cls.admin, numero_documento='PER1', telefono='0', direccion='-')
+
+    def _solicitud(self, plazo=24, monto=5000):
+        return SolicitudCredito.objects.create(cliente=self.cliente, monto=Decimal(monto), plazo_meses=plazo,
+                                               tasa_nominal_anual=Decimal('12'), estado='APROBADA')
+
+    @override_settings(PLAN_PAGO_PERSISTENCIA={'BATCH_SIZE': 7, 'COPY_MIN_CUOTAS': None})
+    def test_bulk_create_por_bloques(self):
+        sol = self._solicitud()
+        with patch.object(plan_pago, '_copy_cuotas', side_effect=AssertionError('COPY desactivado')):
+            plan = generar_plan(sol, self.admin)
+        self.assertEqual(_cuotas_guardadas(plan), _cuotas_esperadas(sol))
+
+    @override_settings(PLAN_PAGO_PERSISTENCIA={'BATCH_SIZE': 7, 'COPY_MIN_CUOTAS': 10})
+    def test_copy_o_alternativa(self):
+        sol = self._solicitud()
+        usa_copy = plan_pago._copy_disponible()
+        with patch.object(plan_pago, '_copy_cuotas', wraps=plan_pago._copy_cuotas) as copy:
+            plan = generar_plan(sol, self.admin)
+            self._solicitud(plazo=6)  # por debajo del umbral: siempre bulk_create
+            generar_plan(SolicitudCredito.objects.get(plazo_meses=6, cliente=self.cliente), self.admin)
+        self.assertEqual(copy.call_count, 1 if usa_copy else 0)
+        self.assertEqual(_cuotas_guardadas(plan), _cuotas_esperadas(sol))
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY requiere PostgreSQL')
+    def test_copy_postgresql(self):
+        sol = self._solicitud(plazo=60)
+        plan = PlanPago.objects.create(solicitud=sol, primera_cuota_fecha=date(2025, 1, 1), generado_por=self.admin)
+        cuotas = _cuotas_esperadas(sol)
+        plan_pago._copy_cuotas(plan, cuotas)
+        self.assertEqual(_cuotas_guardadas(plan), cuotas)
+
+    @override_settings(PLAN_PAGO_PERSISTENCIA={'BATCH_SIZE': 5})
+    def test_lote(self):
+        sols = [self._solicitud(plazo=n, monto=1000 * n) for n in (3, 12, 36)]
+        planes = []
+        for sol in sols:
+            plan, cuotas = _calcular_cronograma_frances(sol.monto, sol.plazo_meses, sol.tasa_nominal_anual,
+                                                        fecha_primera_cuota(sol.fecha_aprobacion))
+            planes.append((sol.pk, plan, cuotas))
+        guardados = persistir_planes_lote(planes, self.admin)
+        for plan, (sid, dto, cuotas) in zip(guardados, planes):
+            self.assertEqual(plan.solicitud_id, sid)
+            self.assertEqual(PlanPago.objects.get(pk=plan.pk).total_cuotas, dto['total_cuotas'])
+            self.assertEqual(_cuotas_guardadas(plan), cuotas)
+
+    def test_regenerar_en_sitio(self):
+        sol = self._solicitud(plazo=12)
+        plan = generar_plan(sol, self.admin)
+        pks = list(PlanCuota.objects.filter(plan=plan).order_by('nro_cuota').values_list('pk', flat=True))
+        cuotas = _cuotas_esperadas(sol)
+
+        self.assertEqual(plan_pago._reemplazar_cuotas(plan, cuotas), (0, 0, 0))
+        cambiada = dict(cuotas[4], interes=cuotas[4]['interes'] + 1)
+        self.assertEqual(plan_pago._reemplazar_cuotas(plan, cuotas[:4] + [cambiada] + cuotas[5:10]), (1, 0, 2))
+        self.assertEqual(PlanCuota.objects.get(plan=plan, nro_cuota=5).interes, cambiada['interes'])
+        self.assertEqual(plan_pago._reemplazar_cuotas(plan, cuotas), (1, 2, 0))
+        self.assertEqual(_cuotas_guardadas(plan), cuotas)
+        self.assertEqual(list(PlanCuota.objects.filter(plan=plan, nro_cuota__lte=10)
+                              .order_by('nro_cuota').values_list('pk', flat=True)), pks[:10])
+
+        # Por generar_plan: plazo menor borra las que sobran y conserva las filas
+        SolicitudCredito.objects.filter(pk=sol.pk).update(plazo_meses=8)
+        sol = SolicitudCredito.objects.select_related('plan').get(pk=sol.pk)
+        generar_plan(sol, self.admin, overwrite=True)
+        self.assertEqual(PlanPago.objects.filter(solicitud=sol).get().pk, plan.pk)
+        self.assertEqual(_cuotas_guardadas(plan), _cuotas_esperadas(sol))
+        self.assertEqual(list(PlanCuota.objects.filter(plan=plan).order_by('nro_cuota')
+                              .values_list('pk', flat=True)), pks[:8])
+
+
+class PlanCompactoTests(TestCase):
+    """Blob compacto: ida y vuelta exacta y conversión entre formatos con compactar_planes."""
+
+    def test_ida_y_vuelta(self):
+        _, largo = _calcular_cronograma_frances(Decimal('987654.32'), 480, Decimal('17.85'), date(2025, 1, 31))
+        _, corto = _calcular_cronograma_frances(Decimal('100'), 3, Decimal('0'), date(2024, 2, 29))
+        corto[-1] = dict(corto[-1], ajuste_redondeo=Decimal('-0.03'), saldo=Decimal('-0.01'))
+        for cuotas in (largo, corto, []):
+            blob = plan_compacto.empaquetar(cuotas)
+            self.assertEqual(plan_compacto.cuotas_dto(blob), cuotas)
+            self.assertEqual([c._asdict() for c in plan_compacto.desempaquetar(memoryview(blob))],
+                             [{**c, 'nro_cuenta': 0} for c in cuotas])
+        self.assertLess(len(plan_compacto.empaquetar(largo)), 480 * 6 * 8 // 2)
+        with self.assertRaises(ValueError):
+            plan_compacto.cuotas_dto(b'XX' + plan_compacto.empaquetar(corto)[2:])
+
+    def test_compactar_planes_en_ambos_sentidos(self):
+        from django.core.management import call_command
+
+        admin = User.objects.create_superuser('admin_cmp', 'c@x.com', 'x')
+        cliente = Cliente.objects.create(user=admin, numero_documento='CMP1', telefono='0', direccion='-')
+        sols = [SolicitudCredito.objects.create(cliente=cliente, monto=Decimal(1000 * n), plazo_meses=n,
+                                                tasa_nominal_anual=Decimal('11'), estado='APROBADA')
+                for n in (5, 12, 40)]
+        generar_plan(sols[0], admin)
+        generar_plan(sols[1], admin)
+        with override_settings(PLAN_PAGO_PERSISTENCIA={'FORMATO': 'compacto'}):
+            generar_plan(sols[2], admin)
+        esperadas = {sol.pk: _cuotas_esperadas(sol) for sol in sols}
+
+        # Un plan que cambió de formato después de listarlo (regenerado en paralelo) se saltea
+        from .management.commands.compactar_planes import Command
+        compacto = PlanPago.objects.get(solicitud=sols[2])
+        self.assertEqual(Command()._compactar([compacto.pk]), (0, 0))
+        self.assertEqual(_cuotas_plan(compacto), esperadas[sols[2].pk])
+
+        salida = io.StringIO()
+        call_command('compactar_planes', lote=1, stdout=salida)
+        self.assertIn('2 planes convertidos; 17 cuotas', salida.getvalue())
+        self.assertFalse(PlanCuota.objects.exists())
+        for plan in PlanPago.objects.all():
+            self.assertEqual(plan_compacto.cuotas_dto(plan.cuotas_compactas), esperadas[plan.solicitud_id])
+
+        call_command('compactar_planes', formato='filas', stdout=io.StringIO())
+        self.assertFalse(PlanPago.objects.filter(cuotas_compactas__isnull=False).exists())
+        for plan in PlanPago.objects.all():
+            self.assertEqual(_cuotas_guardadas(plan), esperadas[plan.solicitud_id])
+
+
+_CAMPOS_CUOTA = ('nro_cuota', 'fecha_vencimiento', 'capital', 'interes', 'cuota', 'saldo', 'ajuste_redondeo')
+
+
+def _cuotas_plan(plan):
+    """Cuotas de un plan en cualquiera de los dos formatos, como dicts de cuotas_dto."""
+    plan = PlanPago.objects.get(pk=plan.pk)
+    return [{k: getattr(c, k) for k in _CAMPOS_CUOTA}
+            for c in sorted(plan.iter_cuotas(), key=lambda c: c.nro_cuota)]
+
+
+def _rollup():
+    return list(ProyeccionCobroMensual.objects.order_by('mes', 'moneda', 'producto_id').values_list(
+        'mes', 'moneda', 'producto_id', 'capital', 'interes', 'total', 'cuotas'))
+
+
+def _rollup_coincide(test):
+    incremental = _rollup()
+    proyeccion.reconstruir()
+    test.assertEqual(incremental, _rollup())
+
+
+class PlanRecalculoTests(TestCase):
+    """recalcular_desde: prepago, plazo y tasa desde la cuota k, en ambos formatos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_rec', 'r@x.com', 'x')
+        cls.cliente = Cliente.objects.create(user=cls.admin, numero_documento='REC1', telefono='0', direccion='-')
+
+    def _plan(self, formato='filas'):
+        sol = SolicitudCredito.objects.create(cliente=self.cliente, monto=Decimal('10000'), plazo_meses=12,
+                                              tasa_nominal_anual=Decimal('12'), estado='APROBADA')
+        with override_settings(PLAN_PAGO_PERSISTENCIA={'FORMATO': formato}):
+            return generar_plan(sol, self.admin)
+
+    def _cola_esperada(self, saldo, meses, tna, desde, fecha):
+        _, cola = _calcular_cronograma_frances(saldo, meses, tna, fecha)
+        return [dict(c, nro_cuota=c['nro_cuota'] + desde - 1) for c in cola]
+
+    def _cuenta(self, res):
+        return res['actualizadas'], res['creadas'], res['borradas']
+
+    def test_desde_la_primera_tras_un_prepago(self):
+        plan = self._plan()
+        original = _cuotas_plan(plan)
+        self.assertEqual(recalcular_desde(plan, 5, prepago=1000)['plan'].total_capital, Decimal('9000.00'))
+        # Desde la cuota 1 se parte del monto desembolsado, no de los totales del plan;
+        # el prepago de la cuota 5 queda descartado (no se guarda aparte)
+        res = recalcular_desde(plan, 1)
+        self.assertEqual((original[0]['capital'], original[0]['interes']), (Decimal('788.49'), Decimal('100.00')))
+        self.assertEqual(self._cuenta(res), (8, 0, 0))
+        self.assertEqual(_cuotas_plan(plan), original)
+        self.assertEqual(res['plan'].total_capital, Decimal('10000.00'))
+        self.assertEqual(self._cuenta(recalcular_desde(plan, 1)), (0, 0, 0))
+
+    def test_prepago(self):
+        plan = self._plan()
+        original = _cuotas_plan(plan)
+        pks = list(PlanCuota.objects.filter(plan=plan, nro_cuota__lt=5).order_by('nro_cuota')
+                   .values_list('pk', 'capital', 'saldo'))
+        res = recalcular_desde(plan, 5, prepago=Decimal('1000'))
+        self.assertEqual(self._cuenta(res), (8, 0, 0))
+
+        cuotas = _cuotas_plan(plan)
+        self.assertEqual(cuotas[:4], original[:4])
+        self.assertEqual(list(PlanCuota.objects.filter(plan=plan, nro_cuota__lt=5).order_by('nro_cuota')
+                              .values_list('pk', 'capital', 'saldo')), pks)
+        self.assertEqual(cuotas[4:], self._cola_esperada(original[3]['saldo'] - 1000, 8, Decimal('12'), 5,
+                                                         original[4]['fecha_vencimiento']))
+        self.assertLess(cuotas[4]['cuota'], original[4]['cuota'])
+        plan.refresh_from_db()
+        self.assertEqual(plan.total_capital, sum(c['capital'] for c in cuotas))
+        self.assertEqual(plan.total_cuotas, sum(c['cuota'] for c in cuotas))
+
+        with self.assertRaises(ValueError):
+            recalcular_desde(plan, 5, prepago=cuotas[3]['saldo'] + 1)
+        # Fuera de rango: el error es el rango, no "cuotas faltantes"
+        for k in (0, 13, 17):
+            with self.assertRaisesRegex(ValueError, 'entre 1 y 12'):
+                recalcular_desde(plan, k)
+
+    def test_cambio_de_plazo(self):
+        plan = self._plan()
+        original = _cuotas_plan(plan)
+        self.assertEqual(self._cuenta(recalcular_desde(plan, 7, plazo_meses=18)), (6, 6, 0))
+        cuotas = _cuotas_plan(plan)
+        self.assertEqual([c['nro_cuota'] for c in cuotas], list(range(1, 19)))
+        self.assertEqual(cuotas[6:], self._cola_esperada(original[5]['saldo'], 12, Decimal('12'), 7,
+                                                         original[6]['fecha_vencimiento']))
+        self.assertEqual(cuotas[-1]['saldo'], Decimal('0.00'))
+
+        self.assertEqual(self._cuenta(recalcular_desde(plan, 7, plazo_meses=9)), (3, 0, 9))
+        self.assertEqual(_cuotas_plan(plan)[6:], self._cola_esperada(
+            original[5]['saldo'], 3, Decimal('12'), 7, original[6]['fecha_vencimiento']))
+        with self.assertRaises(ValueError):
+            recalcular_desde(plan, 7, plazo_meses=6)
+        _rollup_coincide(self)  # los meses 10..18 quedaron sin cuotas
+
+    def test_cambio_de_tasa(self):
+        plan = self._plan()
+        original = _cuotas_plan(plan)
+        recalcular_desde(plan, 4, tna=Decimal('6'))
+        cuotas = _cuotas_plan(plan)
+        self.assertEqual(cuotas[:3], original[:3])
+        self.assertEqual(cuotas[3]['interes'], (original[2]['saldo'] * Decimal('0.005')).quantize(Decimal('0.01')))
+        self.assertEqual(cuotas[3:], self._cola_esperada(original[2]['saldo'], 9, Decimal('6'), 4,
+                                                         original[3]['fecha_vencimiento']))
+        self.assertEqual(PlanPago.objects.get(pk=plan.pk).tasa_vigente, Decimal('6'))
+        # Sin cambios se conserva la cuota fija y no se escribe nada
+        self.assertEqual(self._cuenta(recalcular_desde(plan, 4)), (0, 0, 0))
+        self.assertEqual(self._cuenta(recalcular_desde(plan, 8)), (0, 0, 0))
+        self.assertEqual(_cuotas_plan(plan), cuotas)
+
+    def test_tasa_como_se_guarda(self):
+        plan = self._plan()
+        original = _cuotas_plan(plan)
+        # Más de 4 decimales: la cola se calcula con la tasa que queda guardada
+        recalcular_desde(plan, 4, tna=Decimal('7.123456'))
+        self.assertEqual(PlanPago.objects.get(pk=plan.pk).tasa_vigente, Decimal('7.1235'))
+        antes = _cuotas_plan(plan)
+        self.assertEqual(antes[3:], self._cola_esperada(original[2]['saldo'], 9, Decimal('7.1235'), 4,
+                                                        original[3]['fecha_vencimiento']))
+        for tna in ('1000', '-1', 'NaN', 'Infinity', 'doce'):
+            with self.subTest(tna=tna), self.assertRaises(ValueError):
+                recalcular_desde(plan, 4, tna=tna)
+        self.assertEqual(_cuotas_plan(plan), antes)
+        self.assertEqual(PlanPago.objects.get(pk=plan.pk).tasa_vigente, Decimal('7.1235'))
+
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        resp = api.post(f'/api/solicitudes/{plan.solicitud_id}/plan-pagos/recalcular/',
+                        {'desde_cuota': 4, 'tasa_nominal_anual': '1e9'}, format='json')
+        self.assertEqual(resp.status_code, 409)
+
+    def test_formato_compacto_igual_a_filas(self):
+        filas, compacto = self._plan(), self._plan('compacto')
+        pasos = [dict(desde_cuota=5, prepago=Decimal('1000')), dict(desde_cuota=3, tna=Decimal('18')),
+                 dict(desde_cuota=6, plazo_meses=20), dict(desde_cuota=1), dict(desde_cuota=10, plazo_meses=11)]
+        for paso in pasos:
+            with self.subTest(paso=paso):
+                res_filas = recalcular_desde(filas, **paso)
+                res_compacto = recalcular_desde(compacto, **paso)
+                self.assertTrue(res_compacto['plan'].es_compacto)
+                self.assertEqual(self._cuenta(res_filas), self._cuenta(res_compacto))
+                self.assertEqual(_cuotas_plan(filas), _cuotas_plan(compacto))
+        self.assertFalse(PlanCuota.objects.filter(plan=compacto).exists())
+        _rollup_coincide(self)
+
+
+class ProyeccionRollupTests(TestCase):
+    """El rollup mensual mantenido con deltas coincide con reconstruir()."""
+
+    def test_incremental_igual_a_reconstruir(self):
+        from .models import ProductoFinanciero
+
+        admin = User.objects.create_superuser('admin_proy', 'py@x.com', 'x')
+        cliente = Cliente.objects.create(user=admin, numero_documento='PRY1', telefono='0', direccion='-')
+        producto = ProductoFinanciero.objects.create(
+            codigo='PRY', nombre='Consumo', tipo='PERSONAL', tasa_nominal_anual_min=1, tasa_nominal_anual_max=30,
+            plazo_min=1, plazo_max=480, monto_min=1, monto_max=10 ** 6)
+
+        def sol(plazo, **extra):
+            return SolicitudCredito.objects.create(cliente=cliente, monto=Decimal(700 * plazo), plazo_meses=plazo,
+                                                   tasa_nominal_anual=Decimal('15'), estado='APROBADA', **extra)
+
+        def recargar(s):
+            return SolicitudCredito.objects.select_related('plan').get(pk=s.pk)
+
+        api = APIClient()
+        api.force_authenticate(admin)
+
+        for formato in ('filas', 'compacto'):
+            with self.subTest(formato=formato), \
+                    override_settings(PLAN_PAGO_PERSISTENCIA={'FORMATO': formato, 'BATCH_SIZE': 4}):
+                a, b = sol(12), sol(24, producto=producto, moneda='USD')
+                generar_plan(a, admin)
+                generar_plan(b, admin)
+                _rollup_coincide(self)
+
+                SolicitudCredito.objects.filter(pk=a.pk).update(plazo_meses=6, monto=Decimal('3000'))
+                generar_plan(recargar(a), admin, overwrite=True)
+                _rollup_coincide(self)
+
+                lote = [sol(n, producto=producto) for n in (3, 9, 30)]
+                persistir_planes_lote([(s.pk, *_calcular_cronograma_frances(
+                    s.monto, s.plazo_meses, s.tasa_nominal_anual, fecha_primera_cuota(None))) for s in lote], admin)
+                _rollup_coincide(self)
+
+                recalcular_desde(PlanPago.objects.get(solicitud=b), 5, prepago=Decimal('2000'), plazo_meses=10)
+                recalcular_desde(PlanPago.objects.get(solicitud=lote[2]), 2, tna=Decimal('4'))
+                _rollup_coincide(self)
+
+                # Borrados: el plan solo y la solicitud con su plan en cascada
+                PlanPago.objects.get(solicitud=lote[0]).delete()
+                _rollup_coincide(self)
+                self.assertEqual(api.delete(f'/api/solicitudes/{a.pk}/').status_code, 204)
+                self.assertFalse(PlanPago.objects.filter(solicitud=a.pk).exists())
+                _rollup_coincide(self)
+        self.assertEqual({m for m, in ProyeccionCobroMensual.objects.values_list('moneda')}, {'BOB', 'USD'})
+
+
+class GenerarPlanesAprobadosTests(TestCase):
+    """manage.py generar_planes_aprobados: sólo APROBADAS sin plan, y repetible."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_gpa', 'g@x.com', 'x')
+        cliente = Cliente.objects.create(user=cls.admin, numero_documento='GPA1', telefono='0', direccion='-')
+
+        def sol(plazo, estado='APROBADA', **extra):
+            return SolicitudCredito.objects.create(cliente=cliente, monto=Decimal(1000 * plazo), plazo_meses=plazo,
+                                                   tasa_nominal_anual=Decimal('10'), estado=estado, **extra)
+
+        cls.pendientes = [sol(n) for n in (3, 6, 12)]
+        cls.con_plan = sol(9)
+        cls.plan_previo = generar_plan(cls.con_plan, cls.admin)
+        cls.ignoradas = [sol(4, estado='ENVIADA'), sol(5, is_deleted=True)]
+
+    def _ejecutar(self):
+        from django.core.management import call_command
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        salida = io.StringIO()
+        call_command('generar_planes_aprobados', workers=1, lote=2,
+                     checkpoint=os.path.join(directorio, 'avance.json'), stdout=salida)
+        return salida.getvalue()
+
+    def test_genera_omite_y_es_idempotente(self):
+        self.assertIn('✅ 3 planes generados', self._ejecutar())
+        for sol in self.pendientes:
+            plan = PlanPago.objects.get(solicitud=sol)
+            self.assertEqual(_cuotas_guardadas(plan), _cuotas_esperadas(sol))
+        previo = PlanPago.objects.get(solicitud=self.con_plan)
+        self.assertEqual((previo.pk, previo.generado_en), (self.plan_previo.pk, self.plan_previo.generado_en))
+        self.assertFalse(PlanPago.objects.filter(solicitud__in=self.ignoradas).exists())
+
+        cuotas = PlanCuota.objects.count()
+        self.assertIn('✅ 0 planes generados', self._ejecutar())
+        self.assertEqual((PlanPago.objects.count(), PlanCuota.objects.count()), (4, cuotas))
+
+
+# =========================================================
+#                  PAGINACIÓN KEYSET
+# =========================================================
+@override_settings(PAGINACION_KEYSET={'PAGE_SIZE': 3, 'MAX_PAGE_SIZE': 5})
+class PaginacionKeysetTests(TestCase):
+    """Cursores firmados sobre (-created_at, -id): sin duplicados ni saltos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.utils import timezone
+
+        cls.admin = User.objects.create_superuser('admin_pag', 'pg@x.com', 'x')
+        cls.cliente = Cliente.objects.create(user=cls.admin, numero_documento='PAG1', telefono='0', direccion='-')
+        cls.base = timezone.now()
+        for i in range(8):
+            sol = cls._crear()
+            # de a pares con el mismo created_at: el desempate lo hace el id
+            SolicitudCredito.objects.filter(pk=sol.pk).update(created_at=cls.base - timedelta(minutes=i // 2))
+
+    @classmethod
+    def _crear(cls):
+        return SolicitudCredito.objects.create(cliente=cls.cliente, monto=1000, plazo_meses=12,
+                                               tasa_nominal_anual=10)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _ordenadas(self):
+        return [str(pk) for pk in SolicitudCredito.objects.order_by('-created_at', '-id').values_list('pk', flat=True)]
+
+    def _pagina(self, url='/api/solicitudes/', **params):
+        resp = self.api.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return [f['id'] for f in resp.data['results']], resp.data['next'], resp.data['previous']
+
+    def _recorrer(self):
+        ids, siguiente, anterior = self._pagina()
+        self.assertIsNone(anterior)
+        paginas = [ids]
+        while siguiente:
+            ids, siguiente, _ = self._pagina(siguiente)
+            paginas.append(ids)
+        return paginas
+
+    def test_adelante_y_atras(self):
+        paginas = self._recorrer()
+        self.assertEqual([len(p) for p in paginas], [3, 3, 2])
+        self.assertEqual(sum(paginas, []), self._ordenadas())
+
+        ids, siguiente, anterior = self._pagina()
+        ids, siguiente, anterior = self._pagina(siguiente)
+        ids, siguiente, anterior = self._pagina(siguiente)
+        self.assertIsNone(siguiente)
+        atras, _, anterior = self._pagina(anterior)
+        self.assertEqual(atras, paginas[1])
+        atras, siguiente, anterior = self._pagina(anterior)
+        self.assertEqual(atras, paginas[0])
+        self.assertIsNone(anterior)
+        self.assertEqual(self._pagina(siguiente)[0], paginas[1])
+
+    def test_cursor_alterado(self):
+        from urllib.parse import parse_qs, urlparse
+
+        _, siguiente, _ = self._pagina()
+        cursor = parse_qs(urlparse(siguiente).query)['cursor'][0]
+        alterado = cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB')
+        for valor in (alterado, 'basura', signing.dumps({'p': ['x', 'y']}, salt='otra-sal'),
+                      signing.dumps({'p': ['2025-01-01T00:00:00']}, salt=SAL_CURSOR)):
+            with self.subTest(cursor=valor):
+                self.assertEqual(self.api.get('/api/solicitudes/', {'cursor': valor}).status_code, 404)
+
+    def test_tope_de_page_size(self):
+        self.assertEqual(len(self._pagina(page_size=100)[0]), 5)
+        self.assertEqual(len(self._pagina(page_size=4)[0]), 4)
+        self.assertEqual(len(self._pagina(page_size='abc')[0]), 3)
+        self.assertEqual(len(self._pagina(page_size=0)[0]), 1)
+        ids, siguiente, _ = self._pagina(page_size=100)
+        self.assertEqual(len(self._pagina(siguiente)[0]), 3)  # el cursor conserva page_size (tope 5)
+
+    def test_insercion_entre_paginas(self):
+        antes = self._ordenadas()
+        primera, siguiente, _ = self._pagina()
+        ultima = SolicitudCredito.objects.get(pk=primera[-1])
+        # Nuevas filas: una al frente (más reciente) y dos empatadas con el cursor,
+        # una antes y otra después de él según el id
+        nueva = self._crear()
+        empatadas = [self._crear(), self._crear()]
+        SolicitudCredito.objects.filter(pk__in=[e.pk for e in empatadas]).update(created_at=ultima.created_at)
+
+        resto = []
+        while siguiente:
+            ids, siguiente, _ = self._pagina(siguiente)
+            resto.extend(ids)
+        self.assertEqual(len(resto), len(set(resto)))
+        self.assertFalse(set(resto) & set(primera))
+        self.assertNotIn(str(nueva.pk), resto)
+        # Todo lo que estaba sale una vez, y las nuevas según su posición respecto del cursor
+        esperado = [pk for pk in self._ordenadas()
+                    if (ultima.created_at, str(ultima.pk)) > (SolicitudCredito.objects.get(pk=pk).created_at, pk)]
+        self.assertEqual(resto, esperado)
+        self.assertTrue(set(antes) <= set(primera) | set(resto))
+
+
+# =========================================================
+#                  BÚSQUEDA
+# =========================================================
+class BusquedaTests(TestCase):
+    """Índice EntradaBusqueda: sin tildes ni mayúsculas, filtro por tipo y señales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_bus', 'b@x.com', 'x')
+        cls.jose = User.objects.create_user('jp01', 'jose@correo.com', first_name='José', last_name='Pérez')
+        cls.cliente = Cliente.objects.create(user=cls.jose, numero_documento='CI-4455667', telefono='+591 700-12345',
+                                             direccion='-')
+        cls.angela = User.objects.create_user('angela', 'angela@banco.com', first_name='ÁNGELA', last_name='Núñez')
+        cls.sol = SolicitudCredito.objects.create(cliente=cls.cliente, monto=1000, plazo_meses=12,
+                                                  tasa_nominal_anual=10)
+
+    def _ids(self, q, tipo=None):
+        return {(r['tipo'], r['id']) for r in busqueda.buscar(q, tipo=tipo)}
+
+    def test_sin_tildes_ni_mayusculas(self):
+        cliente = ('cliente', str(self.cliente.pk))
+        for q in ('jose perez', 'PÉREZ josé', 'Jose', 'ci-4455667', '70012345', 'JOSE@CORREO'):
+            with self.subTest(q=q):
+                self.assertEqual(self._ids(q), {cliente})
+        for q in ('angela nunez', 'Ángela NÚÑEZ', 'nuñez'):
+            with self.subTest(q=q):
+                self.assertEqual(self._ids(q), {('usuario', str(self.angela.pk))})
+        self.assertEqual(self._ids('perez angela'), set())
+        with self.assertRaises(ValueError):
+            busqueda.buscar('jo')
+
+    def test_filtro_por_tipo(self):
+        self.assertEqual(self._ids('.com'), {('cliente', str(self.cliente.pk)), ('usuario', str(self.angela.pk)),
+                                             ('usuario', str(self.admin.pk))})
+        self.assertEqual(self._ids('.com', tipo='cliente'), {('cliente', str(self.cliente.pk))})
+        self.assertEqual(self._ids(str(self.sol.pk)[:8], tipo='solicitud'), {('solicitud', str(self.sol.pk))})
+
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        resp = api.get('/api/busqueda/', {'q': 'núñez', 'tipo': 'usuario'})
+        self.assertEqual([r['id'] for r in resp.data['resultados']], [str(self.angela.pk)])
+        self.assertEqual(api.get('/api/busqueda/', {'q': 'nunez', 'tipo': 'otro'}).status_code, 400)
+        self.assertEqual(api.get('/api/busqueda/', {'q': 'nu'}).status_code, 400)
+
+    def test_indice_al_guardar_y_borrar(self):
+        self.jose.last_name = 'Gómez'
+        self.jose.save()
+        self.assertEqual(self._ids('perez'), set())
+        self.assertEqual(self._ids('jose gomez'), {('cliente', str(self.cliente.pk))})
+
+        # El usuario que pasa a ser cliente deja de buscarse como usuario
+        cliente = Cliente.objects.create(user=self.angela, numero_documento='CI-998877', telefono='0', direccion='-')
+        self.assertEqual(self._ids('nunez'), {('cliente', str(cliente.pk))})
+        cliente.delete()
+        self.assertEqual(self._ids('nunez'), {('usuario', str(self.angela.pk))})
+        self.angela.delete()
+        self.assertEqual(self._ids('nunez'), set())
+
+        fragmento = str(self.sol.pk)[:8]
+        self.sol.is_deleted = True
+        self.sol.save(update_fields=['is_deleted'])
+        self.assertEqual(self._ids(fragmento, tipo='solicitud'), set())
+        self.sol.is_deleted = False
+        self.sol.save()
+        self.assertEqual(self._ids(fragmento, tipo='solicitud'), {('solicitud', str(self.sol.pk))})
+        self.sol.delete()
+        self.assertEqual(self._ids(fragmento, tipo='solicitud'), set())
+
+        indice = set(EntradaBusqueda.objects.values_list('tipo', 'objeto_id', 'texto', 'titulo', 'subtitulo'))
+        busqueda.reconstruir()
+        self.assertEqual(set(EntradaBusqueda.objects.values_list('tipo', 'objeto_id', 'texto', 'titulo',
+                                                                 'subtitulo')), indice)
+
+
+# =========================================================
+#                  ESTADÍSTICAS DE SOLICITUDES
+# =========================================================
+def _estadisticas():
+    """Filas con aporte (las que quedan en cero no existen tras reconstruir())."""
+    from .models import EstadisticaSolicitudMensual
+    from .services.estadisticas import CAMPOS
+
+    filas = EstadisticaSolicitudMensual.objects.values_list(
+        'mes', 'estado', 'producto_id', 'tipo_credito', 'moneda', *CAMPOS)
+    return sorted((f for f in filas if f[5]), key=str)
+
+
+class EstadisticasIncrementalesTests(TestCase):
+    """Los contadores mantenidos con deltas coinciden con estadisticas.reconstruir()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import ProductoFinanciero
+
+        cls.admin = User.objects.create_superuser('admin_est', 'est@x.com', 'x')
+        cls.cliente = Cliente.objects.create(user=cls.admin, numero_documento='EST1', telefono='0', direccion='-')
+        cls.producto = ProductoFinanciero.objects.create(
+            codigo='EST', nombre='Consumo', tipo='PERSONAL', tasa_nominal_anual_min=1, tasa_nominal_anual_max=30,
+            plazo_min=1, plazo_max=480, monto_min=1, monto_max=10 ** 6)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _coincide(self):
+        from .models import EstadisticaSolicitudMensual
+
+        incremental = _estadisticas()
+        # Las filas que quedaron en cero no aportan nada (resumen() las omite)
+        vacias = EstadisticaSolicitudMensual.objects.filter(cantidad=0)
+        self.assertFalse(vacias.exclude(monto_total=0).exists())
+        self.assertFalse(vacias.exclude(evaluadas=0, aprobadas=0).exists())
+        estadisticas.reconstruir()
+        self.assertEqual(incremental, _estadisticas())
+
+    def _crear(self, monto, moneda='BOB'):
+        resp = self.api.post('/api/solicitudes/', {
+            'cliente': self.cliente.pk, 'producto': self.producto.pk, 'tipo_trabajador': 'PRIVADO',
+            'monto': monto, 'plazo_meses': 12, 'tasa_nominal_anual': '10', 'moneda': moneda}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data['id']
+
+    def test_incremental_igual_a_reconstruir(self):
+        ids = [self._crear(m) for m in ('1000.10', '2500', '730.55')] + [self._crear('900', moneda='USD')]
+        self._coincide()
+
+        # Cambios de estado: uno a uno y en lote
+        self.api.patch(f'/api/solicitudes/{ids[0]}/evaluar/', {'score_riesgo': 70}, format='json')
+        self.api.post(f'/api/solicitudes/{ids[0]}/decidir/', {'decision': 'APROBAR'}, format='json')
+        self.api.post('/api/solicitudes/evaluar-lote/', {'items': [{'id': i, 'score_riesgo': 50}
+                                                                   for i in ids[1:3]]}, format='json')
+        self.api.post('/api/solicitudes/decidir-lote/', {'items': [{'id': ids[1], 'decision': 'RECHAZAR'},
+                                                                   {'id': ids[3], 'decision': 'APROBAR'}]},
+                      format='json')
+        self.assertEqual(SolicitudCredito.objects.get(pk=ids[3]).estado, 'APROBADA')
+        self._coincide()
+
+        # Edición de monto y moneda
+        self.api.patch(f'/api/solicitudes/{ids[2]}/', {'monto': '4000', 'moneda': 'USD'}, format='json')
+        self._coincide()
+
+        # Baja lógica y su reversión, y borrado
+        sol = SolicitudCredito.objects.get(pk=ids[1])
+        antes = estadisticas.instantanea(sol)
+        sol.is_deleted = True
+        sol.save(update_fields=['is_deleted'])
+        estadisticas.registrar_cambio(antes, sol)
+        self._coincide()
+        antes = estadisticas.instantanea(sol)
+        sol.is_deleted = False
+        sol.save(update_fields=['is_deleted'])
+        estadisticas.registrar_cambio(antes, sol)
+        self._coincide()
+        self.assertEqual(self.api.delete(f'/api/solicitudes/{ids[0]}/').status_code, 204)
+        self._coincide()
+
+        resumen = estadisticas.resumen()
+        self.assertEqual({(r['moneda'], r['cantidad']) for r in resumen['total']}, {('BOB', 1), ('USD', 2)})
+        self.assertEqual(sum(r['aprobadas'] for r in resumen['estado']), 1)
+
+
+# =========================================================
+#                  PRESUPUESTO DE CONSULTAS
+# =========================================================
+@override_settings(PRESUPUESTO_CONSULTAS='error')
+class PresupuestoConsultasTests(TestCase):
+    """Los listados cuestan un número fijo de consultas, sin importar las filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_q', 'q@x.com', 'x')
+        oficial = Empleado.objects.create(
+            user=User.objects.create_user('oficial_q'), codigo_empleado='EQ1',
+            departamento='Créditos', fecha_contratacion='2024-01-01', salario=1)
+        for i in range(4):
+            u = User.objects.create_user(f'cliente_q{i}', first_name='C', last_name=str(i))
+            cliente = Cliente.objects.create(user=u, numero_documento=f'Q{i}', telefono='0', direccion='-')
+            SolicitudCredito.objects.create(cliente=cliente, oficial=oficial, monto=1000,
+                                            plazo_meses=12, tasa_nominal_anual=10)
+            Bitacora.objects.create(usuario=u, tipo_accion='PRUEBA')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_listados_dentro_del_presupuesto(self):
+        for url in ('/api/solicitudes/', '/api/users/', '/api/clientes/',
+                    '/api/empleados/', '/api/bitacora/', '/api/documentos/'):
+            with self.subTest(url=url):
+                resp = self.api.get(url)
+                self.assertEqual(resp.status_code, 200)
+
+    def test_decision_en_lote(self):
+        ids = [str(pk) for pk in SolicitudCredito.objects.values_list('pk', flat=True)]
+        items = [{'id': pk, 'decision': 'APROBAR' if i % 2 else 'RECHAZAR'} for i, pk in enumerate(ids)]
+        resp = self.api.post('/api/solicitudes/decidir-lote/', {'items': items + [items[0]]}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data['aplicados'], resp.data['rechazados']), (4, 1))
+        self.assertEqual(SolicitudCredito.objects.filter(estado='APROBADA').count(), 2)
+        # Ya decididas: la transición se rechaza ítem por ítem
+        resp = self.api.post('/api/solicitudes/decidir-lote/', {'items': items}, format='json')
+        self.assertEqual(resp.data['aplicados'], 0)
+
+    def test_evaluacion_en_lote_con_scores_fuera_de_rango(self):
+        ids = [str(pk) for pk in SolicitudCredito.objects.values_list('pk', flat=True)]
+        malos = [1000, -5000, 'NaN', 'Infinity', '1e9', '1e30', 0.123456, 'alto', True]
+        items = [{'id': ids[0], 'score_riesgo': '75.5'}, {'id': ids[1], 'score_riesgo': -999.99}]
+        items += [{'id': str(uuid4()), 'score_riesgo': score} for score in malos]
+        resp = self.api.post('/api/solicitudes/evaluar-lote/', {'items': items}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data['aplicados'], resp.data['rechazados']), (2, len(malos)))
+        for r, score in zip(resp.data['resultados'][2:], malos):
+            with self.subTest(score=score):
+                self.assertIn('score_riesgo', r['error'])
+        self.assertEqual(dict(SolicitudCredito.objects.filter(pk__in=ids[:2]).values_list('pk', 'score_riesgo')),
+                         {UUID(ids[0]): Decimal('75.50'), UUID(ids[1]): Decimal('-999.99')})
+
+    def test_seguimiento_incremental(self):
+        sol = SolicitudCredito.objects.first()
+        url = f'/api/solicitudes/{sol.pk}/seguimiento/'
+        self.api.patch(f'/api/solicitudes/{sol.pk}/evaluar/', {'score_riesgo': 60}, format='json')
+        primero = self.api.get(url).data
+        self.assertEqual([e['evento'] for e in primero['timelineEstados']], ['ESTADO_EVALUADA'])
+
+        self.api.post(f'/api/solicitudes/{sol.pk}/decidir/', {'decision': 'APROBAR'}, format='json')
+        nuevos = self.api.get(url, {'since': primero['ultimo']}).data
+        self.assertEqual([(e['estado_anterior'], e['estado_nuevo']) for e in nuevos['timelineEstados']],
+                         [('EVALUADA', 'APROBADA')])
+        self.assertEqual(self.api.get(url, {'since': nuevos['ultimo']}).data['timelineEstados'], [])
+
+    def test_presupuesto_excedido(self):
+        with self.assertRaises(PresupuestoConsultasExcedido):
+            with presupuesto_consultas(1, 'dos consultas'):
+                list(User.objects.all())
+                list(Cliente.objects.all())
+        with presupuesto_consultas(1):
+            list(SolicitudCredito.objects.select_related('cliente__user', 'oficial'))
+
+
+# =========================================================
+#                  ÍNDICES (EXPLAIN)
+# =========================================================
+@skipUnless(connection.vendor in ('postgresql', 'sqlite'), 'EXPLAIN específico de PostgreSQL/SQLite')
+class IndicesExplainTests(TestCase):
+    """Las consultas frecuentes usan los índices de la migración 0010."""
+
+    @classmethod
+    def setUpTestData(cls):
+        oficiales = [
+            Empleado.objects.create(user=User.objects.create_user(f'of_idx{i}'), codigo_empleado=f'EIDX{i}',
+                                    departamento='Créditos', fecha_contratacion='2024-01-01', salario=1)
+            for i in range(5)
+        ]
+        clientes = [
+            Cliente.objects.create(user=User.objects.create_user(f'cli_idx{i}'), numero_documento=f'IDX{i}',
+                                   telefono='0', direccion='-')
+            for i in range(20)
+        ]
+        estados = [e for e, _ in SolicitudCredito.ESTADOS]
+        SolicitudCredito.objects.bulk_create([
+            SolicitudCredito(cliente=clientes[i % 20], oficial=oficiales[i % 5], estado=estados[(i // 5) % 5],
+                             monto=1000, plazo_meses=12, tasa_nominal_anual=10, is_deleted=(i % 10 == 0))
+            for i in range(600)
+        ])
+        cls.cliente, cls.oficial = clientes[3], oficiales[2]
+        cls.solicitud = SolicitudCredito.objects.filter(cliente=cls.cliente).first()
+
+        plan = PlanPago.objects.create(solicitud=cls.solicitud, primera_cuota_fecha=date(2025, 1, 31),
+                                       generado_por=oficiales[0].user)
+        PlanCuota.objects.bulk_create([
+            PlanCuota(plan=plan, nro_cuota=k, fecha_vencimiento=date(2025, 1, 31) + relativedelta(months=k - 1),
+                      capital=1, interes=1, cuota=2, saldo=0)
+            for k in range(1, 481)
+        ])
+        cls.tipo = DocumentoTipo.objects.create(codigo='CI_IDX', nombre='CI')
+        otro = DocumentoTipo.objects.create(codigo='DOM_IDX', nombre='Domicilio')
+        DocumentoAdjunto.objects.bulk_create([
+            DocumentoAdjunto(solicitud=s, documento_tipo=(cls.tipo if i % 2 else otro), archivo='x.pdf')
+            for i, s in enumerate(SolicitudCredito.objects.all()[:300])
+        ])
+
+    def assertUsaIndice(self, qs, indice):
+        with connection.cursor() as cur:
+            for tabla in ('solicitudes_credito', 'plan_cuota', 'documento_adjunto'):
+                cur.execute(f'ANALYZE {tabla}')
+            if connection.vendor == 'postgresql':
+                # con tablas de prueba tan chicas el planner prefiere el seq scan
+                cur.execute('SET LOCAL enable_seqscan = off')
+        plan = qs.explain()
+        self.assertIn(indice, plan, plan)
+
+    def test_solicitudes_por_cliente(self):
+        qs = (SolicitudCredito.objects.filter(is_deleted=False, cliente=self.cliente)
+              .order_by('-created_at', '-id')[:50])
+        self.assertUsaIndice(qs, 'sol_cliente_creado_idx')
+
+    def test_solicitudes_por_estado(self):
+        qs = (SolicitudCredito.objects.filter(is_deleted=False, estado='ENVIADA')
+              .order_by('-created_at', '-id')[:50])
+        self.assertUsaIndice(qs, 'sol_estado_creado_idx')
+
+    def test_solicitudes_por_oficial_y_estado(self):
+        # bandeja/conteos por oficial: sin el orden por fecha, que favorece a sol_estado_creado_idx
+        qs = SolicitudCredito.objects.filter(is_deleted=False, oficial=self.oficial, estado='EVALUADA').order_by()
+        self.assertUsaIndice(qs, 'sol_oficial_estado_idx')
+
+    def test_cuotas_por_vencimiento(self):
+        qs = PlanCuota.objects.filter(fecha_vencimiento__range=(date(2030, 1, 1), date(2030, 1, 31)))
+        self.assertUsaIndice(qs, 'plan_cuota_vencimiento_idx')
+
+    def test_adjuntos_por_solicitud_y_tipo(self):
+        qs = DocumentoAdjunto.objects.filter(solicitud=self.solicitud, documento_tipo=self.tipo)
+        self.assertUsaIndice(qs, 'doc_adj_solicitud_tipo_idx')
+
+
+# =========================================================
+#                  EXPORTACIÓN DE PLANES
+# =========================================================
+class ExportPlanTests(TestCase):
+    """XLSX en streaming y PDF en caché por versión del plan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_pdf', 'p@x.com', 'x')
+        cliente = Cliente.objects.create(user=cls.admin, numero_documento='PDF1', telefono='0', direccion='-')
+        cls.sol = SolicitudCredito.objects.create(cliente=cliente, monto=5000, plazo_meses=24,
+                                                  tasa_nominal_anual=12, estado='APROBADA')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.url = f'/api/solicitudes/{self.sol.pk}/plan-pagos/export/'
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.enterContext(override_settings(PLAN_PDF_CACHE={'DIR': cache_dir}))
+        generar_plan(self.sol, self.admin)
+
+    def _descargar(self, fmt):
+        resp = self.api.get(self.url, {'format': fmt})
+        self.assertEqual(resp.status_code, 200)
+        return b''.join(resp.streaming_content)
+
+    def test_xlsx(self):
+        import io
+        import openpyxl
+
+        ws = openpyxl.load_workbook(io.BytesIO(self._descargar('xlsx'))).active
+        self.assertEqual(ws.max_row, 1 + 24 + 2)
+        self.assertEqual(ws['A27'].value, 'Totales')
+
+    def test_pdf_en_cache_e_invalidado_al_regenerar(self):
+        plan = PlanPago.objects.get(solicitud=self.sol)
+        primero = self._descargar('pdf')
+        self.assertTrue(primero.startswith(b'%PDF'))
+        artefacto = plan_pdf.ruta(plan)
+        self.assertTrue(artefacto.exists())
+        with patch.object(plan_pdf, 'renderizar', side_effect=AssertionError('no debía renderizar')):
+            self.assertEqual(self._descargar('pdf'), primero)
+
+        sol = SolicitudCredito.objects.select_related('plan').get(pk=self.sol.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            generar_plan(sol, self.admin, overwrite=True)
+        self.assertFalse(artefacto.exists())
+        self._descargar('pdf')
+        self.assertTrue(plan_pdf.ruta(PlanPago.objects.get(solicitud=self.sol)).exists())
+
+    def test_exportacion_masiva(self):
+        import io
+        import zipfile
+        import openpyxl
+
+        resp = self.api.get('/api/planes/exportar/', {'format': 'zip', 'archivo': 'xlsx'})
+        self.assertEqual(resp.status_code, 200)
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(zf.namelist(), [f'plan_{self.sol.pk}.xlsx'])
+
+        resp = self.api.get('/api/planes/exportar/', {'format': 'xlsx'})
+        libro = openpyxl.load_workbook(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(libro.sheetnames, ['Resumen', f'Sol {self.sol.pk.hex[:8]}'])
+        self.assertEqual(libro['Resumen']['A2'].value, str(self.sol.pk))
+
+        self.assertEqual(self.api.get('/api/planes/exportar/', {'format': 'zip', 'moneda': 'USD'}).status_code, 404)
+        self.assertEqual(self.api.get('/api/planes/exportar/', {'format': 'zip', 'desde': 'ayer'}).status_code, 400)
+
+    @override_settings(EXPORTACION_PLANES={'TRABAJADORES': 2, 'VENTANA': 2, 'MAX_PLANES': 100})
+    def test_exportacion_masiva_pdf(self):
+        import zipfile
+        from .services import exportacion
+
+        cliente = self.sol.cliente
+        otras = [SolicitudCredito.objects.create(cliente=cliente, monto=1000 * n, plazo_meses=n,
+                                                 tasa_nominal_anual=12, estado='APROBADA') for n in (3, 7, 40, 60)]
+        for sol in otras:
+            generar_plan(sol, self.admin)
+        orden = [p.solicitud_id for p in exportacion.planes()]
+        # Uno en caché (se sirve tal cual); los otros cuatro pasan por el pool de procesos
+        en_cache = plan_pdf.pdf_plan(PlanPago.objects.get(solicitud=otras[1])).read_bytes()
+
+        resp = self.api.get('/api/planes/exportar/', {'format': 'zip', 'archivo': 'pdf'})
+        self.assertEqual(resp.status_code, 200)
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(zf.namelist(), [f'plan_{sid}.pdf' for sid in orden])
+        for nombre in zf.namelist():
+            self.assertTrue(zf.read(nombre).startswith(b'%PDF'), nombre)
+            self.assertTrue(zf.read(nombre).rstrip().endswith(b'%%EOF'), nombre)
+        self.assertEqual(zf.read(f'plan_{otras[1].pk}.pdf'), en_cache)
+        # Los procesos hijos escribieron en la caché del proceso principal
+        for plan in PlanPago.objects.all():
+            self.assertEqual(zf.read(f'plan_{plan.solicitud_id}.pdf'), plan_pdf.ruta(plan).read_bytes())
+
+        # Invalidado entre el render y la lectura: se vuelve a renderizar al leer
+        plan = PlanPago.objects.get(solicitud=otras[0])
+        ruta = plan_pdf.ruta(plan)
+        plan_pdf.invalidar(plan.pk)
+        self.assertTrue(b''.join(exportacion._leer(plan, ruta)).startswith(b'%PDF'))
+        self.assertTrue(ruta.exists())
+
+        # Cliente que se desconecta tras el primer plan: los pendientes se cancelan sin colgar
+        for plan in PlanPago.objects.all():
+            plan_pdf.invalidar(plan.pk)
+        pdfs = exportacion._pdfs(exportacion.planes(), 1, 1)
+        plan, ruta = next(pdfs)
+        self.assertEqual((plan.solicitud_id, ruta), (orden[0], plan_pdf.ruta(plan)))
+        pdfs.close()
+        self.assertFalse(plan_pdf.ruta(PlanPago.objects.get(solicitud=orden[-1])).exists())
+
+
+@override_settings(EXTRACCION_CARTERA={'MARGEN_SEG': 0})
+class ExtraccionCarteraTests(TestCase):
+    """CSV/Parquet por lotes e incremental por marca de agua (generado_en, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_ext', 'e@x.com', 'x')
+        cliente = Cliente.objects.create(user=cls.admin, numero_documento='EXT1', telefono='0', direccion='-')
+        cls.sols = [SolicitudCredito.objects.create(cliente=cliente, monto=1000, plazo_meses=n,
+                                                    tasa_nominal_anual=12, estado='APROBADA') for n in (6, 12)]
+        generar_plan(cls.sols[0], cls.admin)
+        with override_settings(PLAN_PAGO_PERSISTENCIA={'FORMATO': 'compacto'}):
+            generar_plan(cls.sols[1], cls.admin)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _csv(self, conjunto, **params):
+        import csv
+        import io
+
+        resp = self.api.get(f'/api/cartera/datos/{conjunto}/', {'format': 'csv', **params})
+        self.assertEqual(resp.status_code, 200)
+        filas = list(csv.DictReader(io.StringIO(b''.join(resp.streaming_content).decode())))
+        return filas, resp.get('X-Marca-Agua')
+
+    def test_cuotas_filas_y_compactas_e_incremental(self):
+        filas, marca = self._csv('cuotas')
+        self.assertEqual(len(filas), 6 + 12)  # el plan compacto sale del blob
+        self.assertEqual([f['nro_cuota'] for f in filas[:6]], [str(i) for i in range(1, 7)])
+        self.assertEqual(self._csv('cuotas', desde=marca), ([], marca))
+
+        sol = SolicitudCredito.objects.select_related('plan').get(pk=self.sols[0].pk)
+        generar_plan(sol, self.admin, overwrite=True)
+        filas, nueva = self._csv('cuotas', desde=marca)
+        self.assertEqual({f['solicitud_id'] for f in filas}, {str(sol.pk)})
+        self.assertEqual(len(filas), 6)
+        self.assertNotEqual(nueva, marca)
+
+        resp = self.api.get('/api/cartera/datos/cuotas/', {'format': 'csv', 'desde': 'ayer'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_margen_de_la_marca(self):
+        from django.utils import timezone
+        from .services import extraccion
+
+        with override_settings(EXTRACCION_CARTERA={'MARGEN_SEG': 300}):
+            # Recién generados: pueden tener transacciones en curso con marcas anteriores
+            filas, marca = self._csv('planes')
+            self.assertEqual((filas, marca), ([], None))
+
+            # Un plan con marca posterior al corte no sale ni adelanta `hasta`: sale en la pasada siguiente
+            ahora = timezone.now()
+            PlanPago.objects.filter(solicitud=self.sols[1]).update(generado_en=ahora + timedelta(seconds=2))
+            with patch.object(extraccion, 'now', return_value=ahora + timedelta(seconds=301)):
+                ext = extraccion.Extraccion('planes')
+                self.assertEqual([f[1] for f in ext._filas()], [self.sols[0].pk])
+            with patch.object(extraccion, 'now', return_value=ahora + timedelta(seconds=302)):
+                siguiente = extraccion.Extraccion('planes', desde=ext.hasta)
+                self.assertEqual([f[1] for f in siguiente._filas()], [self.sols[1].pk])
+
+    def test_parquet(self):
+        import io
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow no instalado')
+
+        resp = self.api.get('/api/cartera/datos/planes/', {'format': 'parquet'})
+        tabla = pq.read_table(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(tabla.num_rows, 2)
+        self.assertEqual(str(tabla.schema.field('total_cuotas').type), 'decimal128(16, 2)')
+
+
+class TrabajosTests(TestCase):
+    """Cola de trabajos: ?async=true, despacho por prioridad, reintentos y plazo vencido."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_trab', 't@x.com', 'x')
+        cliente = Cliente.objects.create(user=cls.admin, numero_documento='TRB1', telefono='0', direccion='-')
+        cls.sol = SolicitudCredito.objects.create(cliente=cliente, monto=3000, plazo_meses=12,
+                                                  tasa_nominal_anual=12, estado='APROBADA')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _procesar(self):
+        estados = []
+        while (t := trabajos.tomar('test')) is not None:
+            estados.append(trabajos.ejecutar(t, 'test'))
+        return estados
+
+    def test_generar_plan_asincrono(self):
+        url = f'/api/solicitudes/{self.sol.pk}/plan-pagos/generar/?async=true'
+        resp = self.api.post(url)
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(self.api.post(url).data['trabajo_id'], resp.data['trabajo_id'])  # deduplicado
+        self.assertFalse(PlanPago.objects.filter(solicitud=self.sol).exists())
+
+        self.assertEqual(self._procesar(), [Trabajo.COMPLETADO])
+        estado = self.api.get(resp.data['url']).data
+        self.assertEqual(estado['estado'], Trabajo.COMPLETADO)
+        self.assertEqual(estado['resultado']['plan_id'], str(PlanPago.objects.get(solicitud=self.sol).pk))
+
+        otro = APIClient()
+        otro.force_authenticate(User.objects.create_user('otro_trab', 'o@x.com', 'x'))
+        self.assertEqual(otro.get(resp.data['url']).status_code, 404)
+
+    def test_overwrite_no_se_deduplica_con_el_pedido_simple(self):
+        url = f'/api/solicitudes/{self.sol.pk}/plan-pagos/generar/?async=true'
+        simple = self.api.post(url).data['trabajo_id']
+        forzado = self.api.post(url + '&overwrite=true').data['trabajo_id']
+        self.assertNotEqual(simple, forzado)
+        self.assertEqual(self.api.post(url + '&overwrite=true').data['trabajo_id'], forzado)
+        self.assertEqual(sorted(Trabajo.objects.values_list('parametros__overwrite', flat=True)), [False, True])
+        self._procesar()
+        self.assertEqual(Trabajo.objects.get(pk=forzado).estado, Trabajo.COMPLETADO)
+
+    def test_correo_asincrono(self):
+        from django.core import mail
+
+        for _ in range(3):  # pedidos repetidos: un solo correo pendiente
+            resp = APIClient().post('/api/auth/password-reset/?async=true', {'email': 't@x.com'})
+            self.assertEqual(resp.status_code, 202)
+            self.assertNotIn('trabajo_id', resp.data)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(self._procesar(), [Trabajo.COMPLETADO])
+        self.assertEqual(mail.outbox[0].to, ['t@x.com'])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_prioridad_reintento_y_plazo_vencido(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        llamadas = []
+
+        def inestable(trabajo):
+            llamadas.append(trabajo.pk)
+            if len(llamadas) == 1:
+                raise ConnectionError('SMTP caído')
+            return {'ok': True}
+
+        with patch.dict(trabajos._TAREAS, {'prueba': trabajos.Tarea(inestable, 0, 2)}):
+            baja = trabajos.encolar('prueba')
+            alta = trabajos.encolar('prueba', prioridad=9)
+            self.assertEqual(trabajos.tomar('test').pk, alta.pk)
+            with self.assertLogs('api.services.trabajos', 'WARNING'):
+                self.assertEqual(trabajos.ejecutar(trabajos.tomar('test'), 'test'), Trabajo.PENDIENTE)  # baja falla
+
+            baja.refresh_from_db()
+            self.assertEqual((baja.intentos, baja.error), (1, 'ConnectionError: SMTP caído'))
+            self.assertGreater(baja.disponible_en, timezone.now())
+            self.assertIsNone(trabajos.tomar('test'))  # esperando el reintento
+
+            # `alta` quedó tomada por un trabajador que "murió": vuelve a la cola al vencer
+            Trabajo.objects.filter(pk=alta.pk).update(vence_en=timezone.now() - timedelta(seconds=1))
+            Trabajo.objects.filter(pk=baja.pk).update(disponible_en=timezone.now())
+            self.assertEqual(trabajos.recuperar_vencidos(), 1)
+            self.assertEqual(self._procesar(), [Trabajo.COMPLETADO, Trabajo.COMPLETADO])
+            self.assertEqual(list(Trabajo.objects.filter(pk__in=[alta.pk, baja.pk])
+                                  .values_list('intentos', flat=True)), [2, 2])
@@ -8,13 +8,14 @@ from .views import (
     UserProfileViewSet, BitacoraViewSet,
     ClienteViewSet, EmpleadoViewSet, SolicitudCreditoViewSet,
     ProductoFinancieroViewSet, DocumentoAdjuntoViewSet,
-    DocumentoTipoViewSet, RequisitoProductoDocumentoViewSet,
+    DocumentoTipoViewSet, RequisitoProductoDocumentoViewSet, TrabajoViewSet,
 
     # Plan de pagos (endpoints manuales SOLO para listar/generar)
-    PlanPagoGenerateView, PlanPagoDetailView,
+    PlanPagoGenerateView, PlanPagoDetailView, PlanPagoRecalcularView, PlanesExportarView,
 
     # Otros endpoints sueltos
-    PublicRegisterView, SimuladorAPIView,
+    PublicRegisterView, SimuladorAPIView, SimuladorGridAPIView, ProyeccionCarteraView,
+    BusquedaView, EstadisticasSolicitudesView, CarteraDatosView,
 )
 
 router = DefaultRouter()
@@ -31,6 +32,7 @@ router.register(r'productos', ProductoFinancieroViewSet, basename='productos')
 router.register(r'documentos', DocumentoAdjuntoViewSet, basename='documentos')
 router.register(r'documento-tipos', DocumentoTipoViewSet, basename='documento-tipos')
 router.register(r'requisitos', RequisitoProductoDocumentoViewSet, basename='requisitos')
+router.register(r'trabajos', TrabajoViewSet, basename='trabajos')
 
 urlpatterns = [
     # —— PLAN DE PAGO (detalle + generar) ——
@@ -44,15 +46,30 @@ urlpatterns = [
         PlanPagoGenerateView.as_view({'post': 'create'}),
         name='plan-generate'
     ),
+    path(
+        'solicitudes/<uuid:solicitud_id>/plan-pagos/recalcular/',
+        PlanPagoRecalcularView.as_view({'post': 'create'}),
+        name='plan-recalcular'
+    ),
     # Nota: NO se declara path para export; lo expone el router via @action.
+    path('planes/exportar/', PlanesExportarView.as_view(), name='planes-exportar'),
 
     # —— Auth / registro público ——
     path('auth/password-reset/', UserViewSet.as_view({'post': 'password_reset_request'})),
     path('auth/password-reset-confirm/<uidb64>/<token>/', UserViewSet.as_view({'post': 'password_reset_confirm'})),
     path('auth/register/', PublicRegisterView.as_view()),
 
+    # —— Cartera ——
+    path('cartera/proyeccion/', ProyeccionCarteraView.as_view()),
+    path('cartera/datos/<str:conjunto>/', CarteraDatosView.as_view(), name='cartera-datos'),
+    path('estadisticas/solicitudes/', EstadisticasSolicitudesView.as_view()),
+
+    # —— Búsqueda (front-office) ——
+    path('busqueda/', BusquedaView.as_view()),
+
     # —— Simulador ——
     path('simulador/', SimuladorAPIView.as_view()),
+    path('simulador/grid/', SimuladorGridAPIView.as_view()),
 
     # —— Router (al final) ——
     path('', include(router.urls)),
@@ -9,21 +9,31 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils.timezone import now
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode
+from django.utils.encoding import force_str
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db import transaction
-from django.http import HttpResponse
+from django.http import FileResponse
+from django.urls import reverse
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-
-import io
-import openpyxl
+from datetime import date
+from decimal import Decimal
 
 from .services.plan_pago import generar_plan
-from .services.simulador import simular_plan
+from .services.plan_recalculo import recalcular_desde
+from .services import estadisticas, exportacion, extraccion, historial, plan_pdf, solicitudes_lote, trabajos
+from .tareas import GENERAR_PLAN, PDF_PLAN, RESTABLECER_PASSWORD, correo_restablecer_password
+from .services.busqueda import buscar
+from .services.proyeccion import proyeccion
+from .services.simulador import simular_plan, simular_grilla, iterar_simulacion
+from .consultas import PlanConsultasMixin
+from .pagination import KeysetPagination
+from .renderers import (
+    RENDERERS_CON_NDJSON, RENDERERS_EXPORTACION, RENDERERS_EXPORTACION_MASIVA, RENDERERS_EXTRACCION,
+    quiere_ndjson,
+    respuesta_archivo, respuesta_ndjson,
+)
 from .services.validadores import validar_vigencia
 
 from .models import (
@@ -31,6 +41,7 @@ from .models import (
     Cliente, Empleado, SolicitudCredito,
     PlanPago, ProductoFinanciero,
     DocumentoTipo, RequisitoProductoDocumento, DocumentoAdjunto,
+    EntradaBusqueda, Trabajo,
 )
 
 from .serializers import (
@@ -50,11 +61,14 @@ from .serializers import (
     SolicitudCreateSerializer, SolicitudListSerializer, SolicitudDetailSerializer,
 
     # Plan pago
-    PlanPagoDTO,
+    PlanPagoDTO, PlanPagoResumenDTO, PlanCuotaDTO,
 
     # Productos / Documentos
     ProductoFinancieroSerializer, DocumentoAdjuntoSerializer, DocumentoTipoSerializer,
     RequisitoProductoDocumentoSerializer, RequisitoProductoDocumentoWriteSerializer,
+
+    # Trabajos en segundo plano
+    TrabajoSerializer,
 )
 
 # =========================================================
@@ -70,13 +84,29 @@ class IsOfficialOrAdmin(permissions.BasePermission):
             (request.user.is_superuser or nombre in ('OFICIAL', 'ADMIN'))
         )
 
+# =========================================================
+#                    MODO ASÍNCRONO
+# =========================================================
+def _es_async(request):
+    """?async=true: encolar el trabajo (services/trabajos.py) en vez de hacerlo en la petición."""
+    return str(request.query_params.get('async', 'false')).lower() in ('1', 'true')
+
+def _respuesta_trabajo(trabajo):
+    """202 con el id del trabajo y dónde consultarlo."""
+    return Response({'trabajo_id': str(trabajo.id), 'estado': trabajo.estado,
+                     'url': reverse('trabajos-detail', args=[trabajo.id])}, status=202)
+
 # =========================================================
 #                          USUARIOS
 # =========================================================
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PlanConsultasMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_joined', '-id')
+    plan_consultas = {'list': {'select': ('cliente', 'empleado', 'userprofile__rol')}}
+    presupuesto_consultas = {'list': 1}
 
     def get_permissions(self):
         if self.action in ['register_public', 'password_reset_request', 'password_reset_confirm']:
@@ -135,19 +165,20 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = PasswordResetRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data['email']
+        asincrono = _es_async(request)
         try:
             user = User.objects.get(email=email)
-            token = default_token_generator.make_token(user)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            reset_url = f"{settings.FRONTEND_URL}/password-reset-confirm/{uid}/{token}/"
-            send_mail(
-                'Restablecimiento de Contraseña',
-                f'Para restablecer tu contraseña, haz clic en el siguiente enlace: {reset_url}',
-                settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False,
-            )
+            if asincrono:
+                # Un solo correo pendiente por usuario aunque repita el pedido
+                trabajos.encolar(RESTABLECER_PASSWORD, {'user_id': user.pk}, clave=str(user.pk))
+            else:
+                asunto, mensaje = correo_restablecer_password(user)
+                send_mail(asunto, mensaje, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False)
         except User.DoesNotExist:
             pass
-        return Response({"message": "Si el email existe, recibirás un enlace para restablecer tu contraseña."}, status=200)
+        # Asíncrono: 202 sin id de trabajo, igual exista o no el email (no revela cuentas)
+        return Response({"message": "Si el email existe, recibirás un enlace para restablecer tu contraseña."},
+                        status=202 if asincrono else 200)
 
     @action(detail=False, methods=['post'])
     def password_reset_confirm(self, request, uidb64, token):
@@ -173,15 +204,21 @@ class UserViewSet(viewsets.ModelViewSet):
 # =========================================================
 #                    CLIENTE / EMPLEADO
 # =========================================================
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(PlanConsultasMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-fecha_registro', '-id')
+    plan_consultas = {'list': {'select': ('user',)}, 'retrieve': {'select': ('user',)}}
+    presupuesto_consultas = {'list': 1, 'retrieve': 1}
 
-class EmpleadoViewSet(viewsets.ModelViewSet):
+class EmpleadoViewSet(PlanConsultasMixin, viewsets.ModelViewSet):
     queryset = Empleado.objects.all()
     serializer_class = EmpleadoSerializer
     permission_classes = [IsAuthenticated]
+    plan_consultas = {'list': {'select': ('user',)}, 'retrieve': {'select': ('user',)}}
+    presupuesto_consultas = {'list': 1, 'retrieve': 1}
 
 # =========================================================
 #              ROLES / PERMISOS / BITÁCORA
@@ -255,22 +292,34 @@ class UserProfileViewSet(viewsets.ModelViewSet):
                 ip=self.request.META.get('REMOTE_ADDR')
             )
 
-class BitacoraViewSet(viewsets.ReadOnlyModelViewSet):
+class BitacoraViewSet(PlanConsultasMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Bitacora.objects.all()
     serializer_class = BitacoraSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    plan_consultas = {'list': {'select': ('usuario',)}, 'retrieve': {'select': ('usuario',)}}
+    presupuesto_consultas = {'list': 1, 'retrieve': 1}
 
     def get_queryset(self):
+        qs = super().get_queryset()
         if self.request.user.is_superuser:
-            return Bitacora.objects.all()
-        return Bitacora.objects.filter(usuario=self.request.user)
+            return qs
+        return qs.filter(usuario=self.request.user)
 
 # =========================================================
 #                 SOLICITUDES (CU12/13/14)
 # =========================================================
-class SolicitudCreditoViewSet(viewsets.ModelViewSet):
+class SolicitudCreditoViewSet(PlanConsultasMixin, viewsets.ModelViewSet):
     queryset = SolicitudCredito.objects.filter(is_deleted=False)
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination  # (created_at, id) como Meta.ordering
+    plan_consultas = {
+        'list': {'select': ('cliente__user', 'oficial')},
+        'retrieve': {'select': ('cliente__user', 'oficial')},
+    }
+    # Lotes: Empleado, SELECT FOR UPDATE, UPDATE (uno por decisión), estadísticas (3), búsqueda,
+    # historial y los savepoints de sus atomic(); fijo sin importar el tamaño del lote
+    presupuesto_consultas = {'list': 1, 'seguimiento': 2, 'evaluar_lote': 12, 'decidir_lote': 13}
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -289,16 +338,28 @@ class SolicitudCreditoViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(SolicitudListSerializer(page, many=True).data)
         return Response(SolicitudListSerializer(qs, many=True).data)
 
-    def retrieve(self, request, *args, **kwargs):
-        self.queryset = (SolicitudCredito.objects
-                         .select_related('cliente', 'cliente__user', 'oficial'))
-        return super().retrieve(request, *args, **kwargs)
-
     def perform_create(self, serializer):
-        obj = serializer.save()
-        if not obj.estado:
-            obj.estado = 'ENVIADA'
-            obj.save(update_fields=['estado'])
+        with transaction.atomic():
+            obj = serializer.save()
+            if not obj.estado:
+                obj.estado = 'ENVIADA'
+                obj.save(update_fields=['estado'])
+            estadisticas.registrar_cambio(None, obj)
+            historial.registrar([historial.evento(obj.pk, historial.CREADA, self.request.user, nuevo=obj.estado)])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            antes = estadisticas.instantanea(serializer.instance)
+            sol = serializer.save()
+            estadisticas.registrar_cambio(antes, sol)
+            if sol.estado != antes['estado']:
+                historial.registrar([historial.cambio_estado(sol, antes['estado'], self.request.user)])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            antes = estadisticas.instantanea(instance)
+            instance.delete()
+            estadisticas.registrar_cambio(antes, None)
 
     # ---- CU13: Evaluar ----
     @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, IsOfficialOrAdmin])
@@ -309,13 +370,19 @@ class SolicitudCreditoViewSet(viewsets.ModelViewSet):
         if score is None:
             return Response({"detail": "score_riesgo requerido"}, status=400)
 
+        antes = estadisticas.instantanea(sol)
         sol.score_riesgo = score
         sol.observacion_evaluacion = obs
         sol.fecha_evaluacion = now()
         if sol.estado in ('ENVIADA', 'DRAFT'):
             sol.estado = 'EVALUADA'
         sol.oficial = Empleado.objects.filter(user=request.user).first() or sol.oficial
-        sol.save()
+        with transaction.atomic():
+            sol.save(update_fields=['score_riesgo', 'observacion_evaluacion', 'fecha_evaluacion',
+                                    'estado', 'oficial', 'updated_at'])
+            estadisticas.registrar_cambio(antes, sol)
+            historial.registrar([historial.cambio_estado(sol, antes['estado'], request.user,
+                                                         {'score_riesgo': str(score)})])
         return Response(SolicitudDetailSerializer(sol).data)
 
     # ---- CU14: Decidir ----
@@ -326,6 +393,7 @@ class SolicitudCreditoViewSet(viewsets.ModelViewSet):
         if decision not in ('APROBAR', 'RECHAZAR'):
             return Response({"detail": "decision debe ser APROBAR o RECHAZAR"}, status=400)
 
+        antes = estadisticas.instantanea(sol)
         if decision == 'APROBAR':
             sol.estado = 'APROBADA'
             sol.fecha_aprobacion = now()
@@ -334,9 +402,32 @@ class SolicitudCreditoViewSet(viewsets.ModelViewSet):
             sol.fecha_aprobacion = None
 
         sol.oficial = Empleado.objects.filter(user=request.user).first() or sol.oficial
-        sol.save()
+        with transaction.atomic():
+            sol.save(update_fields=['estado', 'fecha_aprobacion', 'oficial', 'updated_at'])
+            estadisticas.registrar_cambio(antes, sol)
+            historial.registrar([historial.cambio_estado(sol, antes['estado'], request.user)])
         return Response(SolicitudDetailSerializer(sol).data)
 
+    # ---- CU13/CU14 en lote (comités) ----
+    def _lote(self, request, operacion):
+        try:
+            resultados = operacion(request.data.get('items'), request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        aplicados = sum(1 for r in resultados if r['ok'])
+        return Response({'aplicados': aplicados, 'rechazados': len(resultados) - aplicados,
+                         'resultados': resultados})
+
+    @action(detail=False, methods=['post'], url_path='evaluar-lote',
+            permission_classes=[IsAuthenticated, IsOfficialOrAdmin])
+    def evaluar_lote(self, request):
+        return self._lote(request, solicitudes_lote.evaluar_lote)
+
+    @action(detail=False, methods=['post'], url_path='decidir-lote',
+            permission_classes=[IsAuthenticated, IsOfficialOrAdmin])
+    def decidir_lote(self, request):
+        return self._lote(request, solicitudes_lote.decidir_lote)
+
     # ---- Checklist para front ----
     @action(detail=True, methods=['get'], url_path='documentos/checklist')
     def checklist(self, request, pk=None):
@@ -368,71 +459,47 @@ class SolicitudCreditoViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='seguimiento', permission_classes=[IsAuthenticated])
     def seguimiento(self, request, pk=None):
+        # ?since=<id del último evento recibido>: sólo los eventos nuevos
+        since = request.query_params.get('since')
+        try:
+            since = int(since) if since not in (None, '') else None
+        except ValueError:
+            return Response({"detail": "since debe ser el id de un evento"}, status=400)
         sol = self.get_object()
-        timeline = [
-            {'evento': 'CREADA', 'fecha': sol.created_at},
-            {'evento': f'ESTADO_{sol.estado}', 'fecha': sol.updated_at},
-        ]
-        return Response({'estadoActual': sol.estado, 'timelineEstados': timeline})
+        timeline = historial.seguimiento(sol.pk, desde=since)
+        return Response({
+            'estadoActual': sol.estado,
+            'timelineEstados': timeline,
+            'ultimo': timeline[-1]['id'] if timeline else since,
+        })
 
     # ---- Exportar plan (PDF/XLSX) ----
-    @action(detail=True, methods=['get'], url_path='plan-pagos/export', permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['get'], url_path='plan-pagos/export', permission_classes=[IsAuthenticated],
+            renderer_classes=RENDERERS_EXPORTACION)
     def export_plan(self, request, pk=None):
         fmt = (request.query_params.get('format') or 'pdf').lower()
         try:
-            plan = (PlanPago.objects
-                    .select_related('solicitud')
-                    .prefetch_related('cuotas')
-                    .get(solicitud_id=pk))
+            # Sin prefetch: ambos formatos leen las cuotas por bloques, y el PDF en caché no las lee
+            plan = PlanPago.objects.get(solicitud_id=pk)
         except PlanPago.DoesNotExist:
             return Response({"detail": "Plan no encontrado"}, status=404)
 
         if fmt == 'xlsx':
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Plan"
-            ws.append(["#", "Vencimiento", "Capital", "Interés", "Cuota", "Saldo"])
-            for c in plan.cuotas.all():
-                ws.append([
-                    c.nro_cuota, str(c.fecha_vencimiento),
-                    float(c.capital), float(c.interes),
-                    float(c.cuota), float(c.saldo)
-                ])
-            ws.append([])
-            ws.append(["Totales", "", float(plan.total_capital),
-                       float(plan.total_interes), float(plan.total_cuotas), ""])
-            bio = io.BytesIO()
-            wb.save(bio)
-            bio.seek(0)
-            resp = HttpResponse(
-                bio.read(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            resp['Content-Disposition'] = f'attachment; filename=plan_{plan.id}.xlsx'
-            return resp
-
-        # PDF
-        bio = io.BytesIO()
-        c = canvas.Canvas(bio, pagesize=A4)
-        w, h = A4
-        y = h - 50
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(40, y, f"Plan de Pagos – Solicitud {plan.solicitud_id}"); y -= 20
-        c.setFont("Helvetica", 10)
-        c.drawString(40, y, f"Método: {plan.metodo}  Moneda: {plan.moneda}  Primera cuota: {plan.primera_cuota_fecha}"); y -= 20
-        c.drawString(40, y, f"Totales  Capital: {plan.total_capital}  Interés: {plan.total_interes}  Cuotas: {plan.total_cuotas}"); y -= 30
-        c.setFont("Helvetica-Bold", 10); c.drawString(40, y, "#  Venc     Capital   Interés   Cuota   Saldo"); y -= 15
-        c.setFont("Helvetica", 10)
-        for cu in plan.cuotas.all():
-            line = f"{cu.nro_cuota:02d} {str(cu.fecha_vencimiento)}  {cu.capital}   {cu.interes}   {cu.cuota}   {cu.saldo}"
-            c.drawString(40, y, line); y -= 14
-            if y < 60:
-                c.showPage(); y = h - 50
-        c.save()
-        pdf = bio.getvalue()
-        resp = HttpResponse(pdf, content_type='application/pdf')
-        resp['Content-Disposition'] = f'attachment; filename=plan_{plan.id}.pdf'
-        return resp
+            if _es_async(request):
+                return Response({"detail": "El modo asíncrono es sólo para PDF; el XLSX ya se envía en streaming"},
+                                status=400)
+            # Streaming: cuotas por bloques y el archivo se envía mientras se genera
+            return respuesta_archivo(exportacion.xlsx_plan(plan), exportacion.XLSX, f'plan_{plan.id}.xlsx')
+
+        if _es_async(request):
+            # Renderiza un trabajador; al completarse, `resultado.descarga` sale de la caché
+            return _respuesta_trabajo(trabajos.encolar(
+                PDF_PLAN, {'plan_id': str(plan.id)}, usuario=request.user,
+                clave=f'{plan.id}:{plan.generado_en.isoformat()}'))
+
+        # PDF: renderizado una vez por versión del plan y servido desde disco
+        return FileResponse(open(plan_pdf.pdf_plan(plan), 'rb'), as_attachment=True,
+                            filename=f'plan_{plan.id}.pdf', content_type='application/pdf')
 
 # =========================================================
 #                    PLAN DE PAGO (CU15)
@@ -444,6 +511,12 @@ class PlanPagoGenerateView(viewsets.ViewSet):
         overwrite = str(request.query_params.get('overwrite', 'false')).lower() == 'true'
         try:
             sol = SolicitudCredito.objects.get(pk=solicitud_id, is_deleted=False)
+            if _es_async(request):
+                # Un solo trabajo activo por solicitud y modo: repetir el pedido devuelve el mismo,
+                # pero un overwrite no se pierde detrás de un pedido sin overwrite que fallaría
+                return _respuesta_trabajo(trabajos.encolar(
+                    GENERAR_PLAN, {'solicitud_id': str(sol.pk), 'overwrite': overwrite},
+                    usuario=request.user, clave=f'{sol.pk}:{int(overwrite)}'))
             plan = generar_plan(sol, request.user, overwrite=overwrite)
             return Response({"plan_id": str(plan.id)}, status=201)
         except SolicitudCredito.DoesNotExist:
@@ -451,21 +524,218 @@ class PlanPagoGenerateView(viewsets.ViewSet):
         except ValueError as e:
             return Response({"detail": str(e)}, status=409)
 
+class PlanPagoRecalcularView(viewsets.ViewSet):
+    """Recálculo incremental desde la cuota k: prepago parcial, nuevo plazo total y/o nueva tasa."""
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+
+    def create(self, request, solicitud_id=None):
+        try:
+            desde = int(request.data.get('desde_cuota'))
+            prepago = request.data.get('prepago')
+            plazo = request.data.get('plazo_meses')
+            tna = request.data.get('tasa_nominal_anual')
+            prepago = Decimal(str(prepago)) if prepago not in (None, '') else None
+            plazo = int(plazo) if plazo not in (None, '') else None
+            tna = Decimal(str(tna)) if tna not in (None, '') else None
+        except Exception:
+            return Response({'detail': 'Parámetros inválidos'}, status=400)
+        try:
+            plan = PlanPago.objects.select_related('solicitud').get(solicitud_id=solicitud_id)
+        except PlanPago.DoesNotExist:
+            return Response({"detail": "Plan no encontrado"}, status=404)
+        try:
+            res = recalcular_desde(plan, desde, prepago=prepago, plazo_meses=plazo, tna=tna,
+                                   usuario=request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=409)
+        return Response({
+            "plan_id": str(res['plan'].id),
+            "actualizadas": res['actualizadas'],
+            "creadas": res['creadas'],
+            "borradas": res['borradas'],
+        })
+
 class PlanPagoDetailView(viewsets.ViewSet):
+    """
+    Plan de pago de una solicitud. Con Accept: application/x-ndjson o ?stream=ndjson
+    responde en streaming: una línea con la cabecera del plan y una por cuota,
+    leyendo las cuotas por bloques (iterator) en vez de cargarlas todas.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_CON_NDJSON
+    CHUNK_CUOTAS = 500
 
     def list(self, request, solicitud_id=None):
+        stream = quiere_ndjson(request)
+        qs = PlanPago.objects.select_related('solicitud')
+        if not stream:
+            qs = qs.prefetch_related('cuotas')
         try:
-            plan = (PlanPago.objects
-                    .select_related('solicitud')
-                    .prefetch_related('cuotas')
-                    .get(solicitud_id=solicitud_id))
+            plan = qs.get(solicitud_id=solicitud_id)
         except PlanPago.DoesNotExist:
             return Response({"detail": "Plan no encontrado"}, status=404)
-        return Response(PlanPagoDTO(plan).data)
+        if not stream:
+            return Response(PlanPagoDTO(plan).data)
+        return respuesta_ndjson(self._eventos_plan(plan))
+
+    def _eventos_plan(self, plan):
+        yield 'plan', PlanPagoResumenDTO(plan).data
+        cuota_dto = PlanCuotaDTO()
+        for c in plan.iter_cuotas(chunk_size=self.CHUNK_CUOTAS):
+            yield 'cuota', cuota_dto.to_representation(c)
 
 # (Ojo: NO hay PlanPagoExportView; la exportación la maneja export_plan de SolicitudCreditoViewSet)
 
+class PlanesExportarView(APIView):
+    """
+    Exportación masiva de planes en una descarga (streaming):
+      ?format=zip (default): un archivo por plan, ?archivo=pdf|xlsx
+      ?format=xlsx: un libro con hoja Resumen y una hoja por plan
+    Filtros: ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (generado_en), ?oficial=<id>, ?producto=<id>, ?moneda=.
+    """
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+    renderer_classes = RENDERERS_EXPORTACION_MASIVA
+
+    def get(self, request):
+        qp = request.query_params
+        fmt = (qp.get('format') or 'zip').lower()
+        archivo = (qp.get('archivo') or 'pdf').lower()
+        if fmt not in ('zip', 'xlsx') or archivo not in ('pdf', 'xlsx'):
+            return Response({'detail': 'Use format=zip|xlsx y archivo=pdf|xlsx'}, status=400)
+        try:
+            qs = exportacion.planes(
+                desde=date.fromisoformat(qp['desde']) if qp.get('desde') else None,
+                hasta=date.fromisoformat(qp['hasta']) if qp.get('hasta') else None,
+                oficial_id=int(qp['oficial']) if qp.get('oficial') else None,
+                producto_id=int(qp['producto']) if qp.get('producto') else None,
+                moneda=qp.get('moneda') or None,
+            )
+        except (ValueError, TypeError):
+            return Response({'detail': 'Parámetros inválidos (use YYYY-MM-DD para desde/hasta)'}, status=400)
+
+        total = qs.count()
+        maximo = settings.EXPORTACION_PLANES['MAX_PLANES']
+        if not total:
+            return Response({'detail': 'No hay planes con esos filtros'}, status=404)
+        if total > maximo:
+            return Response({'detail': f'{total} planes: el máximo por descarga es {maximo}; acote los filtros'},
+                            status=400)
+
+        sello = now().strftime('%Y%m%d_%H%M')
+        if fmt == 'xlsx':
+            return respuesta_archivo(exportacion.xlsx_planes(qs), exportacion.XLSX, f'planes_{sello}.xlsx')
+        return respuesta_archivo(exportacion.zip_planes(qs, archivo), exportacion.ZIP, f'planes_{sello}.zip')
+
+# =========================================================
+#              PROYECCIÓN DE COBROS DE CARTERA
+# =========================================================
+def _param_mes(valor):
+    """'YYYY-MM' -> primer día del mes."""
+    anio, mes = str(valor).split('-')[:2]
+    return date(int(anio), int(mes), 1)
+
+class ProyeccionCarteraView(APIView):
+    """
+    Cobros programados por mes (capital, interés, total) de todos los planes,
+    leídos del rollup mensual. ?desde=YYYY-MM (default: mes actual), ?hasta=YYYY-MM,
+    ?moneda=, ?producto=<id>.
+    """
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+
+    def get(self, request):
+        qp = request.query_params
+        try:
+            desde = _param_mes(qp['desde']) if qp.get('desde') else now().date().replace(day=1)
+            hasta = _param_mes(qp['hasta']) if qp.get('hasta') else None
+            producto = int(qp['producto']) if qp.get('producto') else None
+        except (ValueError, TypeError):
+            return Response({'detail': 'Parámetros inválidos (use YYYY-MM para desde/hasta)'}, status=400)
+        meses = proyeccion(desde, hasta, moneda=qp.get('moneda') or None, producto_id=producto)
+        for m in meses:
+            m['mes'] = m['mes'].strftime('%Y-%m')
+        return Response({'desde': desde.strftime('%Y-%m'),
+                         'hasta': hasta.strftime('%Y-%m') if hasta else None,
+                         'meses': meses})
+
+# =========================================================
+#              EXTRACCIÓN DE DATOS DE CARTERA
+# =========================================================
+class CarteraDatosView(APIView):
+    """
+    Extracción columnar para análisis (services/extraccion.py), en streaming:
+    /api/cartera/datos/<solicitudes|planes|cuotas>/?format=csv|parquet|arrow
+    ?desde=<marca> trae sólo lo nuevo o modificado; la marca para la próxima
+    llamada viene en el encabezado X-Marca-Agua.
+    """
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+    renderer_classes = RENDERERS_EXTRACCION
+
+    def get(self, request, conjunto):
+        fmt = (request.query_params.get('format') or 'csv').lower()
+        if conjunto not in extraccion.CONJUNTOS:
+            return Response({'detail': f"Conjunto desconocido (use {', '.join(extraccion.CONJUNTOS)})"},
+                            status=404)
+        if fmt not in extraccion.FORMATOS:
+            return Response({'detail': 'Use format=csv|parquet|arrow'}, status=400)
+        if not extraccion.formato_disponible(fmt):
+            return Response({'detail': f'El formato {fmt} no está disponible en este servidor (falta pyarrow)'},
+                            status=501)
+        try:
+            desde = extraccion.leer_marca(request.query_params.get('desde'))
+        except ValueError:
+            return Response({'detail': "Marca inválida (use la de X-Marca-Agua: '<instante ISO>,<id>')"},
+                            status=400)
+
+        ext = extraccion.Extraccion(conjunto, desde=desde)
+        resp = respuesta_archivo(ext.bloques(fmt), extraccion.CONTENT_TYPES[fmt],
+                                 f"{conjunto}_{now():%Y%m%d_%H%M}.{extraccion.EXTENSIONES[fmt]}")
+        if ext.hasta is not None:
+            resp['X-Marca-Agua'] = extraccion.formatear_marca(ext.hasta)
+        return resp
+
+# =========================================================
+#              ESTADÍSTICAS DE SOLICITUDES
+# =========================================================
+class EstadisticasSolicitudesView(APIView):
+    """
+    Tablero de operaciones, leído de los contadores pre-agregados: cantidades,
+    montos y horas promedio hasta evaluación/aprobación por estado, producto,
+    tipo de crédito y mes de creación. ?desde=YYYY-MM, ?hasta=YYYY-MM, ?moneda=.
+    """
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+
+    def get(self, request):
+        qp = request.query_params
+        try:
+            desde = _param_mes(qp['desde']) if qp.get('desde') else None
+            hasta = _param_mes(qp['hasta']) if qp.get('hasta') else None
+        except (ValueError, TypeError):
+            return Response({'detail': 'Parámetros inválidos (use YYYY-MM para desde/hasta)'}, status=400)
+        return Response(estadisticas.resumen(desde, hasta, moneda=qp.get('moneda') or None))
+
+# =========================================================
+#              BÚSQUEDA DE CLIENTES Y SOLICITUDES
+# =========================================================
+class BusquedaView(APIView):
+    """
+    Búsqueda del front-office por nombre, documento, teléfono, email o
+    fragmento de id de solicitud. ?q= (mín. 3 caracteres),
+    ?tipo=cliente|usuario|solicitud, ?limite= (default 20, máx. 50).
+    """
+    permission_classes = [IsAuthenticated, IsOfficialOrAdmin]
+
+    def get(self, request):
+        qp = request.query_params
+        tipo = qp.get('tipo') or None
+        if tipo and tipo not in dict(EntradaBusqueda.TIPOS):
+            return Response({'detail': 'tipo inválido'}, status=400)
+        try:
+            limite = max(1, min(int(qp.get('limite') or 20), 50))
+            resultados = buscar(qp.get('q', ''), tipo=tipo, limite=limite)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response({'q': qp.get('q', ''), 'resultados': resultados})
+
 # =========================================================
 #                     REGISTRO PÚBLICO
 # =========================================================
@@ -481,7 +751,13 @@ class PublicRegisterView(APIView):
 #                       CU11: SIMULADOR
 # =========================================================
 class SimuladorAPIView(APIView):
+    """
+    Simula un plan sin persistir. Con Accept: application/x-ndjson o ?stream=ndjson
+    las cuotas se emiten una por línea a medida que se calculan.
+    """
     permission_classes = [permissions.AllowAny]
+    renderer_classes = RENDERERS_CON_NDJSON
+
     def post(self, request):
         try:
             monto = float(request.data.get('monto'))
@@ -490,9 +766,42 @@ class SimuladorAPIView(APIView):
             primera = request.data.get('primera_cuota_fecha')  # opcional ISO
         except Exception:
             return Response({'detail': 'Parámetros inválidos'}, status=400)
-        plan, cuotas = simular_plan(monto, plazo, tna, primera)
+        if quiere_ndjson(request):
+            try:
+                eventos = iterar_simulacion(monto, plazo, tna, primera)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=400)
+            return respuesta_ndjson(eventos)
+        try:
+            plan, cuotas = simular_plan(monto, plazo, tna, primera)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
         return Response({'resumen': plan, 'cuotas': cuotas})
 
+class SimuladorGridAPIView(APIView):
+    """Grilla tasa x plazo para un monto: cuota y totales de cada combinación."""
+    permission_classes = [permissions.AllowAny]
+    MAX_COMBINACIONES = 400
+
+    def post(self, request):
+        try:
+            monto = Decimal(str(request.data.get('monto')))
+            plazos = [int(p) for p in request.data.get('plazo_meses')]
+            tasas = [Decimal(str(t)) for t in request.data.get('tasa_nominal_anual')]
+            primera = request.data.get('primera_cuota_fecha')  # opcional ISO
+            incluir = str(request.data.get('incluir_cuotas', 'false')).lower() == 'true'
+        except Exception:
+            return Response({'detail': 'Parámetros inválidos'}, status=400)
+        if monto <= 0 or not plazos or not tasas or any(p < 1 for p in plazos) or any(t < 0 for t in tasas):
+            return Response({'detail': 'Parámetros inválidos'}, status=400)
+        if len(plazos) * len(tasas) > self.MAX_COMBINACIONES:
+            return Response({'detail': f'Máximo {self.MAX_COMBINACIONES} combinaciones'}, status=400)
+        try:
+            resultados = simular_grilla(monto, plazos, tasas, primera, incluir_cuotas=incluir)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response({'monto': monto, 'resultados': resultados})
+
 # =========================================================
 #                 CU18: PRODUCTOS / DOCUMENTOS
 # =========================================================
@@ -547,10 +856,13 @@ class RequisitoProductoDocumentoViewSet(viewsets.ModelViewSet):
 # =========================================================
 #                 CU19: DOCUMENTOS ADJUNTOS
 # =========================================================
-class DocumentoAdjuntoViewSet(viewsets.ModelViewSet):
+class DocumentoAdjuntoViewSet(PlanConsultasMixin, viewsets.ModelViewSet):
     queryset = DocumentoAdjunto.objects.select_related('documento_tipo', 'solicitud')
     serializer_class = DocumentoAdjuntoSerializer
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-uploaded_at', '-id')
+    presupuesto_consultas = {'list': 1, 'retrieve': 1}
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -604,3 +916,21 @@ class DocumentoAdjuntoViewSet(viewsets.ModelViewSet):
         except Exception:
             pass
         return resp
+
+# =========================================================
+#                 TRABAJOS EN SEGUNDO PLANO
+# =========================================================
+class TrabajoViewSet(PlanConsultasMixin, viewsets.ReadOnlyModelViewSet):
+    """Estado de los trabajos encolados con ?async=true; cada usuario ve los suyos."""
+    queryset = Trabajo.objects.all()
+    serializer_class = TrabajoSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-creado_en', '-id')
+    presupuesto_consultas = {'list': 1, 'retrieve': 1}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.request.user.is_superuser:
+            return qs
+        return qs.filter(creado_por=self.request.user)
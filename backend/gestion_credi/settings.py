@@ -72,6 +72,19 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:65453"  # Flutter  
 ]
 
+# Correo (restablecer contraseña): enlace al frontend y SMTP por variables de entorno.
+# Con ?async=true el envío lo hace `procesar_trabajos`; el timeout evita que un SMTP
+# colgado retenga al trabajador (el trabajo se reintenta)
+FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=25)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+EMAIL_TIMEOUT = env.int('EMAIL_TIMEOUT', default=10)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -82,6 +95,60 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Paginación keyset de los listados grandes (api/pagination.py); ?page_size= la ajusta hasta el máximo
+PAGINACION_KEYSET = {
+    'PAGE_SIZE': env.int('API_PAGE_SIZE', default=50),
+    'MAX_PAGE_SIZE': env.int('API_MAX_PAGE_SIZE', default=500),
+}
+
+# Presupuesto de consultas por acción (api/consultas.py): 'off', 'log' o 'error'
+PRESUPUESTO_CONSULTAS = env('API_PRESUPUESTO_CONSULTAS', default='off')
+
+# Caché del simulador (CU11): 'lru' = en proceso, 'django' = CACHES[ALIAS] compartida
+SIMULADOR_CACHE = {
+    'BACKEND': env('SIMULADOR_CACHE_BACKEND', default='lru'),
+    'MAX_ENTRIES': env.int('SIMULADOR_CACHE_MAX_ENTRIES', default=1024),
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+# Persistencia de cuotas en generar_plan: bulk_create por BATCH_SIZE; en PostgreSQL,
+# COPY desde COPY_MIN_CUOTAS cuotas (None = desactivado)
+PLAN_PAGO_PERSISTENCIA = {
+    'BATCH_SIZE': 500,
+    'COPY_MIN_CUOTAS': env.int('PLAN_PAGO_COPY_MIN_CUOTAS', default=None),
+    # 'filas' = una fila PlanCuota por cuota; 'compacto' = blob en PlanPago.cuotas_compactas
+    'FORMATO': env('PLAN_PAGO_FORMATO', default='filas'),
+}
+
+# PDF de planes en caché (api/services/plan_pdf.py); fuera de MEDIA_ROOT, que se sirve público
+PLAN_PDF_CACHE = {
+    'DIR': env('PLAN_PDF_CACHE_DIR', default=os.path.join(BASE_DIR, 'var', 'planes_pdf')),
+}
+
+# Exportación masiva de planes (api/services/exportacion.py): procesos que renderizan PDF,
+# planes en vuelo como máximo y tope de planes por descarga
+EXPORTACION_PLANES = {
+    'TRABAJADORES': env.int('EXPORTACION_PLANES_TRABAJADORES', default=min(4, os.cpu_count() or 1)),
+    'VENTANA': env.int('EXPORTACION_PLANES_VENTANA', default=8),
+    'MAX_PLANES': env.int('EXPORTACION_PLANES_MAX', default=5000),
+}
+
+# Extracción de cartera (api/services/extraccion.py): sólo salen filas con marca anterior a
+# ahora - MARGEN_SEG, que tiene que superar la transacción de escritura más larga
+EXTRACCION_CARTERA = {
+    'MARGEN_SEG': env.int('EXTRACCION_CARTERA_MARGEN_SEG', default=300),
+}
+
+# Cola de trabajos en BD (api/services/trabajos.py, manage.py procesar_trabajos): plazo de
+# un trabajo tomado antes de que otro trabajador lo retome, espera base de los reintentos
+# (se duplica en cada intento) y pausa de un trabajador con la cola vacía
+TRABAJOS = {
+    'PLAZO_SEG': env.int('TRABAJOS_PLAZO_SEG', default=600),
+    'REINTENTO_SEG': env.int('TRABAJOS_REINTENTO_SEG', default=30),
+    'ESPERA_SEG': env.float('TRABAJOS_ESPERA_SEG', default=1.0),
+}
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -114,16 +181,25 @@ WSGI_APPLICATION = 'gestion_credi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': env('DB_NAME'),
-        'USER': env('DB_USER'),
-        'PASSWORD': env('DB_PASSWORD'),
-        'HOST': env('DB_HOST'),
-        'PORT': env('DB_PORT'),
+# DB_ENGINE=sqlite permite correr (p. ej. los benchmarks) sin PostgreSQL
+if env('DB_ENGINE', default='postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env('SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DB_NAME'),
+            'USER': env('DB_USER'),
+            'PASSWORD': env('DB_PASSWORD'),
+            'HOST': env('DB_HOST'),
+            'PORT': env('DB_PORT'),
+        }
     }
-}
 
 
 
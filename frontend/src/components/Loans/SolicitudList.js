@@ -1,19 +1,30 @@
 import React, { useEffect, useState } from 'react';
 import axios from '../../config/axios';
+import { getPagina } from '../../services/paginacion';
 
 export default function SolicitudList() {
   const [rows, setRows] = useState([]);
+  const [next, setNext] = useState(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(true);
 
   const load = async () => {
     setLoading(true);
     try {
-      const { data } = await axios.get('/api/solicitudes/', { withCredentials:true });
-      setRows(data); setError('');
+      const pagina = await getPagina('/api/solicitudes/');
+      setRows(pagina.results); setNext(pagina.next); setError('');
     } catch (e) { setError('No se pudieron cargar'); }
     finally { setLoading(false); }
   };
+  const cargarMas = async () => {
+    setCargandoMas(true);
+    try {
+      const pagina = await getPagina('/api/solicitudes/', { next });
+      setRows(prev => [...prev, ...pagina.results]); setNext(pagina.next);
+    } catch (e) { setError('No se pudieron cargar'); }
+    finally { setCargandoMas(false); }
+  };
   useEffect(()=>{ load(); }, []);
 
   const evaluar = async (id) => {
@@ -55,6 +66,11 @@ export default function SolicitudList() {
           ))}
         </tbody>
       </table>
+      {next && (
+        <button onClick={cargarMas} disabled={cargandoMas}>
+          {cargandoMas ? 'Cargando…' : 'Cargar más'}
+        </button>
+      )}
     </div>
   )
 }
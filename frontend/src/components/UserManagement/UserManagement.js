@@ -1,9 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import axios from '../../config/axios';
+import { getPagina } from '../../services/paginacion';
 import './UserManagement.css';
 
 const UserManagement = () => {
   const [users, setUsers] = useState([]);
+  const [nextUsers, setNextUsers] = useState(null); // cursor de la página siguiente
   const [roles, setRoles] = useState([]);
   const [formData, setFormData] = useState({
     username: '',
@@ -24,10 +26,11 @@ const UserManagement = () => {
     fetchRoles();
   }, []);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (next = null) => {
     try {
-      const response = await axios.get('http://localhost:8000/api/users/');
-      setUsers(response.data);
+      const pagina = await getPagina('/api/users/', { next });
+      setUsers((prev) => (next ? [...prev, ...pagina.results] : pagina.results));
+      setNextUsers(pagina.next);
     } catch (err) {
       setError('Error al cargar los usuarios');
       console.error('Fetch users error:', err);
@@ -307,6 +310,11 @@ const UserManagement = () => {
                 ))}
               </tbody>
             </table>
+            {nextUsers && (
+              <button type="button" className="edit-button" onClick={() => fetchUsers(nextUsers)}>
+                Cargar más
+              </button>
+            )}
           </div>
         )}
       </div>
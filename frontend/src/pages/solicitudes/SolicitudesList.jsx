@@ -7,6 +7,8 @@ const ESTADOS = ['TODOS', 'DRAFT', 'ENVIADA', 'EVALUADA', 'APROBADA', 'RECHAZADA
 export default function SolicitudesList() {
   const [loading, setLoading] = useState(true);
   const [rows, setRows] = useState([]);
+  const [next, setNext] = useState(null);      // cursor de la página siguiente
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [err, setErr] = useState('');
 
   const [q, setQ] = useState('');              // búsqueda
@@ -17,9 +19,10 @@ export default function SolicitudesList() {
     (async () => {
       try {
         setLoading(true);
-        const data = await listSolicitudes();
+        const pagina = await listSolicitudes();
         if (!mounted) return;
-        setRows(data);
+        setRows(pagina.results);
+        setNext(pagina.next);
       } catch (e) {
         setErr('No se pudo cargar solicitudes');
       } finally {
@@ -29,6 +32,19 @@ export default function SolicitudesList() {
     return () => { mounted = false; };
   }, []);
 
+  const cargarMas = async () => {
+    try {
+      setCargandoMas(true);
+      const pagina = await listSolicitudes({}, { next });
+      setRows((prev) => [...prev, ...pagina.results]);
+      setNext(pagina.next);
+    } catch (e) {
+      setErr('No se pudo cargar más solicitudes');
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const filtered = useMemo(() => {
     const qn = q.trim().toLowerCase();
     return rows.filter((r) => {
@@ -122,12 +138,23 @@ export default function SolicitudesList() {
         </div>
       )}
 
+      {/* El filtro se aplica a lo cargado: "Cargar más" trae la página siguiente */}
+      {!loading && next && (
+        <div className="more">
+          <button className="btn" onClick={cargarMas} disabled={cargandoMas}>
+            {cargandoMas ? 'Cargando...' : 'Cargar más'}
+          </button>
+        </div>
+      )}
+
       <style>{`
         .toolbar { display:flex; justify-content:space-between; align-items:center; margin:12px 0; gap:12px; }
         .left { display:flex; gap:8px; }
         .input { padding:8px; border:1px solid #ddd; border-radius:6px; }
         .btn { background:#198754;color:#fff;padding:8px 12px;border-radius:6px;text-decoration:none; }
         .table-wrap { overflow:auto; }
+        .more { display:flex; justify-content:center; margin:12px 0; }
+        button.btn { border:none; cursor:pointer; }
         .table { width:100%; border-collapse: collapse; background:#fff; border-radius:8px; }
         .table th, .table td { padding:10px; border-bottom:1px solid #eee; text-align:left; }
       `}</style>
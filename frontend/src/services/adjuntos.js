@@ -1,8 +1,8 @@
 import api from '../config/axios';
+import { listarTodo } from './paginacion';
 
 export function listAdjuntos({ solicitud }) {
-  return api.get('/api/documentos/', { params: { solicitud } })
-           .then(r => r.data);
+  return listarTodo('/api/documentos/', { solicitud });
 }
 
 export function subirAdjunto({ solicitud, documento_tipo, archivo, fecha_emision }) {
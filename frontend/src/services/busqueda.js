@@ -0,0 +1,7 @@
+import api from '../config/axios';
+
+/** GET /api/busqueda/?q=&tipo=cliente|usuario|solicitud -> [{ tipo, id, titulo, subtitulo, rank }] */
+export async function buscar(q, { tipo, limite } = {}) {
+  const { data } = await api.get('/api/busqueda/', { params: { q, tipo, limite } });
+  return data.resultados || [];
+}
@@ -1,7 +1,7 @@
-import api from '../config/axios';
+import { listarTodo } from './paginacion';
 
 // Puedes usar /api/clientes/ (devuelve los Cliente con su id)
 export async function fetchClientes() {
-  const { data } = await api.get('/api/clientes/');
-  return data; // array de clientes
+  // el select necesita todos: se recorren las páginas del cursor
+  return listarTodo('/api/clientes/', { page_size: 500 }); // array de clientes
 }
@@ -0,0 +1,28 @@
+// src/services/paginacion.js
+import api from '../config/axios';
+
+// Listados paginados por cursor: { next, previous, results }.
+// `next` viene como URL absoluta; se pide como ruta relativa para que el
+// interceptor de axios agregue el token (a las absolutas no se lo pone).
+function rutaRelativa(url) {
+  const u = new URL(url);
+  return `${u.pathname}${u.search}`;
+}
+
+/** Una página: { results, next }. Con `next` (de la página anterior) se pide la siguiente. */
+export async function getPagina(url, { params, next } = {}) {
+  const { data } = next ? await api.get(rutaRelativa(next)) : await api.get(url, { params });
+  if (Array.isArray(data)) return { results: data, next: null }; // endpoint sin paginar
+  return { results: data?.results || [], next: data?.next || null };
+}
+
+/** Todas las páginas en una lista: sólo donde hace falta el listado completo (selects, adjuntos). */
+export async function listarTodo(url, params) {
+  let pagina = await getPagina(url, { params });
+  const filas = [...pagina.results];
+  while (pagina.next) {
+    pagina = await getPagina(url, { next: pagina.next });
+    filas.push(...pagina.results);
+  }
+  return filas;
+}
@@ -7,11 +7,16 @@ export async function getPlan(solicitudId) {
   return data;
 }
 
-/** POST /api/solicitudes/:id/plan-pagos/generar/?overwrite=true|false */
-export async function generarPlan(solicitudId, { overwrite = false } = {}) {
-  const qs = overwrite ? '?overwrite=true' : '';
-  const { data } = await api.post(`/api/solicitudes/${solicitudId}/plan-pagos/generar/${qs}`);
-  return data; // { plan_id: "..." }
+/**
+ * POST /api/solicitudes/:id/plan-pagos/generar/?overwrite=true|false
+ * Con asincrono: true responde enseguida { trabajo_id, estado, url } (ver services/trabajos.js)
+ */
+export async function generarPlan(solicitudId, { overwrite = false, asincrono = false } = {}) {
+  const params = {};
+  if (overwrite) params.overwrite = true;
+  if (asincrono) params.async = true;
+  const { data } = await api.post(`/api/solicitudes/${solicitudId}/plan-pagos/generar/`, null, { params });
+  return data; // { plan_id: "..." } | { trabajo_id: "...", ... }
 }
 
 /** Construye URL absoluta (solo si tu endpoint fuera público; aquí NO lo uses para descargar) */
@@ -1,8 +1,9 @@
 import api from '../config/axios';
+import { getPagina } from './paginacion';
 
-export async function listSolicitudes(params = {}) {
-  const { data } = await api.get('/api/solicitudes/', { params });
-  return data;
+// Paginado por cursor: devuelve { results, next }; con { next } pide la página siguiente
+export async function listSolicitudes(params = {}, { next } = {}) {
+  return getPagina('/api/solicitudes/', { params, next });
 }
 
 export async function createSolicitud(payload) {
@@ -30,12 +31,26 @@ export async function decidirSolicitud(id, decision /* 'APROBAR' | 'RECHAZAR' */
   return data;
 }
 
+// Comités: items = [{ id, score_riesgo, observacion_evaluacion }] / [{ id, decision }]
+// Respuesta: { aplicados, rechazados, resultados: [{ id, ok, estado | error }] }
+export async function evaluarSolicitudesLote(items) {
+  const { data } = await api.post('/api/solicitudes/evaluar-lote/', { items });
+  return data;
+}
+
+export async function decidirSolicitudesLote(items) {
+  const { data } = await api.post('/api/solicitudes/decidir-lote/', { items });
+  return data;
+}
+
 export async function getChecklist(id) {
   const { data } = await api.get(`/api/solicitudes/${id}/documentos/checklist/`);
   return data;
 }
 
-export async function getSeguimiento(id) {
-  const { data } = await api.get(`/api/solicitudes/${id}/seguimiento/`);
+// since: `ultimo` de la respuesta anterior -> sólo eventos nuevos
+export async function getSeguimiento(id, since) {
+  const params = since != null ? { since } : undefined;
+  const { data } = await api.get(`/api/solicitudes/${id}/seguimiento/`, { params });
   return data;
 }
@@ -0,0 +1,23 @@
+// src/services/trabajos.js
+import api from '../config/axios';
+
+/** GET /api/trabajos/:id/ -> { id, tipo, estado, intentos, resultado, error, ... } */
+export async function getTrabajo(id) {
+  const { data } = await api.get(`/api/trabajos/${id}/`);
+  return data;
+}
+
+/**
+ * Consulta el trabajo hasta que termina (COMPLETADO o FALLIDO).
+ * Devuelve `resultado`; si falló, lanza un Error con el mensaje del backend.
+ */
+export async function esperarTrabajo(id, { intervaloMs = 1000, maxEsperaMs = 120000 } = {}) {
+  const limite = Date.now() + maxEsperaMs;
+  for (;;) {
+    const t = await getTrabajo(id);
+    if (t.estado === 'COMPLETADO') return t.resultado;
+    if (t.estado === 'FALLIDO') throw new Error(t.error || 'El trabajo falló');
+    if (Date.now() > limite) throw new Error('El trabajo sigue en curso; consulte más tarde');
+    await new Promise((r) => setTimeout(r, intervaloMs));
+  }
+}
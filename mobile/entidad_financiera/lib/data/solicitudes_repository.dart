@@ -23,21 +23,36 @@ class SolicitudesRepository {
     return Solicitud.fromJson(resp.data as Map<String, dynamic>);
   }
 
-  /// Lista todas y filtra en cliente_id desde la app (si el backend no filtra).
+  /// Todas las solicitudes del cliente: recorre las páginas del cursor (`next`)
+  /// hasta el final, así no se pierden filas más allá de la primera página.
   // lib/data/solicitudes_repository.dart
   Future<List<Solicitud>> listarDeCliente(int clienteId) async {
-    final resp = await _dio.get(
-      '/api/solicitudes/',
-      queryParameters: {
-        'cliente': clienteId,
-        // si tu paginador lo soporta, puedes controlar el tamaño:
-        'page_size': 100,
-      },
-    );
+    final listJson = <dynamic>[];
+    String? next = '/api/solicitudes/';
+    Map<String, dynamic>? query = {
+      'cliente': clienteId,
+      'page_size': 100,
+    };
 
-    final raw = resp.data;
-    // Soportar ambas formas: lista directa o paginada {results: [...]}
-    final List listJson = raw is List ? raw : (raw['results'] as List);
+    while (next != null) {
+      final resp = await _dio.get(next, queryParameters: query);
+      final raw = resp.data;
+      // Soportar ambas formas: lista directa o paginada {next, results: [...]}
+      if (raw is List) {
+        listJson.addAll(raw);
+        break;
+      }
+      listJson.addAll(raw['results'] as List);
+      // `next` ya trae cursor y filtros; se pide como ruta relativa al baseUrl
+      final siguiente = raw['next'] as String?;
+      if (siguiente == null) {
+        next = null;
+      } else {
+        final uri = Uri.parse(siguiente);
+        next = uri.hasQuery ? '${uri.path}?${uri.query}' : uri.path;
+      }
+      query = null;
+    }
 
     final list = listJson
         .map((e) => Solicitud.fromJson(e as Map<String, dynamic>))